@@ -0,0 +1,75 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Coroutine, Optional
+
+
+class EventLoopThread:
+    """حلقة asyncio واحدة في خيط خلفي تخدم الواجهة الرسومية ووضع سطر الأوامر"""
+
+    def __init__(self, name: str = 'asyncio-loop'):
+        self.name = name
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        self.start()
+        return self._loop
+
+    def start(self):
+        """تشغيل الحلقة عند أول استخدام"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+        self._ready.wait()
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._ready.set()
+        self._loop.run_forever()
+
+    def in_loop_thread(self) -> bool:
+        return threading.current_thread() is self._thread
+
+    def submit(self, coro: Coroutine) -> Future:
+        """جدولة coroutine على الحلقة من أي خيط وإرجاع Future متزامن"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro: Coroutine):
+        """تنفيذ coroutine والانتظار حتى تنتهي (لا تُستدعى من داخل الحلقة نفسها)"""
+        if self.in_loop_thread():
+            raise RuntimeError("EventLoopThread.run() called from the loop thread; await the coroutine instead")
+        return self.submit(coro).result()
+
+    def call_soon(self, callback, *args):
+        """استدعاء دالة على خيط الحلقة بأمان"""
+        self.loop.call_soon_threadsafe(callback, *args)
+
+    def stop(self):
+        with self._lock:
+            if self._loop is not None:
+                self._loop.call_soon_threadsafe(self._loop.stop)
+            if self._thread is not None:
+                self._thread.join(timeout=5)
+            self._thread = None
+            self._loop = None
+            self._ready.clear()
+
+
+_default_loop: Optional[EventLoopThread] = None
+_default_lock = threading.Lock()
+
+
+def default_loop() -> EventLoopThread:
+    """الحلقة المشتركة للعملية"""
+    global _default_loop
+    with _default_lock:
+        if _default_loop is None:
+            _default_loop = EventLoopThread()
+        return _default_loop
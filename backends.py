@@ -0,0 +1,353 @@
+"""مديرو الحزم (apt، dnf، pacman، flatpak) خلف واجهة واحدة
+
+خطوات "apt install" و "apt update" في الكتالوج عمليات منطقية: الحزم فيها أسماء منطقية
+يترجمها كل مدير عبر خريطة الحزم، وتُدمج في معاملة تثبيت واحدة بصيغته.
+الاستعلامات تمر عبر run(argv) -> (رمز الخروج، المخرجات) ليمكن استبدالها بمخرجات مسجلة.
+"""
+import platform
+from abc import ABC, abstractmethod
+import re
+import shlex
+import shutil
+import subprocess
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+APT = 'apt'
+DNF = 'dnf'
+PACMAN = 'pacman'
+FLATPAK = 'flatpak'
+
+DPKG_STATUS = Path('/var/lib/dpkg/status')
+APT_LISTS_DIR = Path('/var/lib/apt/lists')
+QUERY_TIMEOUT = 60
+
+# أنظمة rpm-ostree (Silverblue وأمثالها) لا تثبت الحزم مباشرة؛ التطبيقات عبر flatpak
+OSTREE_BOOTED = Path('/run/ostree-booted')
+
+_APT_UPGRADABLE = re.compile(r'^([^/\s]+)/\S+\s+(\S+)\s.*\[upgradable from: ([^\]]+)\]')
+
+Runner = Callable[[List[str]], Tuple[int, str]]
+
+
+def run_query(argv: List[str]) -> Tuple[int, str]:
+    """تشغيل أمر استعلام؛ رمز 127 ومخرجات فارغة إن تعذر تشغيله"""
+    try:
+        proc = subprocess.run(argv, capture_output=True, text=True, timeout=QUERY_TIMEOUT)
+    except (OSError, subprocess.SubprocessError):
+        return 127, ''
+    return proc.returncode, proc.stdout
+
+
+def _quote(packages: Iterable[str]) -> str:
+    return ' '.join(shlex.quote(p) for p in packages)
+
+
+# --- تحليل المخرجات ---
+
+def _field(stanza: bytes, name: bytes) -> Optional[bytes]:
+    """قيمة حقل في مقطع واحد باستخدام find بدلاً من تقسيم الأسطر"""
+    start = stanza.find(name)
+    if start < 0:
+        return None
+    start += len(name)
+    end = stanza.find(b'\n', start)
+    return stanza[start:end] if end >= 0 else stanza[start:]
+
+
+def parse_status(data: bytes) -> Dict[str, str]:
+    """تحليل /var/lib/dpkg/status إلى {الحزمة: الإصدار} للحزم المثبتة فعلاً"""
+    installed = {}
+    for stanza in data.split(b'\n\n'):
+        stanza = b'\n' + stanza
+        status = _field(stanza, b'\nStatus: ')
+        if status is None or not status.endswith(b' installed'):
+            continue
+        package = _field(stanza, b'\nPackage: ')
+        if package:
+            installed[package.decode()] = (_field(stanza, b'\nVersion: ') or b'').decode()
+    return installed
+
+
+def parse_apt_upgradable(output: str) -> Dict[str, str]:
+    """apt list --upgradable: 'name/suite version arch [upgradable from: old]'"""
+    upgradable = {}
+    for line in output.splitlines():
+        match = _APT_UPGRADABLE.match(line)
+        if match:
+            upgradable[match.group(1)] = match.group(2)
+    return upgradable
+
+
+def parse_columns(output: str, separator: Optional[str] = None) -> Dict[str, str]:
+    """سطر لكل حزمة: الاسم ثم الإصدار (rpm -qa بتنسيق مخصص، pacman -Q، flatpak --columns)"""
+    packages = {}
+    for line in output.splitlines():
+        fields = line.split(separator)
+        if fields and fields[0].strip():
+            packages[fields[0].strip()] = fields[1].strip() if len(fields) > 1 else ''
+    return packages
+
+
+def parse_dnf_check_update(output: str) -> Dict[str, str]:
+    """dnf check-update: 'name.arch  version-release  repo'؛ قسم Obsoleting يُتجاهل"""
+    upgradable = {}
+    for line in output.splitlines():
+        if line.startswith('Obsoleting'):
+            break
+        fields = line.split()
+        if len(fields) == 3 and '.' in fields[0]:
+            upgradable[fields[0].rsplit('.', 1)[0]] = fields[1]
+    return upgradable
+
+
+def parse_pacman_upgrades(output: str) -> Dict[str, str]:
+    """pacman -Qu: 'name old -> new' مع [ignored] للحزم المستثناة"""
+    upgradable = {}
+    for line in output.splitlines():
+        fields = line.split()
+        if len(fields) >= 4 and fields[2] == '->' and '[ignored]' not in fields:
+            upgradable[fields[0]] = fields[3]
+    return upgradable
+
+
+# --- المديرون ---
+
+def _first_existing(paths: Tuple[Path, ...]) -> Path:
+    return next((path for path in paths if path.exists()), paths[0])
+
+
+class PackageBackend(ABC):
+    """مدير حزم: أوامر مجمعة للتثبيت والترقية واستعلام واحد لكل الحزم"""
+
+    name = ''
+    tool = ''
+    # مواقع قاعدة الحزم المحتملة بالترتيب؛ يُراقب أول موجود منها
+    STATE_PATHS: Tuple[Path, ...] = (Path('/'),)
+    INDEX_PATH = Path('/')
+    # أمر تحديث فهرس المستودعات، أو None إن كان التثبيت يحدثه بنفسه
+    refresh_command: Optional[str] = None
+    # الاسم المنطقي غير الموجود في الخريطة يُستخدم كما هو
+    identity_names = True
+    # False إن كانت ترقية بعض الحزم دون غيرها غير مدعومة فتُرقى كلها
+    partial_upgrades = True
+
+    def __init__(self, state_path: Optional[Path] = None, index_path: Optional[Path] = None,
+                 package_map: Optional[Dict[str, dict]] = None, run: Runner = run_query):
+        # state_path يتغير mtime له مع كل تثبيت، و index_path مع كل تحديث للفهرس
+        self.state_path = Path(state_path) if state_path else _first_existing(self.STATE_PATHS)
+        self.index_path = Path(index_path or self.INDEX_PATH)
+        self.package_map = package_map or {}
+        self.run = run
+
+    def __repr__(self) -> str:
+        return f"<{type(self).__name__} {self.name}>"
+
+    # --- الأسماء المنطقية ---
+
+    def resolve(self, package: str) -> Optional[List[str]]:
+        """أسماء الحزم الفعلية لاسم منطقي؛ [] إن لم يلزم شيء، None إن لم يتوفر"""
+        mapping = self.package_map.get(package, {})
+        if self.name in mapping:
+            native = mapping[self.name]
+            if native is None:
+                return []
+            return [native] if isinstance(native, str) else list(native)
+        if package.startswith(('.', '/')) or package.endswith('.deb'):
+            # ملف .deb محلي لا يثبته إلا apt
+            return [package] if self.name == APT else None
+        return [package] if self.identity_names else None
+
+    def resolve_all(self, packages: Iterable[str]) -> Optional[List[str]]:
+        """ترجمة عدة أسماء؛ None إن تعذرت ترجمة أي منها"""
+        resolved: List[str] = []
+        for package in packages:
+            native = self.resolve(package)
+            if native is None:
+                return None
+            resolved.extend(name for name in native if name not in resolved)
+        return resolved
+
+    # --- الأوامر ---
+
+    @abstractmethod
+    def install_command(self, packages: List[str], options: Iterable[str] = ()) -> str:
+        """معاملة تثبيت واحدة لكل الحزم"""
+
+    @abstractmethod
+    def upgrade_commands(self, packages: Optional[List[str]] = None) -> List[str]:
+        """ترقية النظام كله، أو الحزم المحددة فقط في معاملة واحدة (إن دعم partial_upgrades)"""
+
+    # --- الاستعلام ---
+
+    @abstractmethod
+    def installed(self) -> Dict[str, str]:
+        """{الحزمة: الإصدار المثبت} من استعلام واحد"""
+
+    @abstractmethod
+    def upgradable(self) -> Dict[str, str]:
+        """{الحزمة: الإصدار المرشح} من استعلام واحد (بطيء؛ يُستدعى في الخلفية)"""
+
+    def _query(self, argv: List[str], ok_codes: Tuple[int, ...] = (0,)) -> str:
+        returncode, output = self.run(argv)
+        return output if returncode in ok_codes else ''
+
+
+class AptBackend(PackageBackend):
+    name = APT
+    tool = 'apt-get'
+    STATE_PATHS = (DPKG_STATUS,)
+    INDEX_PATH = APT_LISTS_DIR
+    refresh_command = "sudo apt update"
+
+    def install_command(self, packages: List[str], options: Iterable[str] = ()) -> str:
+        options = [opt for opt in options if opt not in ('-y', '--yes')]
+        return ' '.join(["sudo apt install", _quote(packages), *options, "-y"])
+
+    def upgrade_commands(self, packages: Optional[List[str]] = None) -> List[str]:
+        if packages is None:
+            return ["sudo apt update", "sudo apt upgrade -y", "sudo apt autoremove -y"]
+        return [f"sudo apt-get install --only-upgrade -y {_quote(sorted(packages))}", "sudo apt autoremove -y"]
+
+    def installed(self) -> Dict[str, str]:
+        # قراءة قاعدة dpkg مباشرة أسرع بكثير من تشغيل dpkg-query
+        try:
+            with open(self.state_path, 'rb') as f:
+                return parse_status(f.read())
+        except OSError:
+            return {}
+
+    def upgradable(self) -> Dict[str, str]:
+        return parse_apt_upgradable(self._query(["apt", "list", "--upgradable"]))
+
+
+class DnfBackend(PackageBackend):
+    name = DNF
+    tool = 'dnf'
+    # Fedora 36 وما بعدها تنقل القاعدة إلى /usr/lib/sysimage/rpm
+    STATE_PATHS = (Path('/usr/lib/sysimage/rpm'), Path('/var/lib/rpm'))
+    INDEX_PATH = Path('/var/cache/dnf')
+    refresh_command = "sudo dnf makecache"
+
+    def install_command(self, packages: List[str], options: Iterable[str] = ()) -> str:
+        # خيارات apt في الكتالوج لا مقابل لها هنا
+        return f"sudo dnf install -y {_quote(packages)}"
+
+    def upgrade_commands(self, packages: Optional[List[str]] = None) -> List[str]:
+        if packages is None:
+            return ["sudo dnf upgrade --refresh -y", "sudo dnf autoremove -y"]
+        return [f"sudo dnf upgrade -y {_quote(sorted(packages))}", "sudo dnf autoremove -y"]
+
+    def installed(self) -> Dict[str, str]:
+        return parse_columns(self._query(
+            ["rpm", "-qa", "--queryformat", "%{NAME}\t%{VERSION}-%{RELEASE}\n"]), '\t')
+
+    def upgradable(self) -> Dict[str, str]:
+        # check-update يخرج بـ 100 عند وجود ترقيات
+        return parse_dnf_check_update(self._query(["dnf", "-q", "check-update"], (0, 100)))
+
+
+class PacmanBackend(PackageBackend):
+    name = PACMAN
+    tool = 'pacman'
+    STATE_PATHS = (Path('/var/lib/pacman/local'),)
+    INDEX_PATH = Path('/var/lib/pacman/sync')
+    # لا -Sy منفصل: تحديث قاعدة المزامنة دون ترقية النظام ترقية جزئية لا يدعمها Arch،
+    # لذا يحدثها التثبيت نفسه مع ترقية كاملة (-Syu)
+    refresh_command = None
+    partial_upgrades = False
+
+    def install_command(self, packages: List[str], options: Iterable[str] = ()) -> str:
+        return f"sudo pacman -Syu --needed --noconfirm {_quote(packages)}"
+
+    def upgrade_commands(self, packages: Optional[List[str]] = None) -> List[str]:
+        # ترقية بعض الحزم فقط ترقية جزئية؛ تُرقى كلها دائماً
+        return ["sudo pacman -Syu --noconfirm"]
+
+    def installed(self) -> Dict[str, str]:
+        return parse_columns(self._query(["pacman", "-Q"]))
+
+    def upgradable(self) -> Dict[str, str]:
+        # checkupdates (pacman-contrib) يزامن نسخة مؤقتة من القاعدة دون لمس قاعدة النظام؛
+        # يخرج بـ 2 عندما لا توجد ترقيات، وبدونه نقرأ القاعدة الحالية بـ pacman -Qu
+        returncode, output = self.run(["checkupdates"])
+        if returncode in (0, 2):
+            return parse_pacman_upgrades(output)
+        # pacman -Qu يخرج بـ 1 عندما لا توجد ترقيات
+        return parse_pacman_upgrades(self._query(["pacman", "-Qu"], (0, 1)))
+
+
+class FlatpakBackend(PackageBackend):
+    name = FLATPAK
+    tool = 'flatpak'
+    STATE_PATHS = (Path('/var/lib/flatpak/app'),)
+    INDEX_PATH = Path('/var/lib/flatpak/appstream')
+    refresh_command = "sudo flatpak update --appstream -y"
+    # معرفات flatpak مثل org.videolan.VLC لا تطابق أسماء الحزم؛ يلزم ذكرها في الخريطة
+    identity_names = False
+
+    def __init__(self, *args, remote: str = 'flathub', **kwargs):
+        super().__init__(*args, **kwargs)
+        self.remote = remote
+
+    def install_command(self, packages: List[str], options: Iterable[str] = ()) -> str:
+        return f"sudo flatpak install -y --noninteractive {shlex.quote(self.remote)} {_quote(packages)}"
+
+    def upgrade_commands(self, packages: Optional[List[str]] = None) -> List[str]:
+        if packages is None:
+            return ["sudo flatpak update -y --noninteractive",
+                    "sudo flatpak uninstall --unused -y --noninteractive"]
+        return [f"sudo flatpak update -y --noninteractive {_quote(sorted(packages))}"]
+
+    def installed(self) -> Dict[str, str]:
+        return parse_columns(self._query(
+            ["flatpak", "list", "--app", "--columns=application,version"]), '\t')
+
+    def upgradable(self) -> Dict[str, str]:
+        return parse_columns(self._query(
+            ["flatpak", "remote-ls", "--updates", "--app", "--columns=application,version"]), '\t')
+
+
+BACKENDS = {backend.name: backend for backend in (AptBackend, DnfBackend, PacmanBackend, FlatpakBackend)}
+
+# معرفات distro.id() و distro.like() لكل عائلة
+DISTRO_BACKENDS = {
+    'debian': APT, 'ubuntu': APT, 'linuxmint': APT, 'pop': APT, 'raspbian': APT,
+    'fedora': DNF, 'rhel': DNF, 'centos': DNF, 'rocky': DNF, 'almalinux': DNF,
+    'arch': PACMAN, 'manjaro': PACMAN, 'endeavouros': PACMAN
+}
+
+
+def distro_ids() -> List[str]:
+    """معرف التوزيعة ثم التوزيعات التي تشبهها"""
+    try:
+        import distro
+        return [distro.id()] + distro.like().split()
+    except ImportError:
+        pass
+    try:
+        info = platform.freedesktop_os_release()
+    except (OSError, AttributeError):
+        return []
+    return [info.get('ID', '')] + info.get('ID_LIKE', '').split()
+
+
+def detect_backend(ids: Optional[List[str]] = None) -> str:
+    """اختيار المدير من التوزيعة المكتشفة، ثم من الأدوات الموجودة في PATH"""
+    if OSTREE_BOOTED.exists():
+        return FLATPAK
+    for distro_id in distro_ids() if ids is None else ids:
+        if distro_id in DISTRO_BACKENDS:
+            return DISTRO_BACKENDS[distro_id]
+    for name, backend in BACKENDS.items():
+        if shutil.which(backend.tool):
+            return name
+    return APT
+
+
+def create_backend(name: Optional[str] = None, **options) -> PackageBackend:
+    """إنشاء المدير بالاسم أو حسب التوزيعة"""
+    name = name or detect_backend()
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown package backend: {name} (expected one of {', '.join(BACKENDS)})")
+    return BACKENDS[name](**options)
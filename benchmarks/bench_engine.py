@@ -0,0 +1,402 @@
+"""حزمة قياس أداء المحرك مع واجهة أوامر مزيفة
+
+الاستخدام:
+    python benchmarks/bench_engine.py                        # كل السيناريوهات
+    python benchmarks/bench_engine.py --scenario streaming --output-mb 50
+    python benchmarks/bench_engine.py --output results.json
+
+كل سيناريو يعمل في عملية منفصلة حتى تكون قراءة أقصى ذاكرة (ru_maxrss) خاصة به.
+تُطبع النتائج بصيغة JSON لمقارنتها بين الإصدارات.
+"""
+import argparse
+import json
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path[:0] = [str(REPO_DIR), str(BENCH_DIR)]
+
+from fake_backend import FakeBackend  # noqa: E402
+
+SCENARIOS = ('install', 'streaming', 'history', 'config', 'mirrors', 'memory', 'backends', 'startup')
+UI_INTERVAL = 0.033
+MARKER_INTERVAL = 0.02
+
+
+def _percentiles(values) -> dict:
+    if not values:
+        return {}
+    values = sorted(values)
+    return {
+        'p50_ms': values[len(values) // 2] * 1000,
+        'p95_ms': values[int(len(values) * 0.95)] * 1000,
+        'max_ms': values[-1] * 1000,
+        'count': len(values)
+    }
+
+
+def _peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _make_engine(config: dict, apps: dict, **callbacks):
+    """محرك في مجلد إعدادات مؤقت مع كتالوج من التطبيقات المزيفة"""
+    from engine import InstallerEngine
+    config_dir = Path(tempfile.mkdtemp(prefix='bench-engine-'))
+    (config_dir / "catalog" / "apps").mkdir(parents=True)
+    for app_id, commands in apps.items():
+        entry = {'category': 'bench', 'name': app_id, 'description': 'fake', 'commands': commands}
+        (config_dir / "catalog" / "apps" / f"{app_id}.json").write_text(json.dumps(entry))
+    base = {
+        'theme': 'dark',
+        'download_cache_enabled': False,
+        'package_backend': 'apt',
+        'dpkg_status': str(config_dir / "no-dpkg-status"),
+        'retry_backoff': 0.01
+    }
+    base.update(config)
+    (config_dir / "config.json").write_text(json.dumps(base))
+    return InstallerEngine(config_dir=config_dir, **callbacks)
+
+
+def _fake_app(i: int):
+    return [
+        "sudo apt install -y fake-prereq",
+        f"wget -q https://example.invalid/pkg{i}.deb -O /dev/null",
+        "sudo apt update",
+        f"sudo apt install fake-app{i} -y"
+    ]
+
+
+# --- السيناريوهات ---
+
+def scenario_install(args) -> dict:
+    """زمن التثبيت الكامل لعدة تطبيقات: خطة مدمجة مقابل تطبيق بعد آخر"""
+    backend = FakeBackend(
+        fail_rate=args.fail_rate,
+        overrides={'wget': {'latency': args.latency}, 'apt': {'latency': args.latency * 2}}
+    )
+    apps = {f"app{i}": _fake_app(i) for i in range(args.apps)}
+    results = {}
+    with backend.activate():
+        for mode, merged in (('merged', True), ('sequential', False)):
+            engine = _make_engine({}, apps)
+            start = time.perf_counter()
+            jobs = engine.install_apps(list(apps), merged=merged, force=True)
+            elapsed = time.perf_counter() - start
+            steps = [r for job in jobs.values() for r in job.results]
+            results[mode] = {
+                'wall_s': elapsed,
+                'apps': len(jobs),
+                'failed_apps': sum(not job.success for job in jobs.values()),
+                'steps': len(steps),
+                'retries': sum(r.attempts - 1 for r in steps)
+            }
+    backend.cleanup()
+    results['params'] = {'apps': args.apps, 'latency_s': args.latency, 'fail_rate': args.fail_rate}
+    return results
+
+
+def scenario_streaming(args) -> dict:
+    """بث مخرجات كبيرة عبر ناقل أحداث الواجهة: الزمن، تأخر الطابور، أقصى ذاكرة"""
+    from ui_bus import UIEventBus, OutputEvent, CallEvent
+    from output_log import OutputLog
+
+    work_dir = Path(tempfile.mkdtemp(prefix='bench-stream-'))
+    log = OutputLog(work_dir)
+    received = [0]
+    latencies = []
+
+    def on_output(text):
+        received[0] += len(text)
+        log.write(text)
+
+    bus = UIEventBus(on_output=on_output, on_clear=log.start,
+                     on_progress=lambda c, t: None, on_status=lambda m: None)
+    output_bytes = int(args.output_mb * 1024 * 1024)
+    backend = FakeBackend(output_bytes=output_bytes)
+    rss_before = _peak_rss_mb()
+
+    with backend.activate():
+        engine = _make_engine({}, {'stream': ["sudo apt install fake-stream -y"]},
+                              on_output=lambda text: bus.post(OutputEvent(text)),
+                              on_clear=lambda: None)
+        done = threading.Event()
+
+        def markers():
+            # علامات زمنية تمر عبر نفس الطابور لقياس تأخر وصول الأحداث إلى الخيط الرئيسي
+            while not done.is_set():
+                posted = time.perf_counter()
+                bus.post(CallEvent(lambda posted=posted: latencies.append(time.perf_counter() - posted)))
+                time.sleep(MARKER_INTERVAL)
+
+        start = time.perf_counter()
+        future = engine.submit(engine.install_apps_async(['stream'], force=True))
+        ticker = threading.Thread(target=markers, daemon=True)
+        ticker.start()
+        # الخيط الرئيسي يحاكي root.after في Tk
+        while not future.done():
+            bus.drain()
+            time.sleep(UI_INTERVAL)
+        done.set()
+        ticker.join()
+        bus.drain(limit=10 ** 9)
+        elapsed = time.perf_counter() - start
+        future.result()
+
+    log.close()
+    backend.cleanup()
+    return {
+        'output_mb': args.output_mb,
+        'wall_s': elapsed,
+        'throughput_mb_s': received[0] / 1024 / 1024 / elapsed if elapsed else None,
+        'bytes_received': received[0],
+        'ui_event_latency': _percentiles(latencies),
+        'peak_rss_mb': _peak_rss_mb(),
+        'peak_rss_growth_mb': _peak_rss_mb() - rss_before
+    }
+
+
+def scenario_history(args) -> dict:
+    """كلفة إضافة سجل واستعلام الصفحة الأولى مع نمو السجل"""
+    from history import HistoryStore
+    store = HistoryStore(Path(tempfile.mkdtemp(prefix='bench-history-')) / "history.db",
+                         max_rows=args.history_rows * 2)
+    steps = [{'command': 'sudo apt install fake -y', 'duration': 1.0, 'exit_code': 0}] * 4
+    sizes = sorted({0, 1000, 10000, args.history_rows})
+    results = []
+    rows = 0
+    for size in sizes:
+        if size > rows:
+            store.add_many({'app': f"app{i % 50}", 'timestamp': datetime.now().isoformat(),
+                            'success': i % 7 != 0, 'steps': steps} for i in range(size - rows))
+            rows = size
+        start = time.perf_counter()
+        for i in range(args.samples):
+            store.add(f"app{i % 50}", True, steps=steps)
+        add_s = (time.perf_counter() - start) / args.samples
+        rows += args.samples
+        start = time.perf_counter()
+        store.query(app='app7', limit=50)
+        query_s = time.perf_counter() - start
+        results.append({'rows': size, 'add_ms': add_s * 1000, 'query_page_ms': query_s * 1000})
+    store.close()
+    return {'samples_per_size': args.samples, 'sizes': results}
+
+
+def scenario_config(args) -> dict:
+    """زمن save_config على الخيط المستدعي، وزمن الكتابة الفعلية المجمعة"""
+    engine = _make_engine({}, {})
+    start = time.perf_counter()
+    for i in range(args.samples):
+        engine.config['last_update'] = str(i)
+        engine.save_config()
+    call_s = (time.perf_counter() - start) / args.samples
+    start = time.perf_counter()
+    engine.config.flush()
+    return {'samples': args.samples, 'save_config_ms': call_s * 1000,
+            'flush_ms': (time.perf_counter() - start) * 1000}
+
+
+def scenario_mirrors(args) -> dict:
+    """زمن فحص مرايا محلية بسرعات مختلفة: بدون ذاكرة النتائج ثم معها، والمرآة المختارة"""
+    from fake_mirrors import fake_mirrors
+    specs = [{'rate': 256 * 1024 * 2 ** i} for i in range(args.mirrors)]
+    with fake_mirrors(*specs) as mirrors:
+        engine = _make_engine({'mirrors': {mirrors[0].url: [m.url for m in mirrors[1:]]}}, {})
+        timings = {}
+        for name, refresh in (('cold', True), ('cached', False)):
+            start = time.perf_counter()
+            chosen = engine.run(engine.mirrors.select(refresh))
+            timings[f"{name}_ms"] = (time.perf_counter() - start) * 1000
+        mirror, result = chosen[mirrors[0].url]
+        fastest = mirrors[-1].url
+    return dict(timings, mirrors=args.mirrors, picked_fastest=mirror == fastest,
+                throughput_mb_s=(result.throughput or 0) / 1024 ** 2)
+
+
+def _traced_bytes(build) -> tuple:
+    """(الكائن الناتج، البايتات المحجوزة أثناء بنائه)"""
+    tracemalloc.start()
+    try:
+        start = tracemalloc.get_traced_memory()[0]
+        result = build()
+        return result, tracemalloc.get_traced_memory()[0] - start
+    finally:
+        tracemalloc.stop()
+
+
+def scenario_memory(args) -> dict:
+    """ذاكرة الكتالوج والسجل: سجلات __slots__ مقابل قواميس JSON كما كانت تُحمل"""
+    from records import AppSummary, AppEntry, HistoryRow
+    categories = [f"category{i}" for i in range(12)]
+
+    def raw_app(i: int) -> dict:
+        # json.loads ينشئ نصوصاً جديدة لكل مدخل، فلا مشاركة بين التطبيقات
+        return json.loads(json.dumps({
+            'category': categories[i % len(categories)], 'name': f"App {i}",
+            'description': f"Fake application number {i}", 'packages': [f"fake-app{i}", "fake-prereq"],
+            'path': f"/usr/share/system-tools/catalog/apps/app{i}.json", 'mtime': 1700000000.0 + i,
+            'commands': _fake_app(i)
+        }))
+
+    def as_entry(i: int, data: dict) -> AppEntry:
+        return AppEntry(AppSummary.from_index(f"app{i}", data), data['commands'])
+
+    dicts, dict_bytes = _traced_bytes(lambda: [raw_app(i) for i in range(args.catalog_apps)])
+    del dicts
+    records, record_bytes = _traced_bytes(lambda: [as_entry(i, raw_app(i)) for i in range(args.catalog_apps)])
+    del records
+    catalog = {'apps': args.catalog_apps,
+               'dict_bytes_per_app': dict_bytes / args.catalog_apps,
+               'record_bytes_per_app': record_bytes / args.catalog_apps}
+
+    steps = json.dumps([{'command': 'sudo apt install fake -y', 'duration': 1.0, 'exit_code': 0}] * 4)
+    base = int(time.time())
+
+    def history_rows(count: int, build):
+        # sqlite يعيد نصاً جديداً لكل صف
+        return [build(base + i, f"app{i % 50}", i % 7 != 0, steps.replace('fake', f"app{i % 50}"), None)
+                for i in range(count)]
+
+    def history_dict(ts, app_id, ok, steps_json, trace) -> dict:
+        # الصيغة السابقة لـ HistoryStore.query: وقت ISO وخطوات محللة
+        return {'app': app_id, 'timestamp': datetime.fromtimestamp(ts).isoformat(),
+                'success': ok, 'steps': json.loads(steps_json), 'trace': trace}
+
+    # القواميس تُقاس على عينة ثم يُقدر حجم المليون لأنها لا تتسع في ذاكرة أجهزة الاختبار
+    sample = min(args.history_memory_rows, 50_000)
+    _, sample_bytes = _traced_bytes(lambda: history_rows(sample, history_dict))
+    rows, row_bytes = _traced_bytes(lambda: history_rows(args.history_memory_rows, HistoryRow))
+    history = {'rows': len(rows),
+               'dict_mb_estimated': sample_bytes / sample * len(rows) / 1024 ** 2,
+               'record_mb': row_bytes / 1024 ** 2}
+    return {'catalog': catalog, 'history': history, 'peak_rss_mb': _peak_rss_mb()}
+
+
+def scenario_backends(args) -> dict:
+    """كل مدير حزم على مخرجات مسجلة: عدد الاستعلامات، والتطبيقات المتاحة، ومعاملات التثبيت في الخطة"""
+    from backends import BACKENDS
+    from planner import PREREQUISITES, APT_INSTALL
+    from package_state import PackageState
+    from recorded_backends import DPKG_STATUS, recorded_runner
+    results = {}
+    for name in BACKENDS:
+        engine = _make_engine({'package_backend': name}, {})
+        state_file = engine.config_dir / "package-db"
+        state_file.write_text(DPKG_STATUS)
+        runner = recorded_runner(name)
+        engine.backend.state_path = state_file
+        engine.backend.run = runner
+        engine.package_state = PackageState(engine.backend)
+        start = time.perf_counter()
+        installed = engine.package_state.installed()
+        upgradable = engine.package_state.upgradable()
+        query_s = time.perf_counter() - start
+        app_ids = engine.catalog.app_ids()
+        plan = engine.build_plan(app_ids, engine.no_op_packages())
+        transactions = [step.command for step in plan.steps() if step.phase in (PREREQUISITES, APT_INSTALL)]
+        results[name] = {
+            'query_calls': len(runner.calls),
+            'query_ms': query_s * 1000,
+            'installed': len(installed),
+            'upgradable': len(upgradable),
+            'apps_available': f"{len(plan.apps())}/{len(app_ids)}",
+            'install_transactions': transactions,
+            'states': {app_id: engine.app_state(app_id) for app_id in ('nmap', 'vlc', 'obs')}
+        }
+    return results
+
+
+def scenario_startup(args) -> dict:
+    """زمن بدء الواجهة (يحتاج شاشة)"""
+    from bench_startup import run_once
+    try:
+        samples = [run_once() for _ in range(args.runs)]
+    except RuntimeError as e:
+        return {'error': str(e)}
+    return {key: statistics.median(s[key] for s in samples) for key in samples[0]}
+
+
+# --- التشغيل ---
+
+def _git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR,
+                              capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return ''
+
+
+def run_child(scenario: str, argv) -> dict:
+    """تشغيل سيناريو في عملية جديدة وقراءة نتيجته"""
+    proc = subprocess.run([sys.executable, __file__, "--child", scenario] + argv,
+                          capture_output=True, text=True)
+    try:
+        return json.loads(proc.stdout.strip().splitlines()[-1])
+    except (IndexError, ValueError):
+        tail = proc.stderr.strip().splitlines()[-1:] if proc.stderr else []
+        return {'error': tail[0] if tail else f"exit code {proc.returncode}"}
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenario", action="append", choices=SCENARIOS)
+    parser.add_argument("--output", help="write the JSON results to this file too")
+    parser.add_argument("--apps", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.05, help="fake wget latency (apt is 2x)")
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    parser.add_argument("--output-mb", type=float, default=50)
+    parser.add_argument("--history-rows", type=int, default=100_000)
+    parser.add_argument("--samples", type=int, default=200)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--mirrors", type=int, default=6)
+    parser.add_argument("--catalog-apps", type=int, default=10_000)
+    parser.add_argument("--history-memory-rows", type=int, default=1_000_000)
+    parser.add_argument("--child", choices=SCENARIOS, help=argparse.SUPPRESS)
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.child:
+        result = globals()[f"scenario_{args.child}"](args)
+        print(json.dumps(result))
+        return 0
+
+    passthrough = [
+        "--apps", str(args.apps), "--latency", str(args.latency), "--fail-rate", str(args.fail_rate),
+        "--output-mb", str(args.output_mb), "--history-rows", str(args.history_rows),
+        "--samples", str(args.samples), "--runs", str(args.runs), "--mirrors", str(args.mirrors),
+        "--catalog-apps", str(args.catalog_apps), "--history-memory-rows", str(args.history_memory_rows)
+    ]
+    results = {scenario: run_child(scenario, passthrough) for scenario in args.scenario or SCENARIOS}
+    report = {
+        'suite': 'engine',
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'revision': _git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': results
+    }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        Path(args.output).write_text(text + "\n")
+    # بدء الواجهة يفشل دون شاشة؛ لا يُعد ذلك فشلاً للحزمة
+    failed = [name for name, result in results.items() if 'error' in result and name != 'startup']
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
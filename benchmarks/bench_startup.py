@@ -0,0 +1,83 @@
+"""قياس زمن بدء التشغيل حتى أول رسم للنافذة
+
+الاستخدام:
+    python benchmarks/bench_startup.py --runs 5
+
+يحتاج إلى شاشة (DISPLAY) أو خادم Xvfb. تُطبع النتائج بصيغة JSON.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+
+# يُنفذ في عملية جديدة لكل تشغيل حتى يشمل القياس استيراد الوحدات
+CHILD_SCRIPT = r"""
+import json, os, sys, time
+t0 = float(os.environ['BENCH_T0'])
+import mywork
+t_import = time.time()
+app = mywork.SystemToolsGUI()
+t_built = time.time()
+app.root.update()
+t_paint = time.time()
+
+pending = set(app.info_labels)
+loading = app.get_text('loading')
+deadline = time.time() + 30
+while pending and time.time() < deadline:
+    app.root.update()
+    pending = {k for k, label in app.info_labels.items() if label.cget('text').endswith(loading)}
+    time.sleep(0.005)
+t_probes = time.time()
+app.root.destroy()
+print(json.dumps({
+    'import': t_import - t0,
+    'construct': t_built - t0,
+    'first_paint': t_paint - t0,
+    'probes_done': t_probes - t0
+}))
+"""
+
+
+def run_once() -> dict:
+    env = dict(os.environ, BENCH_T0=repr(time.time()))
+    proc = subprocess.run(
+        [sys.executable, "-c", CHILD_SCRIPT],
+        cwd=REPO_DIR, env=env, capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr else "child failed")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    try:
+        samples = [run_once() for _ in range(args.runs)]
+    except RuntimeError as e:
+        print(json.dumps({'benchmark': 'startup', 'error': str(e)}))
+        return 1
+
+    metrics = {
+        key: {
+            'median_s': statistics.median(s[key] for s in samples),
+            'min_s': min(s[key] for s in samples),
+            'max_s': max(s[key] for s in samples)
+        }
+        for key in samples[0]
+    }
+    print(json.dumps({'benchmark': 'startup', 'runs': args.runs, 'metrics': metrics}, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,94 @@
+"""واجهة أوامر مزيفة (apt، dnf، pacman، flatpak، wget، curl، sudo) للقياس دون شبكة أو صلاحيات root
+
+كل أداة سكربت sh في مجلد مؤقت يُضاف إلى بداية PATH. السلوك يُضبط بمتغيرات البيئة
+ويمكن تجاوزه لكل أداة، مثل FAKE_WGET_LATENCY:
+    FAKE_LATENCY       ثوانٍ قبل إنهاء الأمر
+    FAKE_OUTPUT_BYTES  حجم المخرجات (أسطر بأسلوب apt)
+    FAKE_FAIL_RATE     احتمال الفشل بين 0 و 1
+"""
+import os
+import shutil
+import stat
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Optional
+
+TOOLS = ('apt', 'apt-get', 'dpkg', 'wget', 'curl', 'add-apt-repository', 'gpg',
+         'dnf', 'rpm', 'pacman', 'flatpak')
+
+_TOOL_SCRIPT = r"""#!/bin/sh
+latency=${FAKE_%(VAR)s_LATENCY:-${FAKE_LATENCY:-0}}
+bytes=${FAKE_%(VAR)s_OUTPUT_BYTES:-${FAKE_OUTPUT_BYTES:-0}}
+fail=${FAKE_%(VAR)s_FAIL_RATE:-${FAKE_FAIL_RATE:-0}}
+[ "$latency" != "0" ] && sleep "$latency"
+if [ "$bytes" -gt 0 ]; then
+    yes "Get:1 http://archive.ubuntu.com/ubuntu jammy/main amd64 %(TOOL)s [fake] 1234 kB" | head -c "$bytes"
+fi
+exec awk -v p="$fail" -v s="$$" 'BEGIN { srand(s); exit (rand() < p) ? 100 : 0 }'
+"""
+
+# sudo يمرر الأمر كما هو بعد تجاهل خياراته
+_SUDO_SCRIPT = r"""#!/bin/sh
+while [ $# -gt 0 ]; do
+    case "$1" in -*) shift ;; *) break ;; esac
+done
+exec "$@"
+"""
+
+
+class FakeBackend:
+    """مجلد أدوات مزيفة يُفعّل بإضافته إلى PATH"""
+
+    def __init__(self, latency: float = 0.0, output_bytes: int = 0, fail_rate: float = 0.0,
+                 overrides: Optional[Dict[str, Dict[str, float]]] = None):
+        self.latency = latency
+        self.output_bytes = output_bytes
+        self.fail_rate = fail_rate
+        # {الأداة: {'latency': ..., 'output_bytes': ..., 'fail_rate': ...}}
+        self.overrides = overrides or {}
+        self.bin_dir: Optional[Path] = None
+
+    def create(self) -> Path:
+        self.bin_dir = Path(tempfile.mkdtemp(prefix='fake-backend-'))
+        for tool in TOOLS:
+            var = tool.upper().replace('-', '_')
+            self._write(tool, _TOOL_SCRIPT % {'VAR': var, 'TOOL': tool})
+        self._write('sudo', _SUDO_SCRIPT)
+        return self.bin_dir
+
+    def _write(self, name: str, script: str):
+        path = self.bin_dir / name
+        path.write_text(script)
+        path.chmod(path.stat().st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+
+    def environment(self) -> Dict[str, str]:
+        env = {
+            'FAKE_LATENCY': str(self.latency),
+            'FAKE_OUTPUT_BYTES': str(int(self.output_bytes)),
+            'FAKE_FAIL_RATE': str(self.fail_rate)
+        }
+        for tool, values in self.overrides.items():
+            var = tool.upper().replace('-', '_')
+            for key, value in values.items():
+                env[f'FAKE_{var}_{key.upper()}'] = str(int(value) if key == 'output_bytes' else value)
+        return env
+
+    @contextmanager
+    def activate(self):
+        """تفعيل الأدوات المزيفة لهذه العملية وأبنائها ثم استعادة البيئة"""
+        if self.bin_dir is None:
+            self.create()
+        saved = dict(os.environ)
+        os.environ.update(self.environment())
+        os.environ['PATH'] = f"{self.bin_dir}{os.pathsep}{saved.get('PATH', '')}"
+        try:
+            yield self
+        finally:
+            os.environ.clear()
+            os.environ.update(saved)
+
+    def cleanup(self):
+        if self.bin_dir is not None:
+            shutil.rmtree(self.bin_dir, ignore_errors=True)
+            self.bin_dir = None
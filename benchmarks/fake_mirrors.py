@@ -0,0 +1,79 @@
+"""مرايا HTTP محلية بسرعة وتأخير محددين لاختبار فحص المرايا دون شبكة
+
+كل مرآة خادم في خيط منفصل يقدم نفس المحتوى لأي مسار ويدعم طلبات Range.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List
+
+CONTENT_SIZE = 4 * 1024 * 1024
+SEND_CHUNK = 16 * 1024
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        mirror = self.server.mirror
+        time.sleep(mirror.latency)
+        if mirror.status != 200:
+            self.send_error(mirror.status)
+            return
+        start, end = 0, CONTENT_SIZE - 1
+        header = self.headers.get('Range', '')
+        if header.startswith('bytes='):
+            first, _, last = header[6:].partition('-')
+            start, end = int(first or 0), min(int(last or end), end)
+            self.send_response(206)
+            self.send_header('Content-Range', f"bytes {start}-{end}/{CONTENT_SIZE}")
+        else:
+            self.send_response(200)
+        self.send_header('Content-Length', str(end - start + 1))
+        self.end_headers()
+        remaining = end - start + 1
+        chunk = b'x' * SEND_CHUNK
+        while remaining > 0:
+            size = min(SEND_CHUNK, remaining)
+            self.wfile.write(chunk[:size])
+            remaining -= size
+            if mirror.rate:
+                time.sleep(size / mirror.rate)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeMirror:
+    """خادم مرآة محلي: rate بالبايت في الثانية (0 دون حد)، latency قبل الرد، status لمحاكاة الأعطال"""
+
+    def __init__(self, rate: float = 0, latency: float = 0.0, status: int = 200):
+        self.rate = rate
+        self.latency = latency
+        self.status = status
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+        self.server.daemon_threads = True
+        self.server.mirror = self
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_address[1]}/ubuntu"
+
+    def start(self) -> 'FakeMirror':
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@contextmanager
+def fake_mirrors(*specs: dict):
+    """تشغيل عدة مرايا، مثل fake_mirrors({'rate': 1e6}, {'latency': 0.2})"""
+    mirrors: List[FakeMirror] = [FakeMirror(**spec).start() for spec in specs]
+    try:
+        yield mirrors
+    finally:
+        for mirror in mirrors:
+            mirror.stop()
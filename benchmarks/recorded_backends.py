@@ -0,0 +1,83 @@
+"""مخرجات مسجلة لاستعلامات مديري الحزم لتشغيل backends.py على أي جهاز Linux
+
+recorded_runner(name) يعيد دالة run تُمرر إلى المدير بدلاً من تشغيل الأدوات الحقيقية،
+ويسجل كل أمر طُلب منها في calls للتحقق من أن الاستعلام واحد لكل الحزم.
+"""
+from typing import Dict, List, Tuple
+
+DPKG_STATUS = """Package: nmap
+Status: install ok installed
+Version: 7.94+git20230807.3be01efb1+dfsg-3
+
+Package: vlc
+Status: install ok installed
+Version: 3.0.20-3
+
+Package: obs-studio
+Status: deinstall ok config-files
+Version: 29.1.3+dfsg-1
+"""
+
+RECORDED: Dict[str, Dict[Tuple[str, ...], Tuple[int, str]]] = {
+    'apt': {
+        ('apt', 'list', '--upgradable'): (0, (
+            "Listing...\n"
+            "vlc/noble-updates 3.0.21-1 amd64 [upgradable from: 3.0.20-3]\n"
+            "libc6/noble-updates 2.39-0ubuntu8.4 amd64 [upgradable from: 2.39-0ubuntu8.3]\n"
+        )),
+    },
+    'dnf': {
+        ('rpm', '-qa', '--queryformat', '%{NAME}\t%{VERSION}-%{RELEASE}\n'): (0, (
+            "nmap\t7.92-3.fc40\n"
+            "vlc\t3.0.20-12.fc40\n"
+            "glibc\t2.39-17.fc40\n"
+        )),
+        ('dnf', '-q', 'check-update'): (100, (
+            "\n"
+            "vlc.x86_64                      1:3.0.21-1.fc40              updates\n"
+            "glibc.x86_64                    2.39-22.fc40                 updates\n"
+            "Obsoleting Packages\n"
+            "grub2-tools.x86_64              1:2.06-121.fc40              updates\n"
+        )),
+    },
+    'pacman': {
+        ('pacman', '-Q'): (0, (
+            "nmap 7.95-2\n"
+            "vlc 3.0.21-7\n"
+            "glibc 2.40+r16+gaa533d58ff-2\n"
+        )),
+        ('checkupdates',): (0, (
+            "vlc 3.0.21-7 -> 3.0.21-8\n"
+            "linux 6.10.9.arch1-1 -> 6.10.10.arch1-1\n"
+        )),
+        ('pacman', '-Qu'): (0, (
+            "vlc 3.0.21-7 -> 3.0.21-8\n"
+            "linux 6.10.9.arch1-1 -> 6.10.10.arch1-1 [ignored]\n"
+        )),
+    },
+    'flatpak': {
+        ('flatpak', 'list', '--app', '--columns=application,version'): (0, (
+            "org.videolan.VLC\t3.0.21\n"
+            "com.obsproject.Studio\t30.2.3\n"
+        )),
+        ('flatpak', 'remote-ls', '--updates', '--app', '--columns=application,version'): (0, (
+            "com.obsproject.Studio\t30.2.4\n"
+        )),
+    },
+}
+
+
+class RecordedRunner:
+    """بديل run_query يعيد المخرجات المسجلة، ورمز 127 لأي أمر غير مسجل"""
+
+    def __init__(self, name: str):
+        self.outputs = RECORDED[name]
+        self.calls: List[Tuple[str, ...]] = []
+
+    def __call__(self, argv: List[str]) -> Tuple[int, str]:
+        self.calls.append(tuple(argv))
+        return self.outputs.get(tuple(argv), (127, ''))
+
+
+def recorded_runner(name: str) -> RecordedRunner:
+    return RecordedRunner(name)
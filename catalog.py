@@ -0,0 +1,208 @@
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from package_state import app_packages
+from records import AppSummary, AppEntry
+
+try:
+    import tomllib
+except ImportError:  # Python < 3.11
+    tomllib = None
+
+# مجلد الكتالوج المرفق مع البرنامج
+BUILTIN_CATALOG_DIR = Path(__file__).resolve().parent / "catalog"
+INDEX_VERSION = 2
+CATALOG_SUFFIXES = ('.json', '.toml')
+
+logger = logging.getLogger(__name__)
+
+
+def _read_entry(path: Path) -> dict:
+    """قراءة ملف تطبيق واحد بصيغة JSON أو TOML"""
+    if path.suffix == '.toml':
+        if tomllib is None:
+            raise RuntimeError(f"TOML catalog entries need Python 3.11+: {path}")
+        with open(path, 'rb') as f:
+            return tomllib.load(f)
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+class Catalog:
+    """كتالوج التطبيقات: ملف لكل تطبيق وفهرس مخزن مؤقتاً يُبطل حسب mtime"""
+
+    def __init__(self, index_file: Path, sources: Optional[List[Path]] = None):
+        self.index_file = index_file
+        # المصادر اللاحقة تتجاوز السابقة (كتالوج المستخدم فوق الكتالوج المرفق)
+        self.sources = [Path(s) for s in (sources or [BUILTIN_CATALOG_DIR])]
+        self._index: Optional[dict] = None
+        self._entries: Dict[str, AppEntry] = {}
+        self._package_map: Optional[Dict[str, dict]] = None
+
+    # --- الفهرس ---
+
+    def _app_dirs(self) -> List[Path]:
+        return [source / "apps" for source in self.sources if (source / "apps").is_dir()]
+
+    def _source_stamps(self) -> Dict[str, float]:
+        """بصمة المصادر: mtime لكل مجلد تطبيقات وملف فئات"""
+        stamps = {}
+        for source in self.sources:
+            for path in (source / "apps", source / "categories.json"):
+                try:
+                    stamps[str(path)] = path.stat().st_mtime
+                except FileNotFoundError:
+                    continue
+        return stamps
+
+    @property
+    def index(self) -> dict:
+        if self._index is None:
+            self._index = self._load_index()
+        return self._index
+
+    def _load_index(self) -> dict:
+        """تحميل الفهرس المخزن أو إعادة بنائه إذا تغيرت المصادر"""
+        stamps = self._source_stamps()
+        try:
+            with open(self.index_file, encoding='utf-8') as f:
+                index = json.load(f)
+            if index.get('version') == INDEX_VERSION and index.get('stamps') == stamps:
+                index['apps'] = {app_id: AppSummary.from_index(app_id, data)
+                                 for app_id, data in index['apps'].items()}
+                return index
+        except (OSError, ValueError, KeyError):
+            pass
+        index = self._build_index(stamps)
+        self._write_index(index)
+        return index
+
+    def _build_index(self, stamps: Dict[str, float]) -> dict:
+        """مسح ملفات التطبيقات وبناء فهرس مختصر بدون الأوامر"""
+        apps = {}
+        for apps_dir in self._app_dirs():
+            for path in sorted(apps_dir.iterdir()):
+                if path.suffix not in CATALOG_SUFFIXES:
+                    continue
+                try:
+                    entry = _read_entry(path)
+                except Exception as e:
+                    logger.error(f"Skipping invalid catalog entry {path}: {e}")
+                    continue
+                apps[path.stem] = AppSummary(
+                    path.stem,
+                    entry.get('category', 'other'),
+                    entry.get('name', path.stem),
+                    entry.get('description', ''),
+                    app_packages(entry),
+                    str(path),
+                    path.stat().st_mtime
+                )
+
+        order = []
+        for source in self.sources:
+            try:
+                with open(source / "categories.json", encoding='utf-8') as f:
+                    order.extend(c for c in json.load(f) if c not in order)
+            except (OSError, ValueError):
+                continue
+        used = {info.category for info in apps.values()}
+        categories = [c for c in order if c in used] + sorted(used - set(order))
+
+        return {'version': INDEX_VERSION, 'stamps': stamps, 'categories': categories, 'apps': apps}
+
+    def _write_index(self, index: dict):
+        """كتابة الفهرس بشكل ذري"""
+        try:
+            self.index_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.index_file.with_suffix('.tmp')
+            data = dict(index, apps={app_id: info.to_index() for app_id, info in index['apps'].items()})
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(data, f, separators=(',', ':'))
+            os.replace(tmp, self.index_file)
+        except OSError as e:
+            logger.error(f"Failed to write catalog index: {e}")
+
+    def refresh(self):
+        """إعادة بناء الفهرس وإفراغ الذاكرة المؤقتة"""
+        self._index = self._build_index(self._source_stamps())
+        self._write_index(self._index)
+        self._entries.clear()
+        self._package_map = None
+
+    # --- الاستعلام ---
+
+    def categories(self) -> List[str]:
+        """أسماء الفئات بالترتيب"""
+        return list(self.index['categories'])
+
+    def apps(self, category: str) -> Dict[str, AppSummary]:
+        """ملخصات تطبيقات الفئة (الاسم والوصف والحزم، بدون الأوامر)"""
+        return {app_id: info for app_id, info in self.index['apps'].items()
+                if info.category == category}
+
+    def app_ids(self) -> List[str]:
+        return list(self.index['apps'])
+
+    def __contains__(self, app_id: str) -> bool:
+        return app_id in self.index['apps']
+
+    def summary(self, app_id: str) -> Optional[AppSummary]:
+        return self.index['apps'].get(app_id)
+
+    def load(self, app_id: str) -> Optional[AppEntry]:
+        """تحميل تفاصيل التطبيق الكاملة (مع الأوامر) عند أول استخدام"""
+        entry = self._entries.get(app_id)
+        if entry is not None:
+            return entry
+        info = self.summary(app_id)
+        if info is None:
+            return None
+        path = Path(info.path)
+        try:
+            data = _read_entry(path)
+        except Exception as e:
+            logger.error(f"Failed to load catalog entry {app_id}: {e}")
+            return None
+        if path.stat().st_mtime != info.mtime:
+            # تعديل داخل الملف لا يغير mtime المجلد؛ نحدث الفهرس لهذا المدخل فقط
+            self.index['apps'][app_id] = info = AppSummary(
+                app_id, data.get('category', info.category), data.get('name', app_id),
+                data.get('description', ''), app_packages(data), info.path, path.stat().st_mtime
+            )
+            self._write_index(self.index)
+        entry = AppEntry(info, data.get('commands', []), data.get('checksums'), data.get('backend_commands'))
+        self._entries[app_id] = entry
+        return entry
+
+    def package_map(self) -> Dict[str, dict]:
+        """{الاسم المنطقي: {مدير الحزم: الاسم الفعلي أو قائمة أو null}} من packages.json في كل مصدر"""
+        if self._package_map is None:
+            self._package_map = {}
+            for source in self.sources:
+                try:
+                    with open(source / "packages.json", encoding='utf-8') as f:
+                        data = json.load(f)
+                except FileNotFoundError:
+                    continue
+                except (OSError, ValueError) as e:
+                    logger.error(f"Skipping invalid package map {source / 'packages.json'}: {e}")
+                    continue
+                for package, names in data.items():
+                    self._package_map.setdefault(package, {}).update(names)
+        return self._package_map
+
+
+def load_translations(lang: str, sources: Optional[List[Path]] = None) -> Dict[str, str]:
+    """تحميل الترجمات لغة واحدة من مصادر الكتالوج"""
+    translations = {}
+    for source in sources or [BUILTIN_CATALOG_DIR]:
+        try:
+            with open(Path(source) / "translations" / f"{lang}.json", encoding='utf-8') as f:
+                translations.update(json.load(f))
+        except (OSError, ValueError):
+            continue
+    return translations
@@ -0,0 +1,176 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Optional
+
+from planner import parse_apt_command
+
+CHECKPOINT = 'checkpoint'
+MARKER = 'marker'
+
+# نقاط الحفظ الأقدم من هذا تُهمل (مثلاً apt update من محاولة قبل أيام)
+DEFAULT_MAX_AGE_HOURS = 24
+
+APT_SOURCES = [Path('/etc/apt/sources.list'), Path('/etc/apt/sources.list.d')]
+
+# الملف الذي يكتبه الأمر: curl -o / -fsSLo، wget -O، gpg -o، tee
+_OUTPUT_FILE = re.compile(
+    r'(?:\s-[A-Za-z]*o|\s-O|\s--output(?:-document)?|\btee(?:\s+-a)?)\s+(/[^\s;&|>]+)'
+)
+# التنزيل إلى ملف مؤقت ثم نقله: الأثر هو وجهة mv الأخيرة لا الملف المؤقت
+_MOVE_TARGET = re.compile(r'\bmv\s+(?:-\S+\s+)*\S+\s+(/[^\s;&|>]+)\s*$')
+_APT_REPOSITORY = re.compile(r'add-apt-repository\s+(.+)$')
+_REPO_URL = re.compile(r'https?://\S+')
+
+
+def step_key(job_id: str, command: str) -> str:
+    """مفتاح ثابت للخطوة من اسم المهمة ونص الأمر الأصلي"""
+    return hashlib.sha256(f"{job_id}\0{command}".encode()).hexdigest()[:32]
+
+
+def _sources_mention(url: str) -> bool:
+    """هل يوجد مستودع apt يحتوي الرابط في sources.list أو sources.list.d"""
+    files = []
+    for path in APT_SOURCES:
+        if path.is_dir():
+            files.extend(p for p in path.iterdir() if p.suffix in ('.list', '.sources'))
+        elif path.is_file():
+            files.append(path)
+    for path in files:
+        try:
+            if url in path.read_text(errors='replace'):
+                return True
+        except OSError:
+            continue
+    return False
+
+
+def marker_satisfied(command: str, installed: Optional[Callable[[], Iterable[str]]] = None) -> bool:
+    """علامات عدم التكرار: المفتاح موجود، المستودع مضاف، الحزم مثبتة"""
+    apt = parse_apt_command(command)
+    if apt is not None:
+        action, packages, _ = apt
+        if action != 'install' or installed is None or not packages:
+            return False
+        if any(p.startswith(('.', '/')) or p.endswith('.deb') for p in packages):
+            return False
+        return set(packages).issubset(installed())
+
+    match = _APT_REPOSITORY.search(command)
+    if match:
+        url = _REPO_URL.search(match.group(1))
+        return bool(url) and _sources_mention(url.group(0).rstrip("'\""))
+
+    moved = _MOVE_TARGET.search(command)
+    outputs = [moved.group(1)] if moved else _OUTPUT_FILE.findall(command)
+    if outputs:
+        path = Path(outputs[-1])
+        try:
+            return path.stat().st_size > 0
+        except OSError:
+            return False
+    return False
+
+
+class CheckpointStore:
+    """نقاط حفظ الخطوات المكتملة لكل مهمة، تُكتب بشكل ذري بعد كل خطوة"""
+
+    def __init__(self, path: Path, installed: Optional[Callable[[], Iterable[str]]] = None,
+                 use_markers: bool = True, max_age_hours: float = DEFAULT_MAX_AGE_HOURS):
+        self.path = Path(path)
+        self.max_age = max_age_hours * 3600
+        self.installed = installed
+        self.use_markers = use_markers
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, Dict[str, dict]] = self._load()
+
+    def _load(self) -> Dict[str, Dict[str, dict]]:
+        try:
+            with open(self.path) as f:
+                jobs = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        # الخطوات المنتهية الصلاحية لا تُستأنف؛ تُحذف مع مفاتيح عمليات انقطعت قبل أن تمسحها
+        now = time.time()
+        jobs = {job_id: {key: entry for key, entry in steps.items() if now - entry['completed_at'] < self.max_age}
+                for job_id, steps in jobs.items()}
+        return {job_id: steps for job_id, steps in jobs.items() if steps}
+
+    def _save(self):
+        """كتابة ذرية: ملف مؤقت ثم fsync ثم os.replace"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix('.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(self._jobs, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+
+    def completed(self, job_id: str, command: str,
+                  installed: Optional[Callable[[], Iterable[str]]] = None) -> Optional[str]:
+        """سبب اعتبار الخطوة منجزة (checkpoint أو marker) أو None"""
+        with self._lock:
+            entry = self._jobs.get(job_id, {}).get(step_key(job_id, command))
+            if entry and time.time() - entry['completed_at'] < self.max_age:
+                return CHECKPOINT
+        if self.use_markers and marker_satisfied(command, installed or self.installed):
+            return MARKER
+        return None
+
+    def mark_done(self, job_id: str, command: str):
+        with self._lock:
+            self._jobs.setdefault(job_id, {})[step_key(job_id, command)] = {
+                'command': command,
+                'completed_at': time.time()
+            }
+            self._save()
+
+    def clear(self, job_id: str):
+        """حذف نقاط حفظ مهمة اكتملت بنجاح"""
+        with self._lock:
+            if self._jobs.pop(job_id, None) is not None:
+                self._save()
+
+    def scope(self, installed: Iterable[str], private: Iterable[str] = ()) -> 'CheckpointScope':
+        """نقاط الحفظ لعملية واحدة مع الحزم المثبتة بأحدث إصدار عند بدئها
+
+        مهام private (مثل مهمة apt المدمجة) تُحفظ بمفتاح خاص بهذه العملية.
+        """
+        return CheckpointScope(self, installed, private)
+
+    def pending(self) -> Dict[str, int]:
+        """المهام غير المكتملة وعدد خطواتها المنجزة"""
+        with self._lock:
+            return {job_id: len(steps) for job_id, steps in self._jobs.items() if steps}
+
+
+class CheckpointScope:
+    """واجهة CheckpointStore لعملية تثبيت واحدة
+
+    علامات الحزم تعتمد على مجموعة محسوبة قبل بدء العملية: قائمة الترقيات المخزنة تبطل
+    بعد أول خطوة تغير قاعدة الحزم (apt update أو تثبيت المتطلبات)، فلو أُعيد حسابها
+    لاعتُبرت الحزم القابلة للترقية محدثة وتُخطيت ترقيتها.
+    """
+
+    def __init__(self, store: CheckpointStore, installed: Iterable[str], private: Iterable[str] = ()):
+        self.store = store
+        self.installed = frozenset(installed)
+        token = uuid.uuid4().hex[:12]
+        self._keys = {job_id: f"{job_id}@{token}" for job_id in private}
+
+    def _key(self, job_id: str) -> str:
+        return self._keys.get(job_id, job_id)
+
+    def completed(self, job_id: str, command: str) -> Optional[str]:
+        return self.store.completed(self._key(job_id), command, lambda: self.installed)
+
+    def mark_done(self, job_id: str, command: str):
+        self.store.mark_done(self._key(job_id), command)
+
+    def clear(self, job_id: str):
+        self.store.clear(self._key(job_id))
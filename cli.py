@@ -0,0 +1,270 @@
+"""واجهة سطر الأوامر لمدير تثبيت أدوات النظام (بدون Tk)
+
+أمثلة:
+    python cli.py install vscode docker --parallel
+    python cli.py install vscode docker --dry-run
+    python cli.py update
+    python cli.py update --plan
+    python cli.py update --only firefox curl
+    python cli.py history --json --app docker
+    python cli.py list
+    python cli.py --backend dnf install vlc --dry-run
+    python cli.py fleet --inventory hosts.txt vscode docker
+    python cli.py logs --app docker --since 2h
+    python cli.py mirrors --refresh
+"""
+import argparse
+import json
+import re
+import signal
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+
+from backends import BACKENDS
+from engine import InstallerEngine, DEFAULT_CONFIG_DIR
+from fleet import load_inventory
+from log_pipeline import query_logs
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2
+EXIT_INTERRUPTED = 130
+
+_RELATIVE_TIME = re.compile(r'^(\d+(?:\.\d+)?)([smhd])$')
+_UNIT_SECONDS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def _write(text: str):
+    sys.stdout.write(text)
+    sys.stdout.flush()
+
+
+def _make_engine(args) -> InstallerEngine:
+    return InstallerEngine(
+        config_dir=args.config_dir,
+        on_output=_write,
+        on_status=lambda message: None if args.quiet else print(f"== {message}", file=sys.stderr),
+        backend=args.backend
+    )
+
+
+def _install_signal_handler(engine: InstallerEngine):
+    """Ctrl+C يلغي الأوامر الجارية بدلاً من ترك عمليات معلقة"""
+    interrupted = []
+
+    def handler(signum, frame):
+        interrupted.append(signum)
+        engine.cancel()
+
+    signal.signal(signal.SIGINT, handler)
+    signal.signal(signal.SIGTERM, handler)
+    return interrupted
+
+
+def cmd_install(args) -> int:
+    engine = _make_engine(args)
+    unknown = engine.unknown_apps(args.apps)
+    if unknown:
+        print(f"Unknown app(s): {', '.join(unknown)}", file=sys.stderr)
+        return EXIT_USAGE
+    if args.dry_run:
+        skip = set() if args.force else engine.no_op_packages()
+        up_to_date = engine.up_to_date_apps(args.apps, skip)
+        for app_id in up_to_date:
+            print(f"# {app_id}: {engine.get_text('already_installed')}")
+        _write(engine.build_plan([a for a in args.apps if a not in up_to_date], skip).describe())
+        return EXIT_OK
+    interrupted = _install_signal_handler(engine)
+    results = engine.install_apps(args.apps, merged=args.parallel, force=args.force)
+    if interrupted:
+        return EXIT_INTERRUPTED
+    return EXIT_OK if all(job.success for job in results.values()) else EXIT_FAILED
+
+
+def cmd_update(args) -> int:
+    engine = _make_engine(args)
+    interrupted = _install_signal_handler(engine)
+    if args.incremental or args.plan or args.only:
+        try:
+            plan = engine.run(engine.plan_update_async())
+        except RuntimeError as e:
+            print(f"Package index update failed: {e}", file=sys.stderr)
+            return EXIT_INTERRUPTED if interrupted else EXIT_FAILED
+        if args.plan or interrupted:
+            return EXIT_INTERRUPTED if interrupted else EXIT_OK
+        unknown = sorted(set(args.only or []) - set(plan.updates))
+        if unknown:
+            print(f"Not upgradable: {', '.join(unknown)}", file=sys.stderr)
+            return EXIT_USAGE
+        job = engine.incremental_update(plan, args.only)
+    else:
+        job = engine.system_update()
+    if interrupted:
+        return EXIT_INTERRUPTED
+    return EXIT_OK if job.success else EXIT_FAILED
+
+
+def cmd_fleet(args) -> int:
+    engine = _make_engine(args)
+    unknown = engine.unknown_apps(args.apps)
+    if unknown:
+        print(f"Unknown app(s): {', '.join(unknown)}", file=sys.stderr)
+        return EXIT_USAGE
+    try:
+        hosts = load_inventory(args.inventory)
+    except (OSError, ValueError) as e:
+        print(f"Invalid inventory: {e}", file=sys.stderr)
+        return EXIT_USAGE
+    if not hosts:
+        print("Inventory is empty", file=sys.stderr)
+        return EXIT_USAGE
+    interrupted = _install_signal_handler(engine)
+    results = engine.fleet_install(args.apps, hosts, max_hosts=args.max_hosts)
+    if interrupted:
+        return EXIT_INTERRUPTED
+    ok = all(job.success for host_results in results.values() for job in host_results.values())
+    return EXIT_OK if ok else EXIT_FAILED
+
+
+def cmd_history(args) -> int:
+    engine = _make_engine(args)
+    success = {'success': True, 'failed': False}.get(args.status)
+    entries = engine.history.query(app=args.app, success=success, limit=args.limit)
+    if args.json:
+        json.dump([entry.to_dict() for entry in entries], sys.stdout, indent=2)
+        sys.stdout.write("\n")
+    else:
+        for entry in entries:
+            status = "Success" if entry.success else "Failed"
+            print(f"{entry.timestamp} - {entry.app} - {status}")
+    return EXIT_OK
+
+
+def cmd_list(args) -> int:
+    engine = _make_engine(args)
+    if args.upgradable:
+        engine.package_state.upgradable()
+    for category in engine.catalog.categories():
+        print(f"{category}:")
+        for app_id, info in engine.catalog.apps(category).items():
+            state = engine.app_state(app_id)
+            print(f"  {app_id:<16} {state:<11} {engine.app_title(info)} - {info.description}")
+    return EXIT_OK
+
+
+def cmd_mirrors(args) -> int:
+    engine = _make_engine(args)
+    if engine.mirrors is None:
+        print("No mirror candidates configured ('mirrors' in config.json)", file=sys.stderr)
+        return EXIT_USAGE
+    ranking = engine.run(engine.mirrors.probe_all(refresh=args.refresh))
+    for base, results in ranking.items():
+        print(f"{base}:")
+        for i, (mirror, result) in enumerate(results):
+            mark = '*' if i == 0 and result.ok else ' '
+            print(f" {mark} {mirror:<48} {result.describe()}")
+    return EXIT_OK
+
+
+def _parse_time(value: str) -> float:
+    """وقت مطلق بصيغة ISO أو نسبي مثل 30m و 2h و 1d"""
+    match = _RELATIVE_TIME.match(value)
+    if match:
+        return time.time() - float(match.group(1)) * _UNIT_SECONDS[match.group(2)]
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid time: {value}")
+
+
+def cmd_logs(args) -> int:
+    # لا يُنشأ محرك هنا حتى لا يكتب الاستعلام نفسه في السجل
+    log_dir = Path(args.config_dir or DEFAULT_CONFIG_DIR) / "logs"
+    records = query_logs(log_dir, app=args.app, since=args.since, until=args.until, level=args.level)
+    try:
+        for record in records:
+            if args.json:
+                print(json.dumps(record, ensure_ascii=False))
+                continue
+            when = datetime.fromtimestamp(record['ts']).isoformat(sep=' ', timespec='seconds')
+            extra = ''
+            if 'exit_code' in record:
+                extra = f" (exit {record['exit_code']}, {record.get('duration', 0):.1f}s)"
+            print(f"{when} - {record['level']} - {record['msg']}{extra}")
+    except BrokenPipeError:
+        pass
+    return EXIT_OK
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="system-tools",
+        description="System Tools Installation Manager (headless)"
+    )
+    parser.add_argument("--config-dir", help="override ~/.config/system_tools")
+    parser.add_argument("-q", "--quiet", action="store_true", help="do not print status lines")
+    parser.add_argument("--backend", choices=sorted(BACKENDS),
+                        help="package manager to use (default: detected from the distribution)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    install = sub.add_parser("install", help="install one or more catalog apps")
+    install.add_argument("apps", nargs="+")
+    install.add_argument("--parallel", action="store_true",
+                         help="merge apps into one plan and run setup steps concurrently")
+    install.add_argument("--dry-run", action="store_true", help="print the merged plan and exit")
+    install.add_argument("--force", action="store_true",
+                         help="run every step even if the packages are already installed")
+    install.set_defaults(func=cmd_install)
+
+    update = sub.add_parser("update", help="refresh the package index, upgrade and autoremove")
+    update.add_argument("--incremental", action="store_true",
+                        help="upgrade only what changed since the last update, downloading in parallel")
+    update.add_argument("--plan", action="store_true",
+                        help="print the upgradable packages with download sizes and exit")
+    update.add_argument("--only", nargs="+", metavar="PACKAGE",
+                        help="upgrade just these packages (implies --incremental)")
+    update.set_defaults(func=cmd_update)
+
+    fleet = sub.add_parser("fleet", help="install apps on every host of an inventory over ssh")
+    fleet.add_argument("--inventory", required=True,
+                       help="hosts file: one '[name] user@host[:port]' per line, or a .json list")
+    fleet.add_argument("--max-hosts", type=int, help="hosts processed concurrently (default 8)")
+    fleet.add_argument("apps", nargs="+")
+    fleet.set_defaults(func=cmd_fleet)
+
+    history = sub.add_parser("history", help="show installation history")
+    history.add_argument("--json", action="store_true")
+    history.add_argument("--app")
+    history.add_argument("--status", choices=["success", "failed"])
+    history.add_argument("--limit", type=int, default=50)
+    history.set_defaults(func=cmd_history)
+
+    list_apps = sub.add_parser("list", help="list catalog apps with their installed state")
+    list_apps.add_argument("--upgradable", action="store_true",
+                           help="ask the package manager which installed apps have updates (slower)")
+    list_apps.set_defaults(func=cmd_list)
+
+    mirrors = sub.add_parser("mirrors", help="probe the configured mirrors and rank them by speed")
+    mirrors.add_argument("--refresh", action="store_true", help="ignore cached probe results")
+    mirrors.set_defaults(func=cmd_mirrors)
+
+    logs = sub.add_parser("logs", help="filter the engine log by app and time range")
+    logs.add_argument("--app")
+    logs.add_argument("--since", type=_parse_time, help="ISO time or relative (30m, 2h, 1d)")
+    logs.add_argument("--until", type=_parse_time, help="ISO time or relative (30m, 2h, 1d)")
+    logs.add_argument("--level", choices=["DEBUG", "INFO", "WARNING", "ERROR"])
+    logs.add_argument("--json", action="store_true", help="print raw JSON-lines records")
+    logs.set_defaults(func=cmd_logs)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
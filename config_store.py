@@ -0,0 +1,235 @@
+import atexit
+import copy
+import fcntl
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, MutableMapping, Optional
+
+SCHEMA_VERSION = 1
+SCHEMA_KEY = 'schema_version'
+
+# تأخير الكتابة بعد آخر تعديل، وأقصى تأخير لسلسلة تعديلات متتالية
+WRITE_DELAY = 0.5
+MAX_WRITE_DELAY = 5.0
+# إعادة محاولة الكتابة الفاشلة بتأخير يتضاعف حتى هذا الحد
+MAX_RETRY_DELAY = 60.0
+
+_DELETED = object()
+
+logger = logging.getLogger(__name__)
+
+
+def _add_defaults(config: dict):
+    """الإعدادات غير المرقمة: القيم التي كان load_config يكتبها عند إنشاء الملف"""
+    config.setdefault('theme', 'dark')
+    config.setdefault('last_update', None)
+
+
+# {الإصدار الناتج: دالة تعدل القاموس في مكانه}
+MIGRATIONS: Dict[int, Callable[[dict], None]] = {
+    1: _add_defaults,
+}
+
+
+def migrate(config: dict) -> bool:
+    """ترقية القاموس إلى SCHEMA_VERSION بالترتيب؛ يعيد True إن تغير"""
+    version = config.get(SCHEMA_KEY, 0)
+    if version >= SCHEMA_VERSION:
+        if version > SCHEMA_VERSION:
+            logger.warning(f"Config schema {version} is newer than {SCHEMA_VERSION}; unknown keys are kept")
+        return False
+    for target in range(version + 1, SCHEMA_VERSION + 1):
+        MIGRATIONS[target](config)
+        config[SCHEMA_KEY] = target
+    return True
+
+
+class ConfigStore(MutableMapping):
+    """نسخة الإعدادات في الذاكرة؛ التعديلات تُجمع وتُكتب في الخلفية بكتابة ذرية واحدة
+
+    الكتابة تدمج المفاتيح المعدلة فقط مع محتوى الملف تحت قفل ملف، فلا تمحو
+    نسخة أخرى من البرنامج تعديلات لم تلمسها هذه النسخة.
+    """
+
+    def __init__(self, path: Path, delay: float = WRITE_DELAY, max_delay: float = MAX_WRITE_DELAY):
+        self.path = Path(path)
+        self.lock_path = self.path.with_name(self.path.name + '.lock')
+        self.delay = delay
+        self.max_delay = max_delay
+        self._cond = threading.Condition(threading.RLock())
+        self._flush_lock = threading.Lock()
+        self._dirty: Dict[str, Any] = {}
+        self._deadline: Optional[float] = None
+        self._first_change: Optional[float] = None
+        self._writer: Optional[threading.Thread] = None
+        self._failures = 0
+        self._closed = False
+        self._data = self._load()
+        self._migrate()
+        atexit.register(self.close)
+
+    # --- القراءة ---
+
+    @contextmanager
+    def _file_lock(self, mode: int):
+        """قفل على ملف جانبي يمنع نسختين من البرنامج من الكتابة معاً"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.lock_path, 'a') as f:
+            fcntl.flock(f, mode)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _read(self) -> dict:
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return {}
+        if not isinstance(data, dict):
+            raise ValueError("config root is not an object")
+        return data
+
+    def _load(self) -> dict:
+        with self._file_lock(fcntl.LOCK_SH):
+            try:
+                return self._read()
+            except ValueError as e:
+                # ملف تالف يُحفظ جانباً بدلاً من استبداله بصمت
+                logger.error(f"Failed to load config: {e}")
+                self.path.replace(self.path.with_name(self.path.name + '.corrupt'))
+            except OSError as e:
+                logger.error(f"Failed to load config: {e}")
+        return {}
+
+    def _migrate(self):
+        """ترقية المخطط وكتابة المفاتيح التي غيرتها الترقيات فوراً"""
+        before = copy.deepcopy(self._data)
+        if migrate(self._data) or not self.path.exists():
+            for key, value in self._data.items():
+                if before.get(key, _DELETED) != value:
+                    self._dirty[key] = copy.deepcopy(value)
+            self.flush()
+
+    # --- واجهة القاموس ---
+
+    def __getitem__(self, key: str) -> Any:
+        with self._cond:
+            return self._data[key]
+
+    def __setitem__(self, key: str, value: Any):
+        with self._cond:
+            self._data[key] = value
+            self._dirty[key] = copy.deepcopy(value)
+            self._schedule()
+
+    def __delitem__(self, key: str):
+        with self._cond:
+            del self._data[key]
+            self._dirty[key] = _DELETED
+            self._schedule()
+
+    def __iter__(self) -> Iterator[str]:
+        with self._cond:
+            return iter(list(self._data))
+
+    def __len__(self) -> int:
+        with self._cond:
+            return len(self._data)
+
+    def save(self, *keys: str):
+        """تسجيل مفاتيح عُدلت قيمها المتداخلة في مكانها ثم جدولة الكتابة"""
+        with self._cond:
+            for key in keys:
+                self._dirty[key] = copy.deepcopy(self._data[key]) if key in self._data else _DELETED
+            if self._dirty:
+                self._schedule()
+
+    # --- الكتابة ---
+
+    def _schedule(self):
+        now = time.monotonic()
+        if self._first_change is None:
+            self._first_change = now
+        self._deadline = min(now + self.delay, self._first_change + self.max_delay)
+        if self._writer is None and not self._closed:
+            self._writer = threading.Thread(target=self._write_loop, name="config-writer", daemon=True)
+            self._writer.start()
+        self._cond.notify()
+
+    def _retry(self):
+        """جدولة الكتابة من جديد بعد فشلها دون انتظار تعديل آخر"""
+        self._failures += 1
+        delay = min(self.delay * 2 ** self._failures, MAX_RETRY_DELAY)
+        self._deadline = time.monotonic() + delay
+        self._first_change = self._first_change or time.monotonic()
+        if self._writer is None and not self._closed:
+            self._writer = threading.Thread(target=self._write_loop, name="config-writer", daemon=True)
+            self._writer.start()
+        self._cond.notify()
+
+    def _write_loop(self):
+        while True:
+            with self._cond:
+                while not self._closed and (self._deadline is None or self._deadline > time.monotonic()):
+                    self._cond.wait(None if self._deadline is None else self._deadline - time.monotonic())
+                if self._closed:
+                    return
+            self.flush()
+
+    def flush(self):
+        """كتابة المفاتيح المعدلة الآن: دمج مع الملف ثم ملف مؤقت وfsync وrename"""
+        with self._flush_lock:
+            with self._cond:
+                changes, self._dirty = self._dirty, {}
+                self._deadline = self._first_change = None
+            if not changes:
+                return
+            try:
+                with self._file_lock(fcntl.LOCK_EX):
+                    try:
+                        merged = self._read()
+                    except ValueError:
+                        merged = {}
+                    for key, value in changes.items():
+                        if value is _DELETED:
+                            merged.pop(key, None)
+                        else:
+                            merged[key] = value
+                    tmp = self.path.with_suffix('.tmp')
+                    with open(tmp, 'w') as f:
+                        json.dump(merged, f, indent=4)
+                        f.flush()
+                        os.fsync(f.fileno())
+                    os.replace(tmp, self.path)
+            except OSError as e:
+                logger.error(f"Failed to save config: {e}")
+                with self._cond:
+                    # إعادة التعديلات التي لم تُستبدل بقيم أحدث ثم محاولة أخرى بعد مهلة
+                    for key, value in changes.items():
+                        self._dirty.setdefault(key, value)
+                    self._retry()
+                return
+            with self._cond:
+                self._failures = 0
+                # قيم كتبتها نسخة أخرى من البرنامج ولم تُعدل هنا
+                for key, value in merged.items():
+                    if key not in self._dirty and key not in changes:
+                        self._data[key] = value
+
+    def close(self):
+        """إيقاف الكاتب وكتابة ما تبقى"""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify()
+        if self._writer is not None:
+            self._writer.join()
+        self.flush()
@@ -0,0 +1,310 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import shlex
+import shutil
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+from typing import Callable, Dict, Optional
+from urllib.parse import urlparse
+
+DEFAULT_CACHE_DIR = Path.home() / ".cache" / "system_tools"
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+CHUNK_SIZE = 1024 * 1024
+HTTP_TIMEOUT = 30
+
+logger = logging.getLogger(__name__)
+
+
+class VerificationError(Exception):
+    """تنزيل مثبت بمجموع اختباري تعذر التحقق منه؛ لا يُشغل الأمر الأصلي بدلاً منه"""
+
+
+class ChecksumMismatch(VerificationError):
+    """المحتوى المنزل لا يطابق المجموع الاختباري المتوقع"""
+
+
+class DownloadCache:
+    """ذاكرة تنزيلات محلية معنونة بالمحتوى (sha256) مع إعادة تحقق ETag وإخلاء LRU"""
+
+    def __init__(self, root: Path = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES,
+                 mirror_dir: Optional[Path] = None):
+        self.root = Path(root)
+        self.objects_dir = self.root / "objects"
+        self.index_file = self.root / "index.json"
+        self.max_bytes = max_bytes
+        self.mirror_dir = Path(mirror_dir).expanduser() if mirror_dir else None
+        # مجاميع اختبارية معروفة مسبقاً من الكتالوج {url: sha256}
+        self.known_checksums: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._url_locks: Dict[str, threading.Lock] = {}
+        self.objects_dir.mkdir(parents=True, exist_ok=True)
+        self._index = self._load_index()
+
+    # --- الفهرس ---
+
+    def _load_index(self) -> Dict[str, dict]:
+        try:
+            with open(self.index_file) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_index(self):
+        tmp = self.index_file.with_suffix('.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(self._index, f)
+        os.replace(tmp, self.index_file)
+
+    def _object_path(self, digest: str) -> Path:
+        return self.objects_dir / digest[:2] / digest
+
+    def _url_lock(self, url: str) -> threading.Lock:
+        with self._lock:
+            return self._url_locks.setdefault(url, threading.Lock())
+
+    # --- الجلب ---
+
+    def fetch(self, url: str, sha256: Optional[str] = None) -> Path:
+        """إرجاع مسار نسخة محلية من الرابط، مع التنزيل أو إعادة التحقق عند الحاجة"""
+        sha256 = sha256 or self.known_checksums.get(url)
+        with self._url_lock(url):
+            mirrored = self._from_mirror(url, sha256)
+            if mirrored is not None:
+                return mirrored
+
+            with self._lock:
+                entry = dict(self._index.get(url) or {})
+            cached = self._object_path(entry['sha256']) if entry else None
+            if cached is not None and not cached.exists():
+                entry, cached = {}, None
+
+            request = urllib.request.Request(url, headers={'User-Agent': 'system-tools'})
+            if cached is not None:
+                if entry.get('etag'):
+                    request.add_header('If-None-Match', entry['etag'])
+                if entry.get('last_modified'):
+                    request.add_header('If-Modified-Since', entry['last_modified'])
+
+            try:
+                response = urllib.request.urlopen(request, timeout=HTTP_TIMEOUT)
+            except urllib.error.HTTPError as e:
+                if e.code == 304 and cached is not None:
+                    self._touch(url)
+                    return self._verified(cached, sha256)
+                raise
+            except (urllib.error.URLError, OSError):
+                # بدون شبكة: نستخدم النسخة المخزنة إن وجدت
+                if cached is not None:
+                    logger.warning(f"Using cached copy of {url} (revalidation failed)")
+                    self._touch(url)
+                    return self._verified(cached, sha256)
+                raise
+
+            with response:
+                path = self._store(response, sha256)
+                headers = response.headers
+            self._record(url, path, headers.get('ETag'), headers.get('Last-Modified'))
+            self.evict(keep=path.name)
+            return path
+
+    def _from_mirror(self, url: str, sha256: Optional[str]) -> Optional[Path]:
+        """البحث عن الملف في مجلد مرآة محلي: <mirror>/<host>/<path> أو <mirror>/<basename>"""
+        if self.mirror_dir is None:
+            return None
+        parsed = urlparse(url)
+        candidates = [
+            self.mirror_dir / parsed.netloc / parsed.path.lstrip('/'),
+            self.mirror_dir / Path(parsed.path).name
+        ]
+        for candidate in candidates:
+            if not candidate.is_file():
+                continue
+            # بصمة ملف المرآة في حقل etag: الملف نفسه لا يُعاد حسابه ولا نسخه في كل استدعاء
+            st = candidate.stat()
+            etag = f"mirror:{st.st_mtime_ns}:{st.st_size}"
+            with self._lock:
+                entry = dict(self._index.get(url) or {})
+            if entry.get('etag') == etag and self._object_path(entry['sha256']).exists():
+                self._touch(url)
+                return self._verified(self._object_path(entry['sha256']), sha256)
+            with open(candidate, 'rb') as f:
+                path = self._store(f, sha256)
+            self._record(url, path, etag, None)
+            self.evict(keep=path.name)
+            return path
+        return None
+
+    def _store(self, stream, sha256: Optional[str]) -> Path:
+        """نسخ المحتوى إلى ملف مؤقت مع حساب sha256 ثم نقله إلى مكانه المعنون"""
+        digest = hashlib.sha256()
+        fd, tmp_name = tempfile.mkstemp(dir=self.objects_dir, prefix='.download-')
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                while True:
+                    chunk = stream.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    digest.update(chunk)
+                    out.write(chunk)
+            actual = digest.hexdigest()
+            if sha256 and actual != sha256.lower():
+                raise ChecksumMismatch(f"expected {sha256}, got {actual}")
+            path = self._object_path(actual)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(tmp_name, path)
+            return path
+        except BaseException:
+            if os.path.exists(tmp_name):
+                os.unlink(tmp_name)
+            raise
+
+    def _verified(self, path: Path, sha256: Optional[str]) -> Path:
+        if sha256 and path.name != sha256.lower():
+            raise ChecksumMismatch(f"cached {path.name} does not match expected {sha256}")
+        return path
+
+    def _record(self, url: str, path: Path, etag: Optional[str], last_modified: Optional[str]):
+        with self._lock:
+            self._index[url] = {
+                'sha256': path.name,
+                'size': path.stat().st_size,
+                'etag': etag,
+                'last_modified': last_modified,
+                'last_used': time.time()
+            }
+            self._save_index()
+
+    def _touch(self, url: str):
+        with self._lock:
+            if url in self._index:
+                self._index[url]['last_used'] = time.time()
+                self._save_index()
+
+    # --- الإخلاء ---
+
+    def size(self) -> int:
+        with self._lock:
+            return sum({e['sha256']: e['size'] for e in self._index.values()}.values())
+
+    def evict(self, keep: Optional[str] = None):
+        """حذف الأقل استخداماً حتى يصبح الحجم تحت الحد الأقصى
+
+        keep: الكائن الذي جُلب للتو ولم يُنسخ بعد؛ لا يُحذف حتى لو تجاوز وحده الحد.
+        """
+        with self._lock:
+            objects: Dict[str, dict] = {}
+            for url, entry in self._index.items():
+                obj = objects.setdefault(entry['sha256'], {'size': entry['size'], 'last_used': 0, 'urls': []})
+                obj['last_used'] = max(obj['last_used'], entry['last_used'])
+                obj['urls'].append(url)
+            total = sum(obj['size'] for obj in objects.values())
+            for digest, obj in sorted(objects.items(), key=lambda item: item[1]['last_used']):
+                if total <= self.max_bytes:
+                    break
+                if digest == keep:
+                    continue
+                try:
+                    self._object_path(digest).unlink()
+                except FileNotFoundError:
+                    pass
+                for url in obj['urls']:
+                    del self._index[url]
+                total -= obj['size']
+            self._save_index()
+
+    def clear(self):
+        """حذف كل محتوى الذاكرة"""
+        with self._lock:
+            shutil.rmtree(self.objects_dir, ignore_errors=True)
+            self.objects_dir.mkdir(parents=True, exist_ok=True)
+            self._index = {}
+            self._save_index()
+
+
+# --- إعادة كتابة أوامر الكتالوج ---
+
+_URL = re.compile(r'^https?://')
+_SEPARATOR = re.compile(r'&&|\|\|?')
+
+
+def _split_pipeline(command: str):
+    """فصل الأمر الأول عن باقي الأنبوب أو السلسلة (| أو && أو ||)"""
+    match = _SEPARATOR.search(command)
+    if match is None:
+        return command.strip(), ''
+    return command[:match.start()].strip(), command[match.start():]
+
+
+def rewrite_command(command: str, cache: DownloadCache,
+                    mirror_url: Optional[Callable[[str], str]] = None) -> str:
+    """استبدال تنزيلات wget/curl البسيطة بنسخ من الذاكرة المحلية؛ يعيد الأمر كما هو إن لم يُفهم
+
+    mirror_url يحول الرابط إلى المرآة المختارة للتنزيل منها، والمجموع الاختباري يُؤخذ من الرابط الأصلي.
+    """
+    head, rest = _split_pipeline(command)
+    try:
+        args = shlex.split(head)
+    except ValueError:
+        return command
+
+    sudo = []
+    if args and args[0] == 'sudo':
+        sudo, args = ['sudo'], args[1:]
+    if not args or args[0] not in ('wget', 'curl'):
+        return command
+
+    tool, url, output = args[0], None, None
+    remote_name = False
+    i = 1
+    while i < len(args):
+        arg = args[i]
+        if _URL.match(arg):
+            url = arg
+        elif tool == 'wget' and arg in ('-O', '--output-document'):
+            i += 1
+            output = args[i] if i < len(args) else None
+        elif tool == 'wget' and arg.startswith('-O') and len(arg) > 2:
+            output = arg[2:]
+        elif tool == 'curl' and arg in ('-o', '--output'):
+            i += 1
+            output = args[i] if i < len(args) else None
+        elif tool == 'curl' and arg.startswith('-') and not arg.startswith('--') and arg.endswith('o'):
+            # خيارات مجمعة مثل -fsSLo PATH
+            i += 1
+            output = args[i] if i < len(args) else None
+        elif tool == 'curl' and arg.startswith('-') and not arg.startswith('--') and 'O' in arg:
+            remote_name = True
+        elif not arg.startswith('-'):
+            return command
+        i += 1
+
+    if url is None:
+        return command
+    if output is None and (tool == 'wget' or remote_name):
+        output = Path(urlparse(url).path).name
+    if tool == 'curl' and output is None and not rest:
+        return command
+
+    sha256 = cache.known_checksums.get(url)
+    source = mirror_url(url) if mirror_url else url
+    try:
+        cached = cache.fetch(source, sha256)
+    except VerificationError:
+        raise
+    except Exception as e:
+        # الرجوع إلى wget/curl الأصلي يتجاوز التحقق، فلا يُسمح به لرابط مثبت
+        if sha256:
+            raise VerificationError(f"cannot verify pinned download {url} (from {source}): {e}") from e
+        raise
+    if output in (None, '-'):
+        new_head = ['cat', str(cached)]
+    else:
+        new_head = sudo + ['cp', str(cached), output]
+    return ' '.join(shlex.quote(part) for part in new_head) + (f" {rest}" if rest else '')
@@ -0,0 +1,631 @@
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Coroutine, Dict, List, Optional
+
+from runner import STDERR, CommandResult
+from scheduler import InstallScheduler, JobResult
+from planner import InstallPlan, SHARED_JOB, parse_apt_command, run_plan_async
+from tracing import (Trace, step_summary, prune_traces, DEFAULT_MAX_TRACES, DEFAULT_TRACES_TOTAL_BYTES,
+                     DEFAULT_TRACES_RETENTION_DAYS)
+from history import HistoryStore, DEFAULT_MAX_ROWS
+from download_cache import (DownloadCache, VerificationError, DEFAULT_CACHE_DIR, DEFAULT_MAX_BYTES,
+                            rewrite_command)
+from catalog import Catalog, BUILTIN_CATALOG_DIR, load_translations
+from records import AppSummary, AppEntry
+from package_state import PackageState, UNKNOWN
+from backends import PackageBackend, APT, create_backend, detect_backend
+from checkpoints import CheckpointStore, DEFAULT_MAX_AGE_HOURS
+from config_store import ConfigStore
+from updates import UpdatePlan, UpdateSnapshot, APT_ARCHIVES, build_plan as build_update_plan
+from fleet import FleetRunner, Host, DEFAULT_MAX_HOSTS
+from mirrors import (MirrorSelector, SessionMirrors, SOURCES_LIST, SOURCES_PARTS,
+                     DEFAULT_TTL_HOURS as DEFAULT_MIRROR_TTL_HOURS, DEFAULT_PROBE_TIMEOUT)
+from log_pipeline import (start_logging, DEFAULT_MAX_BYTES as DEFAULT_LOG_BYTES,
+                          DEFAULT_MAX_AGE_HOURS as DEFAULT_LOG_AGE_HOURS,
+                          DEFAULT_TOTAL_BYTES as DEFAULT_LOG_TOTAL, DEFAULT_RETENTION_DAYS)
+
+DEFAULT_CONFIG_DIR = Path.home() / ".config" / "system_tools"
+
+SYSTEM_UPDATE_JOB = 'system-update'
+APT_INDEX_JOB = 'apt-index'
+DEFAULT_INDEX_MAX_AGE_MINUTES = 60
+
+
+def _noop(*args):
+    pass
+
+
+class InstallerEngine:
+    """محرك التثبيت والتحديث المستقل عن الواجهة؛ تستخدمه الواجهة الرسومية وسطر الأوامر"""
+
+    def __init__(self, config_dir: Optional[Path] = None,
+                 on_output: Callable[[str], None] = _noop,
+                 on_clear: Callable[[], None] = _noop,
+                 on_progress: Callable[[int, int], None] = _noop,
+                 on_status: Callable[[str], None] = _noop,
+                 lang: str = 'en',
+                 backend: Optional[str] = None):
+        # تهيئة مسارات الملفات أولاً
+        self.config_dir = Path(config_dir) if config_dir else DEFAULT_CONFIG_DIR
+        self.config_file = self.config_dir / "config.json"
+        self.log_dir = self.config_dir / "logs"
+
+        self.on_output = on_output
+        self.on_clear = on_clear
+        self.on_progress = on_progress
+        self.on_status = on_status
+
+        self.logger = logging.getLogger(__name__)
+        self.setup_directories()
+        self.load_config()
+        self.setup_logging()
+
+        # الكتالوج: المرفق مع البرنامج ثم كتالوج المستخدم لأدوات إضافية
+        self.catalog_sources = [BUILTIN_CATALOG_DIR, self.config_dir / "catalog"]
+        self.catalog = Catalog(self.config_dir / "catalog_index.json", self.catalog_sources)
+
+        self.current_lang = lang
+        self.translations = {
+            self.current_lang: load_translations(self.current_lang, self.catalog_sources)
+        }
+        self.download_cache = self.create_download_cache()
+        self.mirrors = self.create_mirror_selector()
+        self.session_mirrors: Optional[SessionMirrors] = None
+        self.backend = self.create_backend(backend)
+        self.package_state = PackageState(self.backend)
+        self.update_snapshot = UpdateSnapshot(self.config_dir / "update_snapshot.json")
+        # نقاط حفظ الخطوات لاستئناف التثبيت من أول خطوة غير مكتملة
+        self.checkpoints = CheckpointStore(
+            self.config_dir / "checkpoints.json",
+            use_markers=self.config.get('idempotency_markers', True),
+            max_age_hours=self.config.get('checkpoint_max_age_hours', DEFAULT_MAX_AGE_HOURS)
+        )
+        self.scheduler = InstallScheduler(
+            max_workers=self.config.get('max_parallel_jobs', 4),
+            timeout=self.config.get('command_timeout'),
+            on_line=self.append_output,
+            on_start=self._on_step_start,
+            preprocess=self.prepare_command if self.download_cache or self.mirrors else None,
+            preprocess_errors=(VerificationError,),
+            job_timeout=self.config.get('job_timeout'),
+            network_limit=self.config.get('max_network_jobs', 4),
+            retries=self.config.get('step_retries', 2),
+            retry_backoff=self.config.get('retry_backoff', 2.0)
+        )
+        self.fleet: Optional[FleetRunner] = None
+        self.load_installation_history()
+
+    # --- الإعداد ---
+
+    def setup_directories(self):
+        """إنشاء المجلدات الضرورية"""
+        self.config_dir.mkdir(parents=True, exist_ok=True)
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+
+    def setup_logging(self):
+        """تهيئة نظام التسجيل: طابور غير حاجب وملف JSON-lines مدوّر ومضغوط"""
+        mb = 1024 ** 2
+        start_logging(
+            self.log_dir,
+            level=getattr(logging, str(self.config.get('log_level', 'INFO')).upper(), logging.INFO),
+            max_bytes=int(self.config.get('log_max_mb', DEFAULT_LOG_BYTES / mb) * mb),
+            max_age_hours=self.config.get('log_max_age_hours', DEFAULT_LOG_AGE_HOURS),
+            total_bytes=int(self.config.get('log_total_mb', DEFAULT_LOG_TOTAL / mb) * mb),
+            retention_days=self.config.get('log_retention_days', DEFAULT_RETENTION_DAYS)
+        )
+
+    def load_config(self):
+        """تحميل الإعدادات؛ الحفظ يتم في الخلفية بعد كل تعديل"""
+        self.config = ConfigStore(self.config_file)
+
+    def save_config(self, *keys: str):
+        """جدولة حفظ الإعدادات؛ keys للقيم المتداخلة التي عُدلت في مكانها"""
+        self.config.save(*keys)
+
+    def get_text(self, key: str) -> str:
+        """الحصول على النص المترجم"""
+        return self.translations[self.current_lang].get(key, f"[{key}]")
+
+    def app_title(self, app_info: AppSummary) -> str:
+        """اسم التطبيق المعروض: مفتاح ترجمة أو نص حرفي من الكتالوج"""
+        return self.translations[self.current_lang].get(app_info.name, app_info.name)
+
+    # --- الإخراج ---
+
+    def write_output(self, text: str):
+        self.on_output(text)
+
+    def clear_output(self):
+        self.on_clear()
+
+    def update_progress(self, current: int, total: int):
+        self.on_progress(current, total)
+
+    def update_status(self, message: str):
+        self.on_status(message)
+
+    def append_output(self, job_id: str, stream: str, line: str):
+        """تمرير سطر من مخرجات الأمر مع اسم المهمة"""
+        prefix = "! " if stream == STDERR else ""
+        self.write_output(f"[{job_id}] {prefix}{line}")
+
+    def _on_step_start(self, job_id: str, index: int, command: str):
+        self.write_output(f"[{job_id}] {self.get_text('executing').format(command)}\n")
+
+    # --- الكتالوج والتنزيلات ---
+
+    def find_app(self, app_id: str) -> Optional[AppEntry]:
+        """تحميل تفاصيل التطبيق (مع الأوامر) من الكتالوج"""
+        app_info = self.catalog.load(app_id)
+        if app_info and self.download_cache:
+            self.download_cache.known_checksums.update(app_info.checksums)
+        return app_info
+
+    def create_download_cache(self) -> Optional[DownloadCache]:
+        """إنشاء ذاكرة التنزيلات المحلية حسب الإعدادات"""
+        if not self.config.get('download_cache_enabled', True):
+            return None
+        try:
+            return DownloadCache(
+                Path(self.config.get('download_cache_dir', DEFAULT_CACHE_DIR)).expanduser(),
+                max_bytes=int(self.config.get('download_cache_max_mb', DEFAULT_MAX_BYTES // 1024 ** 2)) * 1024 ** 2,
+                mirror_dir=self.config.get('download_mirror_dir')
+            )
+        except Exception as e:
+            self.logger.error(f"Download cache disabled: {e}")
+            return None
+
+    def cache_downloads(self, command: str) -> str:
+        """استبدال تنزيلات الأمر بنسخ من ذاكرة التنزيلات، منزلة من المرآة المختارة إن وجدت"""
+        mirror_url = self.session_mirrors.mirror_url if self.session_mirrors is not None else None
+        return rewrite_command(command, self.download_cache, mirror_url)
+
+    def prepare_command(self, command: str) -> str:
+        """ذاكرة التنزيلات أولاً ثم المرايا المختارة للجلسة
+
+        المجاميع الاختبارية المثبتة في الكتالوج معنونة بالرابط الأصلي، فلا يُعاد كتابته قبل البحث عنها.
+        """
+        if self.download_cache:
+            command = self.cache_downloads(command)
+        if self.session_mirrors is not None:
+            command = self.session_mirrors.rewrite(command)
+        return command
+
+    # --- المرايا ---
+
+    def create_mirror_selector(self) -> Optional[MirrorSelector]:
+        """فاحص المرايا إن عُرفت مرايا بديلة في الإعدادات"""
+        candidates = self.config.get('mirrors')
+        if not candidates:
+            return None
+        return MirrorSelector(
+            candidates,
+            self.config_dir / "mirrors",
+            ttl_hours=self.config.get('mirror_ttl_hours', DEFAULT_MIRROR_TTL_HOURS),
+            probe_bytes=int(self.config.get('mirror_probe_kb', 256)) * 1024,
+            timeout=self.config.get('mirror_probe_timeout', DEFAULT_PROBE_TIMEOUT),
+            sources_list=Path(self.config.get('apt_sources_list', SOURCES_LIST)),
+            sources_parts=Path(self.config.get('apt_sources_parts', SOURCES_PARTS))
+        )
+
+    async def select_mirrors(self, refresh: bool = False):
+        """فحص المرايا واختيار الأسرع لهذه الجلسة مع عرض السرعة المقاسة؛ الفشل لا يوقف العملية"""
+        if self.mirrors is None:
+            return
+        self.update_status("Probing mirrors...")
+        try:
+            chosen = await self.mirrors.select(refresh)
+            self.session_mirrors = await asyncio.get_running_loop().run_in_executor(
+                None, self.mirrors.activate, chosen)
+        except Exception as e:
+            self.logger.error(f"Mirror selection failed: {e}")
+            return
+        for base, (mirror, result) in chosen.items():
+            self.write_output(f"Mirror for {base}: {mirror} ({result.describe()})\n")
+            self.logger.info(f"Mirror for {base}: {mirror} ({result.describe()})")
+
+    # --- مدير الحزم ---
+
+    def create_backend(self, name: Optional[str] = None) -> PackageBackend:
+        """مدير الحزم: المحدد صراحة أو في الإعدادات، وإلا حسب التوزيعة المكتشفة"""
+        name = name or self.config.get('package_backend') or detect_backend()
+        # dpkg_status و apt_lists_dir أسماء الإعدادات السابقة لمسارات apt
+        state_key, index_key = ('dpkg_status', 'apt_lists_dir') if name == APT else ('package_db', 'package_index')
+        options = {'state_path': self.config.get(state_key), 'index_path': self.config.get(index_key),
+                   'package_map': self.catalog.package_map()}
+        try:
+            backend = create_backend(name, **options)
+        except ValueError as e:
+            self.logger.error(f"{e}; using apt")
+            backend = create_backend(APT, **options)
+        self.logger.debug(f"Package backend: {backend.name}")
+        return backend
+
+    def app_commands(self, app_info: AppEntry) -> Optional[List[str]]:
+        """أوامر التطبيق لمدير الحزم الحالي، أو None إن لم يكن متاحاً له"""
+        commands = list(app_info.commands_for(self.backend.name))
+        if self.backend.name == APT or self.backend.name in app_info.backend_commands:
+            return commands
+        # خطوات الإعداد الخاصة بـ apt (مستودعات، ملفات .deb) لا تعمل على توزيعة أخرى
+        for command in commands:
+            parsed = parse_apt_command(command)
+            if parsed is None or self.backend.resolve_all(parsed[1]) is None:
+                return None
+        return commands
+
+    # --- حالة الحزم ---
+
+    def app_state(self, app_id: str) -> str:
+        """حالة التطبيق من قاعدة الحزم: مثبت أو قابل للترقية أو غير مثبت"""
+        summary = self.catalog.summary(app_id)
+        packages = self.backend.resolve_all(summary.packages) if summary else None
+        if packages is None:
+            return UNKNOWN
+        return self.package_state.state_of(packages)
+
+    async def refresh_package_state(self):
+        """تحديث فهرس الحزم وقائمة الترقيات في الخلفية"""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.package_state.installed)
+        await loop.run_in_executor(None, self.package_state.upgradable)
+
+    def no_op_packages(self) -> set:
+        """الحزم المثبتة بأحدث إصدار؛ خطوات تثبيتها تُحذف من الخطة"""
+        if not self.config.get('skip_installed', True) or not self.package_state.available:
+            return set()
+        self.package_state.upgradable()
+        return self.package_state.up_to_date()
+
+    def up_to_date_apps(self, app_ids: List[str], skip_packages) -> List[str]:
+        """التطبيقات التي كل حزمها ضمن skip_packages فلا حاجة لتشغيل أوامرها"""
+        up_to_date = []
+        for app_id in app_ids:
+            summary = self.catalog.summary(app_id)
+            packages = self.backend.resolve_all(summary.packages) if summary else None
+            if packages and skip_packages.issuperset(packages):
+                up_to_date.append(app_id)
+        return up_to_date
+
+    # --- التنفيذ ---
+
+    def cancel(self):
+        """إلغاء كل العمليات الجارية"""
+        self.scheduler.cancel()
+        if self.fleet is not None:
+            self.fleet.cancel()
+
+    def submit(self, coro: Coroutine) -> Future:
+        """جدولة عملية على حلقة المحرك دون انتظار (للواجهة الرسومية)"""
+        return self.scheduler.loop.submit(self._operation(coro))
+
+    def run(self, coro: Coroutine):
+        """تنفيذ عملية على حلقة المحرك والانتظار حتى تنتهي (لسطر الأوامر)"""
+        return self.scheduler.loop.run(self._operation(coro))
+
+    async def _operation(self, coro: Coroutine):
+        """كل عملية بنطاق إلغاء خاص، فلا تلغي النقرات المتتالية إلغاء عملية سابقة"""
+        with self.scheduler.operation():
+            return await coro
+
+    def progress_tracker(self, total_steps: int, trace: Optional[Trace] = None) -> Callable:
+        """إنشاء دالة on_step تحدّث التقدم الإجمالي لعدة مهام متوازية وتسجل التتبع"""
+        done = [0]
+        lock = threading.Lock()
+
+        def on_step(job_id, index, command, result, host=None):
+            if trace is not None:
+                trace.record(f"{host}:{job_id}" if host else job_id, index, command, result)
+            self.log_step(job_id, index, command, result, host)
+            with lock:
+                done[0] += 1
+                current = done[0]
+            self.update_progress(current, total_steps)
+
+        return on_step
+
+    def log_step(self, job_id: str, index: int, command: str, result: CommandResult,
+                 host: Optional[str] = None):
+        """سجل منظم لكل خطوة منتهية (التطبيق، الخطوة، المدة، رمز الخروج)"""
+        level = logging.INFO if result.success or result.skipped else logging.WARNING
+        outcome = "skipped" if result.skipped else f"exited with {result.returncode}"
+        self.logger.log(level, f"[{job_id}] step {index} {outcome}", extra={
+            'app': job_id,
+            'host': host,
+            'step': index,
+            'command': command,
+            'duration': round(result.duration, 3),
+            'exit_code': result.returncode,
+            'attempts': result.attempts
+        })
+
+    async def run_jobs(self, jobs: Dict[str, List[str]], status: str,
+                       trace: Optional[Trace] = None) -> Dict[str, JobResult]:
+        """تشغيل دفعة مهام عبر المجدول مع تحديث التقدم الإجمالي ونقاط الحفظ"""
+        total_steps = sum(len(commands) for commands in jobs.values())
+        self.update_status(status)
+        return await self.scheduler.run_batch_async(
+            jobs, on_step=self.progress_tracker(total_steps, trace), checkpoints=self.checkpoints
+        )
+
+    def save_trace(self, trace: Trace) -> Optional[Path]:
+        """حفظ ملف التتبع بصيغة Chrome trace-event في مجلد traces"""
+        path = self.config_dir / "traces" / f"{trace.name}_{datetime.now():%Y%m%d_%H%M%S}.json"
+        try:
+            trace.save(path)
+        except Exception as e:
+            self.logger.error(f"Failed to save trace: {e}")
+            return None
+        mb = 1024 ** 2
+        prune_traces(
+            path.parent,
+            max_files=self.config.get('trace_max_files', DEFAULT_MAX_TRACES),
+            total_bytes=int(self.config.get('trace_total_mb', DEFAULT_TRACES_TOTAL_BYTES / mb) * mb),
+            retention_days=self.config.get('trace_retention_days', DEFAULT_TRACES_RETENTION_DAYS)
+        )
+        return path
+
+    def unknown_apps(self, app_ids: List[str]) -> List[str]:
+        return [app_id for app_id in app_ids if app_id not in self.catalog]
+
+    def build_plan(self, app_ids: List[str], skip_packages=()) -> InstallPlan:
+        """بناء خطة تثبيت مدمجة للتطبيقات المختارة"""
+        apps = {}
+        for app_id in app_ids:
+            app_info = self.find_app(app_id)
+            if app_info is None:
+                self.write_output(self.get_text('error').format(f"Unknown app: {app_id}") + "\n")
+                continue
+            commands = self.app_commands(app_info)
+            if commands is None:
+                self.write_output(self.get_text('error').format(
+                    f"{app_id} is not available for {self.backend.name}") + "\n")
+                continue
+            apps[app_id] = commands
+        return InstallPlan.from_apps(apps, skip_packages, self.backend)
+
+    def install_apps(self, app_ids: List[str], merged: bool = True,
+                     force: bool = False) -> Dict[str, JobResult]:
+        """تثبيت التطبيقات والانتظار حتى تنتهي"""
+        return self.run(self.install_apps_async(app_ids, merged, force))
+
+    async def install_apps_async(self, app_ids: List[str], merged: bool = True,
+                                 force: bool = False) -> Dict[str, JobResult]:
+        """تثبيت التطبيقات؛ بخطة مدمجة متوازية أو تطبيقاً بعد آخر
+
+        التطبيقات المثبتة بأحدث إصدار تُتخطى، وحزمها تُحذف من أوامر apt المدمجة،
+        وتُستأنف كل مهمة من أول خطوة غير مكتملة؛ force يعطل ذلك كله.
+        """
+        self.logger.info(f"Installing {', '.join(app_ids)}")
+        self.clear_output()
+
+        skip = set() if force else await asyncio.get_running_loop().run_in_executor(None, self.no_op_packages)
+        skipped: Dict[str, JobResult] = {}
+        for app_id in self.up_to_date_apps(app_ids, skip):
+            self.write_output(f"[{app_id}] {self.get_text('already_installed')}\n")
+            skipped[app_id] = JobResult(app_id, success=True)
+        pending = [app_id for app_id in app_ids if app_id not in skipped]
+        if pending:
+            await self.select_mirrors()
+
+        groups = [pending] if merged and pending else [[app_id] for app_id in pending]
+        plans = [self.build_plan(group, skip) for group in groups]
+        self.update_status(self.get_text('installing'))
+        trace = Trace('install')
+        on_step = self.progress_tracker(sum(len(plan.steps()) for plan in plans), trace)
+        # علامات الحزم من skip المحسوبة الآن، لا من حالة تتغير مع خطوات هذه العملية؛
+        # أوامر apt المدمجة تتغير مع التطبيقات المختارة فمفتاحها خاص بهذه العملية
+        # ولا يُستأنف من تشغيل سابق ولا يمس تثبيتاً آخر يعمل بالتوازي
+        checkpoints = self.checkpoints.scope(skip, private=(SHARED_JOB,))
+        results: Dict[str, JobResult] = {}
+        for plan in plans:
+            results.update(await run_plan_async(plan, self.scheduler, on_step=on_step,
+                                                checkpoints=None if force else checkpoints))
+        trace_file = self.save_trace(trace)
+        checkpoints.clear(SHARED_JOB)
+
+        for app_id, job in results.items():
+            if job.success:
+                self.checkpoints.clear(app_id)
+                self.write_output(f"\n[{app_id}] {self.get_text('success')}\n")
+            else:
+                self.logger.error(f"Installation of {app_id} failed: {job.error}", extra={'app': app_id})
+                self.write_output(f"\n[{app_id}] " + self.get_text('error').format(job.error) + "\n")
+            self.add_to_history(app_id, job.success, job.results, trace_file)
+        # تطبيقات لم تدخل أي خطة لأنها غير متاحة لمدير الحزم الحالي
+        for app_id in pending:
+            if app_id not in results:
+                results[app_id] = JobResult(app_id, success=False, error=f"not available for {self.backend.name}")
+
+        results.update(skipped)
+        if len(results) > 1:
+            succeeded = sum(job.success for job in results.values())
+            self.write_output(self.get_text('batch_summary').format(succeeded, len(results)) + "\n")
+        self.update_status(self.get_text('ready'))
+        return results
+
+    def fleet_install(self, app_ids: List[str], hosts: List[Host],
+                      max_hosts: Optional[int] = None) -> Dict[str, Dict[str, JobResult]]:
+        """تثبيت التطبيقات على أجهزة الأسطول والانتظار حتى تنتهي"""
+        return self.run(self.fleet_install_async(app_ids, hosts, max_hosts))
+
+    async def fleet_install_async(self, app_ids: List[str], hosts: List[Host],
+                                  max_hosts: Optional[int] = None) -> Dict[str, Dict[str, JobResult]]:
+        """تنفيذ نفس الخطة المدمجة على كل جهاز عبر ssh مع تقدم إجمالي لكل الأجهزة"""
+        self.logger.info(f"Fleet install of {', '.join(app_ids)} on {len(hosts)} hosts")
+        self.clear_output()
+        plan = self.build_plan(app_ids)
+        self.fleet = FleetRunner(
+            hosts,
+            self.config_dir / "fleet",
+            max_hosts=max_hosts or self.config.get('fleet_max_hosts', DEFAULT_MAX_HOSTS),
+            ssh=self.config.get('fleet_ssh', 'ssh'),
+            ssh_options=self.config.get('fleet_ssh_options'),
+            on_line=lambda host, job_id, stream, line: self.append_output(f"{host}:{job_id}", stream, line),
+            scheduler_options={
+                'max_workers': self.config.get('max_parallel_jobs', 4),
+                'timeout': self.config.get('command_timeout'),
+                'job_timeout': self.config.get('job_timeout'),
+                'retries': self.config.get('step_retries', 2),
+                'retry_backoff': self.config.get('retry_backoff', 2.0)
+            },
+            loop=self.scheduler.loop
+        )
+        trace = Trace('fleet')
+        tracker = self.progress_tracker(len(plan.steps()) * len(hosts), trace)
+        finished = []
+
+        def on_host_done(host: Host, results: Dict[str, JobResult]):
+            finished.append(host.name)
+            succeeded = sum(job.success for job in results.values())
+            self.write_output(f"[{host.name}] {succeeded}/{len(results)} apps installed\n")
+            self.update_status(f"Fleet: {len(finished)}/{len(hosts)} hosts done")
+
+        self.update_status(f"Fleet: 0/{len(hosts)} hosts done")
+        try:
+            results = await self.fleet.run_plan(
+                plan,
+                on_step=lambda host, job_id, index, cmd, result: tracker(job_id, index, cmd, result, host),
+                on_host_done=on_host_done
+            )
+        finally:
+            self.fleet = None
+        trace_file = self.save_trace(trace)
+
+        for host, host_results in results.items():
+            for app_id, job in host_results.items():
+                if not job.success:
+                    self.logger.error(f"Installation of {app_id} on {host} failed: {job.error}",
+                                      extra={'app': app_id, 'host': host})
+                self.add_to_history(f"{app_id}@{host}", job.success, job.results, trace_file)
+
+        healthy = sum(all(job.success for job in host_results.values()) for host_results in results.values())
+        self.write_output(f"\nFleet: {healthy} of {len(results)} hosts completed successfully\n")
+        self.update_status(self.get_text('ready'))
+        return results
+
+    def system_update(self) -> JobResult:
+        """تنفيذ تحديث النظام والانتظار حتى ينتهي"""
+        return self.run(self.system_update_async())
+
+    async def system_update_async(self) -> JobResult:
+        """تنفيذ تحديث النظام"""
+        self.clear_output()
+        await self.select_mirrors()
+
+        trace = Trace(SYSTEM_UPDATE_JOB)
+        job = (await self.run_jobs({SYSTEM_UPDATE_JOB: self.backend.upgrade_commands()},
+                                   self.get_text('system_update'), trace))[SYSTEM_UPDATE_JOB]
+        self.save_trace(trace)
+        if job.success:
+            self.checkpoints.clear(SYSTEM_UPDATE_JOB)
+            self.update_snapshot.clear()
+            self.config['last_update'] = datetime.now().isoformat()
+            self.save_config()
+            self.write_output(f"\n{self.get_text('system_updated')}\n")
+        else:
+            self.write_output(self.get_text('error').format(job.error) + "\n")
+
+        self.update_status(self.get_text('ready'))
+        return job
+
+    async def plan_update_async(self) -> UpdatePlan:
+        """خطة التحديث التدريجي: تحديث الفهرس عند قدمه ثم الفرق عن آخر تحديث مع أحجام التنزيل"""
+        self.clear_output()
+        await self.select_mirrors()
+        max_age = self.config.get('update_index_max_age_minutes', DEFAULT_INDEX_MAX_AGE_MINUTES) * 60
+        age = self.package_state.lists_age()
+        if self.backend.refresh_command and (age is None or age > max_age):
+            job = (await self.run_jobs({APT_INDEX_JOB: [self.backend.refresh_command]},
+                                       self.get_text('system_update')))[APT_INDEX_JOB]
+            self.checkpoints.clear(APT_INDEX_JOB)
+            if not job.success:
+                raise RuntimeError(job.error)
+        self.update_status("Computing upgrades...")
+        apt_options = self.session_mirrors.apt_options if self.session_mirrors else ''
+        plan = await asyncio.get_running_loop().run_in_executor(
+            None, build_update_plan, self.package_state, self.update_snapshot, apt_options, self.mirror_throughput()
+        )
+        self.write_output(plan.describe())
+        self.update_status(self.get_text('ready'))
+        return plan
+
+    def mirror_throughput(self) -> Optional[float]:
+        """أقل سرعة مقاسة بين المرايا المختارة لهذه الجلسة"""
+        if self.session_mirrors is None or not self.session_mirrors.throughput:
+            return None
+        return min(self.session_mirrors.throughput.values())
+
+    def incremental_update(self, plan: UpdatePlan, selected: Optional[List[str]] = None) -> JobResult:
+        """ترقية الحزم المختارة والانتظار حتى تنتهي"""
+        return self.run(self.incremental_update_async(plan, selected))
+
+    async def incremental_update_async(self, plan: UpdatePlan,
+                                       selected: Optional[List[str]] = None) -> JobResult:
+        """تنزيل ملفات الحزم المختارة بالتوازي ثم مرحلة dpkg واحدة لها فقط"""
+        selected = sorted(plan.updates if selected is None else set(selected) & set(plan.updates))
+        if not selected:
+            self.write_output(plan.describe())
+            return JobResult(SYSTEM_UPDATE_JOB, success=True)
+        if not self.backend.partial_upgrades and len(selected) < len(plan.updates):
+            # ترقية بعض الحزم دون غيرها ترقية جزئية لا يدعمها هذا المدير
+            self.write_output(f"{self.backend.name} does not support upgrading a subset of packages; "
+                              f"upgrading all {len(plan.updates)}\n")
+            selected = sorted(plan.updates)
+
+        trace = Trace(SYSTEM_UPDATE_JOB)
+        archives = Path(self.config.get('apt_archives_dir', APT_ARCHIVES))
+        downloads = plan.download_jobs(selected, archives)
+        if downloads:
+            results = await self.run_jobs(downloads, f"Downloading {len(downloads)} packages", trace)
+            for job_id, job in results.items():
+                # apt ينزل ما فشل هنا بنفسه في مرحلة dpkg
+                if job.success:
+                    self.checkpoints.clear(job_id)
+                else:
+                    self.write_output(f"[{job_id}] {job.error}; apt will retry it\n")
+        job = (await self.run_jobs({SYSTEM_UPDATE_JOB: plan.install_commands(selected)},
+                                   self.get_text('system_update'), trace))[SYSTEM_UPDATE_JOB]
+        self.save_trace(trace)
+        if job.success:
+            self.checkpoints.clear(SYSTEM_UPDATE_JOB)
+            remaining = await asyncio.get_running_loop().run_in_executor(
+                None, self.update_snapshot.record_update, self.package_state)
+            self.config['last_update'] = datetime.now().isoformat()
+            self.write_output(f"\n{len(selected)} packages upgraded, {len(remaining)} left\n")
+        else:
+            self.write_output(self.get_text('error').format(job.error) + "\n")
+        self.update_status(self.get_text('ready'))
+        return job
+
+    # --- السجل ---
+
+    def add_to_history(self, app_id: str, success: bool,
+                       results: Optional[List[CommandResult]] = None,
+                       trace_file: Optional[Path] = None):
+        """إضافة التثبيت إلى السجل مع توقيت كل خطوة"""
+        try:
+            self.history.add(
+                app_id,
+                success,
+                steps=[step_summary(result) for result in results or []],
+                trace=str(trace_file) if trace_file else None
+            )
+        except Exception as e:
+            self.logger.error(f"Failed to record history: {e}")
+
+    def load_installation_history(self):
+        """فتح سجل التثبيتات وترحيل السجل القديم من config.json"""
+        self.history = HistoryStore(
+            self.config_dir / "history.db",
+            max_rows=self.config.get('history_max_rows', DEFAULT_MAX_ROWS)
+        )
+        legacy = self.config.pop('installation_history', None)
+        if legacy:
+            self.history.add_many(legacy)
+        if legacy is not None:
+            self.save_config()
+        self.history.compact(self.config.get('history_max_age_days'))
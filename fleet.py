@@ -0,0 +1,187 @@
+import asyncio
+import json
+import re
+import shlex
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from runner import STDOUT, STDERR, run_command
+from scheduler import InstallScheduler, JobResult, StepCallback
+from planner import InstallPlan, SHARED_JOB, run_plan_async
+from checkpoints import CheckpointStore
+
+DEFAULT_MAX_HOSTS = 8
+CONTROL_PERSIST = 600
+CONNECT_TIMEOUT = 10
+
+_HOST_LINE = re.compile(r'^(?:(?P<name>[\w.-]+)\s+)?(?P<target>[^\s:]+)(?::(?P<port>\d+))?$')
+
+FleetLineCallback = Callable[[str, str, str, str], None]
+
+
+@dataclass
+class Host:
+    """جهاز في قائمة الأسطول"""
+    name: str
+    target: str
+    port: Optional[int] = None
+
+
+def load_inventory(path: Path) -> List[Host]:
+    """قراءة قائمة الأجهزة: JSON أو نص بسطر لكل جهاز "[name] user@host[:port]" """
+    path = Path(path).expanduser()
+    text = path.read_text(encoding='utf-8')
+    hosts = []
+    if path.suffix == '.json':
+        for item in json.loads(text):
+            if isinstance(item, str):
+                item = {'host': item}
+            target = f"{item['user']}@{item['host']}" if item.get('user') else item['host']
+            hosts.append(Host(item.get('name', item['host']), target, item.get('port')))
+        return hosts
+    for number, line in enumerate(text.splitlines(), 1):
+        line = line.split('#', 1)[0].strip()
+        if not line:
+            continue
+        match = _HOST_LINE.match(line)
+        if not match:
+            raise ValueError(f"{path}:{number}: invalid host line: {line}")
+        target = match.group('target')
+        port = match.group('port')
+        hosts.append(Host(match.group('name') or target.split('@')[-1], target, int(port) if port else None))
+    return hosts
+
+
+class SSHTransport:
+    """تشغيل الأوامر على جهاز بعيد عبر اتصال ssh واحد مشترك (ControlMaster)"""
+
+    def __init__(self, host: Host, control_dir: Path, ssh: str = 'ssh',
+                 options: Optional[List[str]] = None):
+        self.host = host
+        self.control_dir = Path(control_dir)
+        self.control_dir.mkdir(parents=True, exist_ok=True, mode=0o700)
+        self.ssh = shlex.split(ssh)
+        self.options = list(options or [])
+
+    def argv(self) -> List[str]:
+        args = self.ssh + [
+            '-o', 'BatchMode=yes',
+            '-o', f'ConnectTimeout={CONNECT_TIMEOUT}',
+            '-o', 'ControlMaster=auto',
+            '-o', f'ControlPath={self.control_dir}/%C',
+            '-o', f'ControlPersist={CONTROL_PERSIST}'
+        ] + self.options
+        if self.host.port:
+            args += ['-p', str(self.host.port)]
+        return args + [self.host.target]
+
+    def wrap(self, command: str) -> str:
+        """أمر محلي ينفذ command على الجهاز البعيد عبر sh -c"""
+        return ' '.join(shlex.quote(arg) for arg in self.argv() + [f"sh -c {shlex.quote(command)}"])
+
+    async def check(self) -> Optional[str]:
+        """فتح الاتصال الرئيسي والتحقق منه؛ يعيد رسالة الخطأ أو None"""
+        errors = []
+        result = await run_command(self.wrap('true'), lambda stream, line: errors.append(line), CONNECT_TIMEOUT * 2)
+        if result.success:
+            return None
+        return ''.join(errors).strip() or f"ssh exit code {result.returncode}"
+
+    async def close(self):
+        """إغلاق الاتصال الرئيسي"""
+        argv = self.argv()
+        command = ' '.join(shlex.quote(arg) for arg in argv[:-1] + ['-O', 'exit', argv[-1]])
+        await run_command(command, lambda stream, line: None, CONNECT_TIMEOUT)
+
+
+class FleetRunner:
+    """تنفيذ نفس خطة التثبيت على عدة أجهزة بالتوازي مع حد لعدد الأجهزة المتزامنة"""
+
+    def __init__(self, hosts: List[Host], state_dir: Path,
+                 max_hosts: int = DEFAULT_MAX_HOSTS,
+                 ssh: str = 'ssh', ssh_options: Optional[List[str]] = None,
+                 on_line: Optional[FleetLineCallback] = None,
+                 scheduler_options: Optional[dict] = None,
+                 loop=None):
+        self.hosts = hosts
+        self.state_dir = Path(state_dir)
+        self.max_hosts = max_hosts
+        self.ssh = ssh
+        self.ssh_options = ssh_options
+        self.on_line = on_line
+        self.scheduler_options = scheduler_options or {}
+        self.loop = loop
+        self.log_dir = self.state_dir / "logs"
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+        self._schedulers: Dict[str, InstallScheduler] = {}
+        self._cancelled = False
+
+    def cancel(self):
+        self._cancelled = True
+        for scheduler in list(self._schedulers.values()):
+            scheduler.cancel()
+
+    async def run_plan(self, plan: InstallPlan,
+                       on_step: Optional[Callable[[str, str, int, str, object], None]] = None,
+                       on_host_done: Optional[Callable[[Host, Dict[str, JobResult]], None]] = None
+                       ) -> Dict[str, Dict[str, JobResult]]:
+        """تنفيذ الخطة على كل الأجهزة؛ يعيد {الجهاز: {التطبيق: النتيجة}}"""
+        self._cancelled = False
+        semaphore = asyncio.Semaphore(self.max_hosts)
+
+        async def run_host(host: Host):
+            async with semaphore:
+                results = await self._run_host(host, plan, on_step)
+            if on_host_done:
+                on_host_done(host, results)
+            return host.name, results
+
+        return dict(await asyncio.gather(*(run_host(host) for host in self.hosts)))
+
+    async def _run_host(self, host: Host, plan: InstallPlan, on_step) -> Dict[str, JobResult]:
+        if self._cancelled:
+            return self._failed(plan, "cancelled")
+        transport = SSHTransport(host, self.state_dir / "control", self.ssh, self.ssh_options)
+        log_path = self.log_dir / f"{host.name}_{datetime.now():%Y%m%d_%H%M%S}.log"
+        with open(log_path, 'a', encoding='utf-8', errors='replace') as log:
+
+            def line(job_id: str, stream: str, text: str):
+                log.write(f"[{job_id}] {'! ' if stream == STDERR else ''}{text}")
+                if self.on_line:
+                    self.on_line(host.name, job_id, stream, text)
+
+            error = await transport.check()
+            if error:
+                line('ssh', STDERR, f"unreachable: {error}\n")
+                return self._failed(plan, f"unreachable: {error}")
+
+            scheduler = InstallScheduler(
+                on_line=line,
+                on_start=lambda job_id, index, cmd: line(job_id, STDOUT, f"$ {cmd}\n"),
+                transport=transport.wrap,
+                loop=self.loop,
+                **self.scheduler_options
+            )
+            self._schedulers[host.name] = scheduler
+            # العلامات تفحص نظام الملفات المحلي فلا تصلح للأجهزة البعيدة
+            checkpoints = CheckpointStore(self.state_dir / host.name / "checkpoints.json", use_markers=False)
+            checkpoints.clear(SHARED_JOB)
+            host_step: Optional[StepCallback] = None
+            if on_step:
+                host_step = lambda job_id, index, cmd, result: on_step(host.name, job_id, index, cmd, result)
+            try:
+                results = await run_plan_async(plan, scheduler, on_step=host_step, checkpoints=checkpoints)
+            finally:
+                self._schedulers.pop(host.name, None)
+                checkpoints.clear(SHARED_JOB)
+                await transport.close()
+            for app_id, job in results.items():
+                if job.success:
+                    checkpoints.clear(app_id)
+            return results
+
+    @staticmethod
+    def _failed(plan: InstallPlan, error: str) -> Dict[str, JobResult]:
+        return {app_id: JobResult(app_id, success=False, error=error) for app_id in plan.apps()}
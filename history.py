@@ -0,0 +1,134 @@
+import json
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+from records import HistoryRow
+
+DEFAULT_MAX_ROWS = 100_000
+# عدد الإضافات بين عمليات الضغط التلقائي
+COMPACT_EVERY = 1000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS installs (
+    id INTEGER PRIMARY KEY,
+    ts INTEGER NOT NULL,
+    app TEXT NOT NULL,
+    success INTEGER NOT NULL,
+    steps TEXT,
+    trace TEXT
+);
+CREATE INDEX IF NOT EXISTS installs_ts ON installs (ts);
+CREATE INDEX IF NOT EXISTS installs_app_ts ON installs (app, ts);
+CREATE INDEX IF NOT EXISTS installs_success_ts ON installs (success, ts);
+"""
+
+
+class HistoryStore:
+    """سجل التثبيتات في SQLite: إضافة فقط، كتابة ذرية، واستعلامات مفهرسة"""
+
+    def __init__(self, path: Path, max_rows: int = DEFAULT_MAX_ROWS):
+        self.path = Path(path)
+        self.max_rows = max_rows
+        self._lock = threading.Lock()
+        self._inserts = 0
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        # WAL: كل إضافة معاملة ذرية ولا يفسد الانهيار أثناء الكتابة السجل
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def add(self, app: str, success: bool, steps: Optional[list] = None,
+            trace: Optional[str] = None, timestamp: Optional[float] = None):
+        """إضافة سجل تثبيت واحد"""
+        ts = int(timestamp if timestamp is not None else time.time())
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO installs (ts, app, success, steps, trace) VALUES (?, ?, ?, ?, ?)",
+                (ts, app, int(bool(success)), json.dumps(steps or [], separators=(',', ':')), trace)
+            )
+            self._inserts += 1
+            if self._inserts % COMPACT_EVERY == 0:
+                self._compact_locked()
+
+    def add_many(self, entries: Iterable[dict]):
+        """إضافة عدة سجلات في معاملة واحدة (لترحيل السجل القديم)"""
+        rows = []
+        for entry in entries:
+            try:
+                ts = datetime.fromisoformat(entry['timestamp']).timestamp()
+            except (KeyError, TypeError, ValueError):
+                ts = time.time()
+            rows.append((int(ts), entry.get('app', ''), int(bool(entry.get('success'))),
+                         json.dumps(entry.get('steps', []), separators=(',', ':')), entry.get('trace')))
+        with self._lock:
+            self._db.execute("BEGIN")
+            try:
+                self._db.executemany(
+                    "INSERT INTO installs (ts, app, success, steps, trace) VALUES (?, ?, ?, ?, ?)",
+                    rows
+                )
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+
+    @staticmethod
+    def _where(app: Optional[str], success: Optional[bool],
+               since: Optional[float], until: Optional[float]):
+        clauses, params = [], []
+        if app:
+            clauses.append("app = ?")
+            params.append(app)
+        if success is not None:
+            clauses.append("success = ?")
+            params.append(int(success))
+        if since is not None:
+            clauses.append("ts >= ?")
+            params.append(int(since))
+        if until is not None:
+            clauses.append("ts < ?")
+            params.append(int(until))
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def query(self, app: Optional[str] = None, success: Optional[bool] = None,
+              since: Optional[float] = None, until: Optional[float] = None,
+              limit: int = 50, offset: int = 0) -> List[HistoryRow]:
+        """صفحة من السجلات الأحدث أولاً"""
+        where, params = self._where(app, success, since, until)
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT ts, app, success, steps, trace FROM installs{where} "
+                "ORDER BY ts DESC, id DESC LIMIT ? OFFSET ?",
+                params + [limit, offset]
+            ).fetchall()
+        return [HistoryRow(ts, app_id, bool(ok), steps, trace) for ts, app_id, ok, steps, trace in rows]
+
+    def count(self, app: Optional[str] = None, success: Optional[bool] = None,
+              since: Optional[float] = None, until: Optional[float] = None) -> int:
+        where, params = self._where(app, success, since, until)
+        with self._lock:
+            return self._db.execute(f"SELECT COUNT(*) FROM installs{where}", params).fetchone()[0]
+
+    def compact(self, max_age_days: Optional[float] = None):
+        """حذف السجلات الأقدم من الحد الأقصى للعدد أو العمر"""
+        with self._lock:
+            self._compact_locked(max_age_days)
+            self._db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def _compact_locked(self, max_age_days: Optional[float] = None):
+        if max_age_days is not None:
+            self._db.execute("DELETE FROM installs WHERE ts < ?",
+                             (int(time.time() - max_age_days * 86400),))
+        self._db.execute(
+            "DELETE FROM installs WHERE id <= (SELECT id FROM installs ORDER BY id DESC LIMIT 1 OFFSET ?)",
+            (self.max_rows,)
+        )
@@ -0,0 +1,209 @@
+import atexit
+import gzip
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import shutil
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+LOG_NAME = "system_tools"
+ACTIVE_SUFFIX = ".jsonl"
+ARCHIVE_SUFFIX = ".jsonl.gz"
+
+DEFAULT_MAX_BYTES = 10 * 1024 ** 2
+DEFAULT_MAX_AGE_HOURS = 24
+DEFAULT_TOTAL_BYTES = 100 * 1024 ** 2
+DEFAULT_RETENTION_DAYS = 30
+
+CONSOLE_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+# حقول منظمة تُمرر عبر extra={...} وتُكتب كما هي في السجل
+STRUCTURED_FIELDS = ('app', 'job', 'host', 'step', 'command', 'duration', 'exit_code', 'attempts')
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """سجل واحد لكل سطر JSON مع الحقول المنظمة إن وجدت"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            'ts': round(record.created, 3),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage()
+        }
+        for name in STRUCTURED_FIELDS:
+            value = getattr(record, name, None)
+            if value is not None:
+                data[name] = value
+        if record.exc_info:
+            data['exc'] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+def console_filter(record: logging.LogRecord) -> bool:
+    """سجلات الخطوات الناجحة للملف فقط حتى لا تغرق الطرفية"""
+    return getattr(record, 'step', None) is None or record.levelno >= logging.WARNING
+
+
+class ArchivingFileHandler(logging.handlers.RotatingFileHandler):
+    """تدوير حسب الحجم أو العمر، ضغط الملف المدور بـ gzip، وحد أقصى لمساحة الأرشيف"""
+
+    def __init__(self, log_dir: Path, max_bytes: int = DEFAULT_MAX_BYTES,
+                 max_age_hours: float = DEFAULT_MAX_AGE_HOURS,
+                 total_bytes: int = DEFAULT_TOTAL_BYTES,
+                 retention_days: float = DEFAULT_RETENTION_DAYS):
+        self.log_dir = Path(log_dir)
+        self.max_age = max_age_hours * 3600
+        self.total_bytes = total_bytes
+        self.retention = retention_days * 86400
+        super().__init__(self.log_dir / f"{LOG_NAME}{ACTIVE_SUFFIX}", maxBytes=max_bytes,
+                         encoding='utf-8', delay=True)
+        self.opened_at = self._file_start()
+        self.prune()
+
+    def _file_start(self) -> float:
+        """وقت أول سجل في الملف الحالي حتى يُحسب عمره بعد إعادة التشغيل"""
+        try:
+            with open(self.baseFilename, encoding='utf-8') as f:
+                return float(json.loads(f.readline())['ts'])
+        except (OSError, ValueError, KeyError, TypeError):
+            return time.time()
+
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        if self.max_age and time.time() - self.opened_at >= self.max_age and os.path.exists(self.baseFilename):
+            return True
+        return bool(super().shouldRollover(record))
+
+    def doRollover(self):
+        """ضغط الملف الحالي إلى أرشيف مؤرخ ثم بدء ملف جديد"""
+        if self.stream:
+            self.stream.close()
+            self.stream = None
+        if os.path.exists(self.baseFilename) and os.path.getsize(self.baseFilename) > 0:
+            archive = self.log_dir / f"{LOG_NAME}.{datetime.now():%Y%m%d_%H%M%S_%f}{ARCHIVE_SUFFIX}"
+            with open(self.baseFilename, 'rb') as src, gzip.open(archive, 'wb') as dst:
+                shutil.copyfileobj(src, dst)
+            os.unlink(self.baseFilename)
+        self.opened_at = time.time()
+        self.prune()
+
+    def prune(self):
+        """حذف الأرشيفات الأقدم من مدة الاحتفاظ ثم الأقدم حتى يصبح المجموع تحت الحد"""
+        files = archived_files(self.log_dir)
+        now = time.time()
+        total = 0
+        for path in reversed(files):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            total += stat.st_size
+            if now - stat.st_mtime > self.retention or total > self.total_bytes:
+                path.unlink(missing_ok=True)
+
+
+def archived_files(log_dir: Path) -> List[Path]:
+    """الأرشيفات والسجلات اليومية القديمة مرتبة من الأقدم إلى الأحدث"""
+    log_dir = Path(log_dir)
+    files = list(log_dir.glob(f"{LOG_NAME}.*{ARCHIVE_SUFFIX}")) + list(log_dir.glob(f"{LOG_NAME}_*.log"))
+    return sorted(files, key=lambda path: path.stat().st_mtime)
+
+
+def start_logging(log_dir: Path, level: int = logging.INFO, console: bool = True,
+                  **handler_options) -> logging.handlers.QueueListener:
+    """توجيه كل السجلات عبر QueueHandler إلى خيط كتابة منفصل؛ الإرسال لا ينتظر القرص"""
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    file_handler = ArchivingFileHandler(log_dir, **handler_options)
+    file_handler.setFormatter(JsonLinesFormatter())
+    handlers = [file_handler]
+    if console:
+        stream_handler = logging.StreamHandler()
+        stream_handler.setFormatter(logging.Formatter(CONSOLE_FORMAT))
+        stream_handler.addFilter(console_filter)
+        handlers.append(stream_handler)
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    root = logging.getLogger()
+    root.setLevel(level)
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+    return _listener
+
+
+def stop_logging():
+    """تفريغ السجلات المعلقة وإغلاق الملفات"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+# --- الاستعلام ---
+
+def _open(path: Path):
+    if path.suffix == '.gz':
+        return gzip.open(path, 'rt', encoding='utf-8', errors='replace')
+    return open(path, encoding='utf-8', errors='replace')
+
+
+def _last_write(path: Path) -> Optional[float]:
+    """وقت آخر سجل في الملف (mtime)؛ كل سجلاته أقدم منه"""
+    try:
+        return path.stat().st_mtime
+    except OSError:
+        return None
+
+
+def query_logs(log_dir: Path, app: Optional[str] = None, since: Optional[float] = None,
+               until: Optional[float] = None, level: Optional[str] = None) -> Iterator[dict]:
+    """قراءة السجلات سطراً بسطر مع التصفية؛ الملفات المنتهية قبل since تُتخطى دون فتحها"""
+    log_dir = Path(log_dir)
+    files = [p for p in archived_files(log_dir) if p.name.endswith(ARCHIVE_SUFFIX)]
+    active = log_dir / f"{LOG_NAME}{ACTIVE_SUFFIX}"
+    if active.exists():
+        files.append(active)
+    needle = json.dumps(app, ensure_ascii=False) if app else None
+    previous_end = None
+    for path in files:
+        # الملفات مرتبة زمنياً: كل ملف يبدأ بعد نهاية الذي قبله
+        if until is not None and previous_end is not None and previous_end > until:
+            break
+        modified = previous_end = _last_write(path)
+        if since is not None and modified is not None and modified < since:
+            continue
+        with _open(path) as f:
+            for line in f:
+                # فحص نصي سريع قبل تحليل JSON
+                if needle and needle not in line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                ts = record.get('ts', 0)
+                if since is not None and ts < since:
+                    continue
+                if until is not None and ts > until:
+                    continue
+                if app and app not in (record.get('app'), record.get('job')):
+                    continue
+                if level and record.get('level') != level.upper():
+                    continue
+                yield record
@@ -0,0 +1,361 @@
+import asyncio
+import json
+import os
+import re
+import shlex
+import shutil
+import ssl
+import threading
+import time
+from dataclasses import dataclass, field, asdict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+DEFAULT_TTL_HOURS = 6
+# المرايا التي فشل فحصها يُعاد فحصها بعد دقائق بدلاً من ساعات
+FAILURE_TTL = 300
+DEFAULT_PROBE_BYTES = 256 * 1024
+DEFAULT_PROBE_TIMEOUT = 5.0
+DEFAULT_CONCURRENCY = 8
+READ_CHUNK = 64 * 1024
+
+SOURCES_LIST = Path('/etc/apt/sources.list')
+SOURCES_PARTS = Path('/etc/apt/sources.list.d')
+
+_DOWNLOAD_HEAD = re.compile(r'^\s*(?:sudo\s+)?(?:wget|curl)\b')
+_APT_CALL = re.compile(r'(^|[;&|]\s*)((?:sudo\s+)?(?:apt|apt-get))(?=\s)')
+
+
+@dataclass
+class ProbeResult:
+    """نتيجة فحص مرآة: زمن الاتصال وسرعة تنزيل جزء صغير"""
+    url: str
+    connect_time: Optional[float] = None
+    throughput: Optional[float] = None
+    received: int = 0
+    error: Optional[str] = None
+    probed_at: float = field(default_factory=time.time)
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and bool(self.throughput)
+
+    def describe(self) -> str:
+        if not self.ok:
+            return f"failed ({self.error})"
+        return f"{self.throughput / 1024 ** 2:.2f} MB/s, connect {self.connect_time * 1000:.0f} ms"
+
+
+async def _fetch(result: ProbeResult, probe_bytes: int, state: dict):
+    parts = urlparse(result.url)
+    secure = parts.scheme == 'https'
+    started = time.perf_counter()
+    reader, writer = await asyncio.open_connection(
+        parts.hostname, parts.port or (443 if secure else 80),
+        ssl=ssl.create_default_context() if secure else None
+    )
+    try:
+        result.connect_time = time.perf_counter() - started
+        path = (parts.path or '/') + (f"?{parts.query}" if parts.query else '')
+        writer.write((
+            f"GET {path} HTTP/1.1\r\n"
+            f"Host: {parts.netloc}\r\n"
+            f"Range: bytes=0-{probe_bytes - 1}\r\n"
+            "User-Agent: system-tools-mirror-probe\r\n"
+            "Connection: close\r\n\r\n"
+        ).encode())
+        await writer.drain()
+        state['sent'] = time.perf_counter()
+
+        status = (await reader.readline()).decode('latin-1').split()
+        if len(status) < 2 or status[1] not in ('200', '206'):
+            raise ValueError(f"HTTP {status[1] if len(status) > 1 else 'invalid response'}")
+        while (await reader.readline()).strip():
+            pass
+        while result.received < probe_bytes:
+            chunk = await reader.read(min(READ_CHUNK, probe_bytes - result.received))
+            if not chunk:
+                break
+            result.received += len(chunk)
+    finally:
+        writer.close()
+
+
+async def probe(url: str, probe_bytes: int = DEFAULT_PROBE_BYTES,
+                timeout: float = DEFAULT_PROBE_TIMEOUT) -> ProbeResult:
+    """فتح اتصال بالمرآة وتنزيل أول probe_bytes بطلب Range؛ المرآة البطيئة تُقاس بما وصل قبل المهلة"""
+    result = ProbeResult(url)
+    if urlparse(url).scheme not in ('http', 'https'):
+        result.error = "unsupported scheme"
+        return result
+    state = {}
+    try:
+        await asyncio.wait_for(_fetch(result, probe_bytes, state), timeout)
+    except asyncio.TimeoutError:
+        if not result.received:
+            result.error = "timed out"
+    except (OSError, ValueError, ssl.SSLError) as e:
+        result.error = str(e) or type(e).__name__
+        return result
+    if 'sent' in state and result.received:
+        result.throughput = result.received / max(time.perf_counter() - state['sent'], 1e-6)
+    elif result.error is None:
+        result.error = "empty response"
+    return result
+
+
+# --- مصادر apt ---
+
+def _list_entries(text: str) -> List[Tuple[str, str]]:
+    """(الرابط، الإصدار) من أسطر "deb [options] uri suite components" """
+    entries = []
+    for line in text.splitlines():
+        tokens = line.split('#', 1)[0].split()
+        if not tokens or tokens[0] not in ('deb', 'deb-src'):
+            continue
+        index = 1
+        if index < len(tokens) and tokens[index].startswith('['):
+            while index < len(tokens) and not tokens[index].endswith(']'):
+                index += 1
+            index += 1
+        if index + 1 < len(tokens):
+            entries.append((tokens[index], tokens[index + 1]))
+    return entries
+
+
+def _deb822_entries(text: str) -> List[Tuple[str, str]]:
+    """(الرابط، الإصدار) من فقرات URIs/Suites في ملفات .sources"""
+    entries = []
+    for paragraph in re.split(r'\n\s*\n', text):
+        fields = {}
+        for line in paragraph.splitlines():
+            key, sep, value = line.partition(':')
+            if sep and not line.startswith((' ', '#')):
+                fields[key.strip().lower()] = value.split()
+        for uri in fields.get('uris', []):
+            for suite in fields.get('suites', [])[:1]:
+                entries.append((uri, suite))
+    return entries
+
+
+def read_sources(sources_list: Path = SOURCES_LIST,
+                 sources_parts: Path = SOURCES_PARTS) -> List[Tuple[str, str]]:
+    """كل المستودعات المعرفة في sources.list و sources.list.d"""
+    entries = []
+    files = [sources_list] + (sorted(sources_parts.iterdir()) if sources_parts.is_dir() else [])
+    for path in files:
+        try:
+            text = path.read_text(errors='replace')
+        except OSError:
+            continue
+        if path.suffix == '.sources':
+            entries.extend(_deb822_entries(text))
+        elif path.suffix == '.list':
+            entries.extend(_list_entries(text))
+    return entries
+
+
+def _replace_base(text: str, mapping: Dict[str, str]) -> str:
+    for base, chosen in mapping.items():
+        text = re.sub(rf'(?<=[\s"\']){re.escape(base)}(?=/|\s|["\']|$)', chosen, text, flags=re.M)
+    return text
+
+
+def _write_atomic(path: Path, text: str):
+    # apt قد يقرأ نسخة الجلسة أثناء مزامنتها من خيط آخر
+    tmp = path.with_name(f".{path.name}.tmp")
+    tmp.write_text(text)
+    os.replace(tmp, path)
+
+
+def _strip(url: str) -> str:
+    return url.rstrip('/')
+
+
+class SessionMirrors:
+    """المرايا المختارة لهذه الجلسة: نسخة معدلة من مصادر apt وإعادة كتابة روابط التنزيل
+
+    النسخة تُزامن مع مصادر النظام قبل كل أمر apt، فالمستودعات التي تضيفها خطوات
+    الإعداد (tee إلى sources.list.d، add-apt-repository) تصل إلى apt update و install التالية.
+    """
+
+    def __init__(self, mapping: Dict[str, str], session_dir: Optional[Path] = None,
+                 throughput: Optional[Dict[str, float]] = None,
+                 sources_list: Path = SOURCES_LIST, sources_parts: Path = SOURCES_PARTS):
+        self.mapping = mapping
+        self.session_dir = session_dir
+        # {المستودع: سرعة المرآة المختارة بالبايت/ثانية}
+        self.throughput = throughput or {}
+        self.sources_list = Path(sources_list)
+        self.sources_parts = Path(sources_parts)
+        self._lock = threading.Lock()
+        self._stamp = None
+
+    def _sources_stamp(self) -> tuple:
+        files = [self.sources_list] + (sorted(self.sources_parts.iterdir()) if self.sources_parts.is_dir() else [])
+        stamp = []
+        for path in files:
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            stamp.append((path.name, st.st_mtime_ns, st.st_size))
+        return tuple(stamp)
+
+    def sync(self):
+        """إعادة كتابة نسخة الجلسة إن تغيرت مصادر النظام منذ آخر مزامنة"""
+        if self.session_dir is None:
+            return
+        with self._lock:
+            stamp = self._sources_stamp()
+            if stamp == self._stamp:
+                return
+            parts_dir = self.session_dir / "sources.list.d"
+            parts_dir.mkdir(parents=True, exist_ok=True)
+            try:
+                text = self.sources_list.read_text(errors='replace')
+            except OSError:
+                text = ''
+            _write_atomic(self.session_dir / "sources.list", _replace_base(text, self.mapping))
+            names = set()
+            if self.sources_parts.is_dir():
+                for path in self.sources_parts.iterdir():
+                    if path.suffix in ('.list', '.sources') and path.is_file():
+                        names.add(path.name)
+                        _write_atomic(parts_dir / path.name,
+                                      _replace_base(path.read_text(errors='replace'), self.mapping))
+            for path in parts_dir.iterdir():
+                if path.name not in names:
+                    path.unlink(missing_ok=True)
+            self._stamp = stamp
+
+    @property
+    def apt_options(self) -> str:
+        if self.session_dir is None:
+            return ''
+        self.sync()
+        return ' '.join([
+            '-o', shlex.quote(f"Dir::Etc::SourceList={self.session_dir / 'sources.list'}"),
+            '-o', shlex.quote(f"Dir::Etc::SourceParts={self.session_dir / 'sources.list.d'}")
+        ])
+
+    def mirror_url(self, url: str) -> str:
+        """الرابط على المرآة المختارة، أو الرابط نفسه إن لم يكن لمستودعه مرآة"""
+        return _replace_base(f" {url}", self.mapping)[1:]
+
+    def rewrite(self, command: str) -> str:
+        """أوامر apt تقرأ المصادر المعدلة، وتنزيلات wget/curl تذهب إلى المرآة المختارة"""
+        if not self.mapping:
+            return command
+        if _DOWNLOAD_HEAD.match(command):
+            # الجزء الأول فقط: مرآة في أمر tee أو add-apt-repository ستُحفظ في النظام
+            head, sep, rest = command.partition('|')
+            return _replace_base(f" {head}", self.mapping)[1:] + sep + rest
+        if _APT_CALL.search(command):
+            options = self.apt_options
+            if options:
+                command = _APT_CALL.sub(lambda m: f"{m.group(1)}{m.group(2)} {options}", command)
+        return command
+
+
+class MirrorSelector:
+    """فحص المرايا المرشحة بالتوازي واختيار الأسرع لكل مستودع مع ذاكرة نتائج لها مدة صلاحية"""
+
+    def __init__(self, candidates: Dict[str, List[str]], state_dir: Path,
+                 ttl_hours: float = DEFAULT_TTL_HOURS,
+                 probe_bytes: int = DEFAULT_PROBE_BYTES,
+                 timeout: float = DEFAULT_PROBE_TIMEOUT,
+                 concurrency: int = DEFAULT_CONCURRENCY,
+                 sources_list: Path = SOURCES_LIST,
+                 sources_parts: Path = SOURCES_PARTS):
+        # {الرابط الأصلي: [مرايا بديلة]}؛ الأصلي نفسه مرشح دائماً
+        self.candidates = {_strip(base): [_strip(url) for url in urls] for base, urls in candidates.items()}
+        self.state_dir = Path(state_dir)
+        self.cache_file = self.state_dir / "probes.json"
+        self.ttl = ttl_hours * 3600
+        self.probe_bytes = probe_bytes
+        self.timeout = timeout
+        self.concurrency = concurrency
+        self.sources_list = Path(sources_list)
+        self.sources_parts = Path(sources_parts)
+        self._cache: Dict[str, dict] = self._load_cache()
+
+    def _load_cache(self) -> Dict[str, dict]:
+        try:
+            with open(self.cache_file) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_cache(self):
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+        tmp = self.cache_file.with_suffix('.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(self._cache, f)
+        os.replace(tmp, self.cache_file)
+
+    def _cached(self, url: str) -> Optional[ProbeResult]:
+        entry = self._cache.get(url)
+        if not entry:
+            return None
+        result = ProbeResult(**entry)
+        ttl = self.ttl if result.ok else FAILURE_TTL
+        return result if time.time() - result.probed_at < ttl else None
+
+    def probe_urls(self) -> Dict[str, Dict[str, str]]:
+        """{الأصلي: {المرآة: رابط الفحص}}؛ المستودعات تُفحص بملف InRelease لإصدارها"""
+        suites = {}
+        for uri, suite in read_sources(self.sources_list, self.sources_parts):
+            suites.setdefault(_strip(uri), suite)
+        urls = {}
+        for base, alternatives in self.candidates.items():
+            suite = suites.get(base)
+            path = f"/dists/{suite}/InRelease" if suite else '/'
+            urls[base] = {mirror: mirror + path for mirror in [base] + alternatives}
+        return urls
+
+    async def probe_all(self, refresh: bool = False) -> Dict[str, List[Tuple[str, ProbeResult]]]:
+        """نتائج كل المرايا لكل مستودع مرتبة من الأسرع؛ النتائج الحديثة تؤخذ من الذاكرة"""
+        urls = self.probe_urls()
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def run(url: str) -> ProbeResult:
+            cached = None if refresh else self._cached(url)
+            if cached is not None:
+                return cached
+            async with semaphore:
+                return await probe(url, self.probe_bytes, self.timeout)
+
+        unique = sorted({url for mirrors in urls.values() for url in mirrors.values()})
+        probed = dict(zip(unique, await asyncio.gather(*(run(url) for url in unique))))
+        for url, result in probed.items():
+            self._cache[url] = asdict(result)
+        await asyncio.get_running_loop().run_in_executor(None, self._save_cache)
+
+        ranking = {}
+        for base, mirrors in urls.items():
+            results = [(mirror, probed[url]) for mirror, url in mirrors.items()]
+            results.sort(key=lambda item: (not item[1].ok, -(item[1].throughput or 0)))
+            ranking[base] = results
+        return ranking
+
+    async def select(self, refresh: bool = False) -> Dict[str, Tuple[str, ProbeResult]]:
+        """أسرع مرآة تعمل لكل مستودع؛ يبقى الأصلي إن فشلت كلها"""
+        chosen = {}
+        for base, results in (await self.probe_all(refresh)).items():
+            mirror, result = results[0]
+            chosen[base] = (mirror, result) if result.ok else (base, result)
+        return chosen
+
+    def activate(self, chosen: Dict[str, Tuple[str, ProbeResult]]) -> SessionMirrors:
+        """نسخة من مصادر apt تستخدم المرايا المختارة في مجلد الجلسة؛ ملفات النظام لا تتغير"""
+        mapping = {base: mirror for base, (mirror, _) in chosen.items() if mirror != base}
+        throughput = {base: result.throughput for base, (_, result) in chosen.items() if result.ok}
+        session_dir = self.state_dir / "session"
+        shutil.rmtree(session_dir, ignore_errors=True)
+        if not mapping:
+            return SessionMirrors({}, throughput=throughput)
+        session = SessionMirrors(mapping, session_dir, throughput, self.sources_list, self.sources_parts)
+        session.sync()
+        return session
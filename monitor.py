@@ -0,0 +1,127 @@
+import threading
+import time
+from array import array
+from typing import Dict, List, Optional
+
+DEFAULT_INTERVAL = 1.0
+DEFAULT_CAPACITY = 120
+
+CPU = 'cpu'
+MEMORY = 'memory'
+DISK_READ = 'disk_read'
+DISK_WRITE = 'disk_write'
+NET_RECV = 'net_recv'
+NET_SENT = 'net_sent'
+
+
+class RingBuffer:
+    """مخزن دائري بسعة ثابتة مبني على array بدلاً من قائمة كائنات"""
+
+    __slots__ = ('capacity', '_data', '_next', '_count', '_lock')
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self._data = array('d', bytes(8 * capacity))
+        self._next = 0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def append(self, value: float):
+        with self._lock:
+            self._data[self._next] = value
+            self._next = (self._next + 1) % self.capacity
+            self._count = min(self._count + 1, self.capacity)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def last(self) -> Optional[float]:
+        with self._lock:
+            if not self._count:
+                return None
+            return self._data[self._next - 1]
+
+    def values(self) -> array:
+        """نسخة مرتبة من الأقدم إلى الأحدث"""
+        with self._lock:
+            if self._count < self.capacity:
+                return self._data[:self._count]
+            return self._data[self._next:] + self._data[:self._next]
+
+
+class ResourceSampler:
+    """خيط خلفي واحد يقرأ عدادات psutil دورياً ويخزنها في مخازن دائرية"""
+
+    def __init__(self, interval: float = DEFAULT_INTERVAL, capacity: int = DEFAULT_CAPACITY):
+        self.interval = interval
+        self.capacity = capacity
+        self.series: Dict[str, RingBuffer] = {
+            name: RingBuffer(capacity)
+            for name in (CPU, MEMORY, DISK_READ, DISK_WRITE, NET_RECV, NET_SENT)
+        }
+        self.per_core: List[RingBuffer] = []
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """بدء خيط أخذ العينات"""
+        if self.running:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='resource-sampler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """إيقاف خيط أخذ العينات"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 1)
+        self._thread = None
+
+    def _run(self):
+        import psutil
+
+        # أول استدعاء لـ cpu_percent يهيئ العداد فقط
+        psutil.cpu_percent(percpu=True)
+        self.per_core = [RingBuffer(self.capacity) for _ in range(psutil.cpu_count() or 1)]
+        last_disk = psutil.disk_io_counters()
+        last_net = psutil.net_io_counters()
+        last_time = time.monotonic()
+
+        while not self._stop_event.wait(self.interval):
+            now = time.monotonic()
+            elapsed = max(now - last_time, 1e-6)
+            last_time = now
+
+            cores = psutil.cpu_percent(percpu=True)
+            for buffer, value in zip(self.per_core, cores):
+                buffer.append(value)
+            self.series[CPU].append(sum(cores) / len(cores) if cores else 0.0)
+            self.series[MEMORY].append(psutil.virtual_memory().percent)
+
+            disk = psutil.disk_io_counters()
+            if disk is not None and last_disk is not None:
+                self.series[DISK_READ].append((disk.read_bytes - last_disk.read_bytes) / elapsed)
+                self.series[DISK_WRITE].append((disk.write_bytes - last_disk.write_bytes) / elapsed)
+            last_disk = disk
+
+            net = psutil.net_io_counters()
+            if net is not None and last_net is not None:
+                self.series[NET_RECV].append((net.bytes_recv - last_net.bytes_recv) / elapsed)
+                self.series[NET_SENT].append((net.bytes_sent - last_net.bytes_sent) / elapsed)
+            last_net = net
+
+
+def format_rate(bytes_per_second: Optional[float]) -> str:
+    """تنسيق معدل النقل بوحدة مناسبة"""
+    if bytes_per_second is None:
+        return "-"
+    for unit in ("B/s", "KB/s", "MB/s"):
+        if bytes_per_second < 1024:
+            return f"{bytes_per_second:.0f} {unit}"
+        bytes_per_second /= 1024
+    return f"{bytes_per_second:.1f} GB/s"
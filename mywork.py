@@ -1,208 +1,41 @@
 import customtkinter as ctk
-import platform
-import os
-import subprocess
-import distro
-import threading
-import json
-import psutil
-import logging
+import sys
 from datetime import datetime
-from pathlib import Path
-from typing import List, Dict, Callable, Optional
-from tkinter import messagebox
+from typing import List, Dict, Callable, Coroutine
+
+# وحدات ثقيلة أو نادرة الاستخدام (psutil، distro، messagebox) تُستورد عند الحاجة
+import sysinfo
+from engine import InstallerEngine
+from package_state import INSTALLED, UPGRADABLE
+from widgets import AppGrid, MonitorPanel, OutputConsole
+from output_log import OutputLog, DEFAULT_MAX_LINES
+from fleet import load_inventory
+from updates import UpdatePlan, human_size
+from records import AppSummary
+from monitor import ResourceSampler, DEFAULT_INTERVAL
+from ui_bus import UIEventBus, OutputEvent, ClearEvent, ProgressEvent, StatusEvent, CallEvent
 
 class SystemToolsGUI:
     def __init__(self):
-        # تهيئة مسارات الملفات أولاً
-        self.config_dir = Path.home() / ".config" / "system_tools"
-        self.config_file = self.config_dir / "config.json"
-        self.log_dir = self.config_dir / "logs"
-        
-        # إنشاء المجلدات اللازمة
-        self.setup_directories()
-        
-        # تهيئة نظام التسجيل
-        self.setup_logging()
-        
-        # تحميل الإعدادات
-        self.load_config()
-        
-        # الترجمات
-        self.translations = {
-            'en': {
-                'window_title': "System Tools Installation Manager",
-                'os_info': "Operating System: {}",
-                'cpu_info': "CPU: {} ({} cores)",
-                'memory_info': "Memory: {:.1f}GB Used / {:.1f}GB Total",
-                'disk_info': "Disk Space: {:.1f}GB Free / {:.1f}GB Total",
-                'install_nmap': "Install Nmap",
-                'install_brave': "Install Brave Browser",
-                'install_vscode': "Install VS Code",
-                'install_chrome': "Install Chrome",
-                'install_firefox': "Install Firefox",
-                'install_vlc': "Install VLC",
-                'install_gimp': "Install GIMP",
-                'install_obs': "Install OBS Studio",
-                'install_discord': "Install Discord",
-                'install_steam': "Install Steam",
-                'install_spotify': "Install Spotify",
-                'install_docker': "Install Docker",
-                'install_nodejs': "Install Node.js",
-                'install_python': "Install Python Tools",
-                'installing': "Installing...",
-                'error': "Error: {}",
-                'executing': "Executing: {}",
-                'success': "Installation Complete!",
-                'failed': "Installation Failed!",
-                'terminal_output': "Terminal Output:",
-                'progress': "Progress: {} of {} steps",
-                'system_update': "System Update",
-                'clear_output': "Clear Output",
-                'save_log': "Save Log",
-                'settings': "Settings",
-                'about': "About",
-                'quit': "Quit",
-                'confirm_quit': "Are you sure you want to quit?",
-                'yes': "Yes",
-                'no': "No",
-                'theme_light': "Light Theme",
-                'theme_dark': "Dark Theme",
-                'theme_system': "System Theme",
-                'installation_history': "Installation History",
-                'last_update': "Last Update: {}",
-                'never': "Never",
-                'update_available': "Updates Available",
-                'system_updated': "System is up to date",
-                'loading': "Loading...",
-                'ready': "Ready"
-            }
-        }
-        
-        # تعريف التطبيقات
-        self.apps = {
-            'development': {
-                'vscode': {
-                    'name': 'install_vscode',
-                    'description': 'Code Editor',
-                    'commands': [
-                        "sudo apt install software-properties-common apt-transport-https wget -y",
-                        "wget -q https://packages.microsoft.com/keys/microsoft.asc -O- | sudo apt-key add -",
-                        "sudo add-apt-repository 'deb [arch=amd64] https://packages.microsoft.com/repos/vscode stable main'",
-                        "sudo apt update",
-                        "sudo apt install code -y"
-                    ]
-                },
-                'nodejs': {
-                    'name': 'install_nodejs',
-                    'description': 'JavaScript Runtime',
-                    'commands': [
-                        "curl -fsSL https://deb.nodesource.com/setup_lts.x | sudo -E bash -",
-                        "sudo apt install nodejs -y"
-                    ]
-                }
-            },
-            'browsers': {
-                'brave': {
-                    'name': 'install_brave',
-                    'description': 'Privacy Browser',
-                    'commands': [
-                        "sudo apt install apt-transport-https curl -y",
-                        "sudo curl -fsSLo /usr/share/keyrings/brave-browser-archive-keyring.gpg https://brave-browser-apt-release.s3.brave.com/brave-browser-archive-keyring.gpg",
-                        'echo "deb [signed-by=/usr/share/keyrings/brave-browser-archive-keyring.gpg arch=amd64] https://brave-browser-apt-release.s3.brave.com/ stable main" | sudo tee /etc/apt/sources.list.d/brave-browser-release.list',
-                        "sudo apt update",
-                        "sudo apt install brave-browser -y"
-                    ]
-                },
-                'chrome': {
-                    'name': 'install_chrome',
-                    'description': 'Google Chrome',
-                    'commands': [
-                        "wget https://dl.google.com/linux/direct/google-chrome-stable_current_amd64.deb",
-                        "sudo apt install ./google-chrome-stable_current_amd64.deb -y",
-                        "rm google-chrome-stable_current_amd64.deb"
-                    ]
-                }
-            },
-            'multimedia': {
-                'vlc': {
-                    'name': 'install_vlc',
-                    'description': 'Media Player',
-                    'commands': ["sudo apt install vlc -y"]
-                },
-                'obs': {
-                    'name': 'install_obs',
-                    'description': 'Streaming Software',
-                    'commands': ["sudo apt install obs-studio -y"]
-                }
-            },
-            'utilities': {
-                'nmap': {
-                    'name': 'install_nmap',
-                    'description': 'Network Scanner',
-                    'commands': ["sudo apt install nmap -y"]
-                },
-                'docker': {
-                    'name': 'install_docker',
-                    'description': 'Container Platform',
-                    'commands': [
-                        "sudo apt update",
-                        "sudo apt install apt-transport-https ca-certificates curl software-properties-common -y",
-                        "curl -fsSL https://download.docker.com/linux/ubuntu/gpg | sudo gpg --dearmor -o /usr/share/keyrings/docker-archive-keyring.gpg",
-                        'echo "deb [arch=$(dpkg --print-architecture) signed-by=/usr/share/keyrings/docker-archive-keyring.gpg] https://download.docker.com/linux/ubuntu $(lsb_release -cs) stable" | sudo tee /etc/apt/sources.list.d/docker.list > /dev/null',
-                        "sudo apt update",
-                        "sudo apt install docker-ce docker-ce-cli containerd.io -y",
-                        "sudo usermod -aG docker $USER"
-                    ]
-                }
-            }
-        }
-        
-        self.current_lang = 'en'
-        self.setup_gui()
-        self.load_installation_history()
-
-    def setup_directories(self):
-        """إنشاء المجلدات الضرورية"""
-        self.config_dir.mkdir(parents=True, exist_ok=True)
-        self.log_dir.mkdir(parents=True, exist_ok=True)
-
-    def setup_logging(self):
-        """تهيئة نظام التسجيل"""
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.StreamHandler(),
-                logging.FileHandler(self.log_dir / f"system_tools_{datetime.now():%Y%m%d}.log")
-            ]
+        # المحرك يتولى الإعدادات والكتالوج والتنفيذ والسجل؛ الواجهة عميل رقيق له
+        self.engine = InstallerEngine(
+            on_output=self.write_output,
+            on_clear=self.clear_output,
+            on_progress=self.update_progress,
+            on_status=self.update_status
         )
-        self.logger = logging.getLogger(__name__)
-
-    def load_config(self):
-        """تحميل الإعدادات من الملف"""
-        try:
-            if self.config_file.exists():
-                with open(self.config_file) as f:
-                    self.config = json.load(f)
-            else:
-                self.config = {
-                    'theme': 'dark',
-                    'installation_history': [],
-                    'last_update': None
-                }
-                self.save_config()
-        except Exception as e:
-            self.logger.error(f"Failed to load config: {e}")
-            self.config = {'theme': 'dark', 'installation_history': []}
+        self.config = self.engine.config
+        self.log_dir = self.engine.log_dir
+        self.logger = self.engine.logger
+        self.catalog = self.engine.catalog
+        self.history = self.engine.history
+        # المخرجات الكاملة لكل عملية في ملف؛ منطقة الإخراج تعرض الذيل فقط
+        self.output_log = OutputLog(self.log_dir / "output")
+        self.setup_gui()
 
     def save_config(self):
         """حفظ الإعدادات في الملف"""
-        try:
-            with open(self.config_file, 'w') as f:
-                json.dump(self.config, f, indent=4)
-        except Exception as e:
-            self.logger.error(f"Failed to save config: {e}")
+        self.engine.save_config()
 
     def setup_gui(self):
         """تهيئة واجهة المستخدم"""
@@ -218,13 +51,30 @@ class SystemToolsGUI:
         # إنشاء أقسام الواجهة
         self.create_menu_bar()
         self.create_system_info()
+        self.create_monitor_panel()
         self.create_notebook()
         self.create_progress_section()
         self.create_status_bar()
+        
+        # ناقل الأحداث: خيوط العمل تنشر الأحداث والخيط الرئيسي يطبقها دورياً
+        self.ui_bus = UIEventBus(
+            on_output=self._apply_output,
+            on_clear=self._apply_clear,
+            on_progress=self._apply_progress,
+            on_status=self._apply_status
+        )
+        self.ui_bus.start(self.root)
+        
+        # الفحوص تبدأ بعد أول رسم للنافذة
+        self.root.after_idle(self.start_system_probes)
 
     def get_text(self, key: str) -> str:
         """الحصول على النص المترجم"""
-        return self.translations[self.current_lang].get(key, f"[{key}]")
+        return self.engine.get_text(key)
+
+    def app_title(self, app_info: AppSummary) -> str:
+        """اسم التطبيق المعروض: مفتاح ترجمة أو نص حرفي من الكتالوج"""
+        return self.engine.app_title(app_info)
 
     def create_menu_bar(self):
         """إنشاء شريط القوائم"""
@@ -234,6 +84,7 @@ class SystemToolsGUI:
         # أزرار القوائم
         buttons = [
             ("System Update", self.system_update),
+            ("Batch Install", self.show_batch_install),
             ("Settings", self.show_settings),
             ("History", self.show_history),
             ("About", self.show_about)
@@ -259,101 +110,100 @@ class SystemToolsGUI:
         theme_menu.pack(side="right", padx=5)
 
     def create_system_info(self):
-        """إنشاء قسم معلومات النظام"""
+        """إنشاء قسم معلومات النظام بعناوين مؤقتة تُملأ عند انتهاء كل فحص"""
         info_frame = ctk.CTkFrame(self.main_frame)
         info_frame.pack(fill="x", padx=20, pady=10)
         
-        # معلومات النظام
-        system_info = self.get_detailed_system_info()
-        for key, value in system_info.items():
+        self.info_labels = {}
+        for key in sysinfo.PROBE_KEYS:
             label = ctk.CTkLabel(
                 info_frame,
-                text=f"{key}: {value}",
+                text=f"{key}: {self.get_text('loading')}",
                 font=("Arial", 12)
             )
             label.pack(pady=2)
+            self.info_labels[key] = label
+
+    def create_monitor_panel(self):
+        """إنشاء لوحة مراقبة الموارد الحية (المعالج، الذاكرة، القرص، الشبكة)"""
+        self.monitor_panel = None
+        if not self.config.get('monitor_enabled', True):
+            return
+        interval = float(self.config.get('monitor_interval', DEFAULT_INTERVAL))
+        sampler = ResourceSampler(interval=interval)
+        self.monitor_panel = MonitorPanel(self.main_frame, sampler, refresh_ms=int(interval * 1000))
+        self.monitor_panel.pack(fill="x", padx=20, pady=(0, 10))
+        self.root.after_idle(self.monitor_panel.start)
+
+    def start_system_probes(self):
+        """تشغيل فحوص معلومات النظام في الخلفية بعد ظهور النافذة"""
+        sysinfo.probe_async(self.get_text, self._on_probe_result, self.logger)
+        self.refresh_app_states()
+
+    def _on_probe_result(self, key: str, value: str):
+        self.ui_bus.post(CallEvent(
+            lambda: self.info_labels[key].configure(text=f"{key}: {value}")
+        ))
 
     def get_detailed_system_info(self) -> Dict[str, str]:
-        """الحصول على معلومات مفصلة عن النظام"""
-        try:
-            # معلومات نظام التشغيل
-            os_name = distro.name(pretty=True) if hasattr(distro, 'name') else platform.system()
-            os_version = distro.version() if hasattr(distro, 'version') else platform.version()
-            
-            # معلومات المعالج
-            cpu_info = platform.processor()
-            cpu_cores = psutil.cpu_count(logical=False)
-            cpu_threads = psutil.cpu_count(logical=True)
-            
-            # معلومات الذاكرة
-            mem = psutil.virtual_memory()
-            mem_total_gb = mem.total / (1024 ** 3)
-            mem_used_gb = mem.used / (1024 ** 3)
-            
-            # معلومات القرص
-            disk = psutil.disk_usage('/')
-            disk_total_gb = disk.total / (1024 ** 3)
-            disk_free_gb = disk.free / (1024 ** 3)
-            
-            return {
-                "OS": f"{os_name} {os_version}",
-                "CPU": f"{cpu_info} ({cpu_cores} cores, {cpu_threads} threads)",
-                "Memory": self.get_text('memory_info').format(mem_used_gb, mem_total_gb),
-                "Disk": self.get_text('disk_info').format(disk_free_gb, disk_total_gb),
-                "Python": platform.python_version()
-            }
-        except Exception as e:
-            self.logger.error(f"Failed to get system info: {e}")
-            return {
-                "OS": "Unknown",
-                "CPU": "Unknown",
-                "Memory": "Unknown",
-                "Disk": "Unknown",
-                "Python": platform.python_version()
-            }
+        """الحصول على معلومات مفصلة عن النظام (بشكل متزامن)"""
+        return sysinfo.collect(self.get_text, self.logger)
 
     def create_notebook(self):
-        """إنشاء دفتر تبويب للتطبيقات"""
-        self.notebook = ctk.CTkTabview(self.main_frame)
+        """إنشاء دفتر تبويب للتطبيقات؛ محتوى كل تبويب يُبنى عند أول اختيار له"""
+        self.notebook = ctk.CTkTabview(self.main_frame, command=self.on_tab_selected)
         self.notebook.pack(fill="both", expand=True, padx=20, pady=10)
         
-        # إنشاء تبويبات لكل فئة
-        for category, apps in self.apps.items():
-            tab = self.notebook.add(category.title())
-            self.create_category_buttons(tab, apps)
-
-    def create_category_buttons(self, tab, apps):
-        """إنشاء أزرار للتطبيقات في كل فئة"""
-        button_frame = ctk.CTkFrame(tab)
-        button_frame.pack(fill="both", expand=True, padx=10, pady=10)
-        
-        row = 0
-        col = 0
-        max_cols = 3
-        
-        button_style = {
-            "font": ("Arial", 14, "bold"),
-            "width": 200,
-            "height": 40,
-            "corner_radius": 8
-        }
+        # إنشاء تبويبات فارغة لكل فئة
+        self.tab_categories = {}
+        self.app_grids = {}
+        for category in self.catalog.categories():
+            self.notebook.add(category.title())
+            self.tab_categories[category.title()] = category
         
-        for app_id, app_info in apps.items():
-            btn = ctk.CTkButton(
-                button_frame,
-                text=f"{self.get_text(app_info['name'])}\n{app_info['description']}",
-                command=lambda a=app_id, i=app_info: self.run_installation(
-                    lambda: self.install_app(a, i)
-                ),
-                **button_style
-            )
-            btn.grid(row=row, column=col, padx=10, pady=10, sticky="nsew")
-            setattr(self, f"{app_id}_btn", btn)
-            
-            col += 1
-            if col >= max_cols:
-                col = 0
-                row += 1
+        self.on_tab_selected()
+
+    def on_tab_selected(self):
+        """بناء أزرار التبويب الحالي إن لم يكن قد بُني"""
+        tab_name = self.notebook.get()
+        category = self.tab_categories.get(tab_name)
+        if category is None or category in self.app_grids:
+            return
+        self.app_grids[category] = self.create_category_buttons(
+            self.notebook.tab(tab_name),
+            self.catalog.apps(category)
+        )
+
+    def create_category_buttons(self, tab, apps) -> AppGrid:
+        """إنشاء شبكة أزرار التطبيقات للفئة"""
+        grid = AppGrid(
+            tab,
+            apps,
+            title_for=self.app_title,
+            on_select=lambda a: self.run_installation(lambda: self.install_apps([a])),
+            search_label=self.get_text('search'),
+            status_for=self.app_status_mark
+        )
+        grid.pack(fill="both", expand=True, padx=10, pady=10)
+        return grid
+
+    def app_status_mark(self, app_id: str) -> str:
+        """علامة حالة التثبيت تسبق اسم التطبيق على الزر"""
+        state = self.engine.app_state(app_id)
+        if state == INSTALLED:
+            return f"✓ {self.get_text('state_installed')}: "
+        if state == UPGRADABLE:
+            return f"↑ {self.get_text('state_upgradable')}: "
+        return ""
+
+    def refresh_app_states(self):
+        """تحديث فهرس الحزم في الخلفية ثم إعادة رسم الأزرار"""
+        future = self.engine.submit(self.engine.refresh_package_state())
+        future.add_done_callback(lambda f: self.ui_bus.post(CallEvent(self._refresh_grids)))
+
+    def _refresh_grids(self):
+        for grid in self.app_grids.values():
+            grid.refresh()
 
     def create_progress_section(self):
         """إنشاء قسم التقدم والإخراج"""
@@ -380,12 +230,13 @@ class SystemToolsGUI:
         )
         output_label.pack(pady=5)
         
-        self.output_text = ctk.CTkTextbox(
+        self.output_console = OutputConsole(
             progress_frame,
-            height=150,
-            font=("Courier", 12)
+            self.output_log,
+            max_lines=self.config.get('output_max_lines', DEFAULT_MAX_LINES),
+            search_label=self.get_text('search_log')
         )
-        self.output_text.pack(fill="x", pady=5)
+        self.output_console.pack(fill="x", pady=5)
         
         # أزرار التحكم
         button_frame = ctk.CTkFrame(progress_frame)
@@ -404,6 +255,13 @@ class SystemToolsGUI:
             command=self.save_log,
             width=120
         ).pack(side="left", padx=5)
+        
+        ctk.CTkButton(
+            button_frame,
+            text=self.get_text('cancel'),
+            command=self.cancel_operation,
+            width=120
+        ).pack(side="left", padx=5)
 
     def create_status_bar(self):
         """إنشاء شريط الحالة"""
@@ -415,148 +273,279 @@ class SystemToolsGUI:
         self.status_bar.pack(fill="x", padx=20, pady=5)
 
     def update_status(self, message: str):
-        """تحديث شريط الحالة"""
-        self.status_bar.configure(text=message)
-        self.root.update()
+        """تحديث شريط الحالة (آمن من أي خيط)"""
+        self.ui_bus.post(StatusEvent(message))
 
     def update_progress(self, current: int, total: int):
-        """تحديث شريط التقدم"""
+        """تحديث شريط التقدم (آمن من أي خيط)"""
+        self.ui_bus.post(ProgressEvent(current, total))
+
+    def write_output(self, text: str):
+        """إضافة نص إلى منطقة الإخراج (آمن من أي خيط)"""
+        self.ui_bus.post(OutputEvent(text))
+
+    def clear_output(self):
+        """مسح منطقة الإخراج (آمن من أي خيط)"""
+        self.ui_bus.post(ClearEvent())
+
+    def _apply_status(self, message: str):
+        self.status_bar.configure(text=message)
+
+    def _apply_progress(self, current: int, total: int):
         self.progress_label.configure(
             text=self.get_text('progress').format(current, total)
         )
-        self.progress_bar.set(current / total)
-        self.root.update()
+        self.progress_bar.set(current / total if total else 0)
 
-    def clear_output(self):
-        """مسح منطقة الإخراج"""
-        self.output_text.delete(1.0, "end")
+    def _apply_output(self, text: str):
+        self.output_console.append(text)
+
+    def _apply_clear(self):
+        self.output_console.clear()
 
     def save_log(self):
         """حفظ السجل في ملف"""
         try:
             log_file = self.log_dir / f"installation_{datetime.now():%Y%m%d_%H%M%S}.log"
-            with open(log_file, "w") as f:
-                f.write(self.output_text.get(1.0, "end"))
+            self.output_log.save_to(log_file)
             self.update_status(f"Log saved to {log_file}")
         except Exception as e:
             self.update_status(self.get_text('error').format(str(e)))
 
-    def run_installation(self, installation_func: Callable):
-        """تشغيل التثبيت في خيط منفصل"""
-        thread = threading.Thread(target=installation_func, daemon=True)
-        thread.start()
+    def run_installation(self, operation: Callable[[], Coroutine]):
+        """جدولة العملية كـ coroutine على حلقة المحرك؛ التحديثات تصل عبر ناقل الواجهة"""
+        future = self.engine.submit(operation())
+        future.add_done_callback(self._on_operation_done)
 
-    def install_app(self, app_id: str, app_info: dict):
+    def _on_operation_done(self, future):
+        self.refresh_app_states()
+        if not future.cancelled() and future.exception() is not None:
+            self.logger.error(f"Operation failed: {future.exception()}")
+            self.update_status(self.get_text('error').format(future.exception()))
+
+    def cancel_operation(self):
+        """إلغاء العملية الجارية"""
+        self.engine.cancel()
+        self.update_status(self.get_text('cancelled'))
+
+    def install_apps(self, app_ids: List[str]):
+        """تثبيت عدة تطبيقات بخطة مدمجة: إعداد بالتوازي ثم تحديث وتثبيت apt واحد"""
+        return self.engine.install_apps_async(app_ids)
+
+    def install_app(self, app_id: str, app_info: AppSummary):
         """تثبيت التطبيق"""
-        self.logger.info(f"Installing {app_id}")
-        self.output_text.delete(1.0, "end")
-        commands = app_info['commands']
+        self.run_installation(lambda: self.install_apps([app_id]))
+
+    def show_batch_install(self):
+        """عرض نافذة اختيار عدة تطبيقات لتثبيتها دفعة واحدة"""
+        batch_window = ctk.CTkToplevel(self.root)
+        batch_window.title(self.get_text('batch_install'))
+        batch_window.geometry("400x500")
+        
+        list_frame = ctk.CTkScrollableFrame(batch_window)
+        list_frame.pack(fill="both", expand=True, padx=10, pady=10)
+        
+        selection = {}
+        for category in self.catalog.categories():
+            ctk.CTkLabel(list_frame, text=category.title(), font=("Arial", 12, "bold")).pack(anchor="w", pady=(8, 2))
+            for app_id, app_info in self.catalog.apps(category).items():
+                var = ctk.BooleanVar(value=False)
+                ctk.CTkCheckBox(
+                    list_frame,
+                    text=self.app_title(app_info),
+                    variable=var
+                ).pack(anchor="w", padx=10, pady=2)
+                selection[app_id] = var
+        
+        def selected_apps():
+            return [app_id for app_id, var in selection.items() if var.get()]
+        
+        def preview_plan():
+            app_ids = selected_apps()
+            if app_ids:
+                self.clear_output()
+                self.write_output(self.engine.build_plan(app_ids).describe())
+        
+        def install_selected():
+            app_ids = selected_apps()
+            if app_ids:
+                batch_window.destroy()
+                self.run_installation(lambda: self.install_apps(app_ids))
+        
+        actions_frame = ctk.CTkFrame(batch_window)
+        actions_frame.pack(pady=10)
         
-        try:
-            total_steps = len(commands)
-            for i, cmd in enumerate(commands, 1):
-                self.output_text.insert("end", f"{self.get_text('executing').format(cmd)}\n")
-                self.update_status(f"Running command {i} of {total_steps}")
-                
-                result = subprocess.run(
-                    cmd,
-                    shell=True,
-                    capture_output=True,
-                    text=True
-                )
-                
-                self.output_text.insert("end", f"Output:\n{result.stdout}\n")
-                if result.stderr:
-                    self.output_text.insert("end", f"Errors:\n{result.stderr}\n")
-                
-                self.update_progress(i, total_steps)
-                self.output_text.see("end")
+        ctk.CTkButton(
+            actions_frame,
+            text=self.get_text('preview_plan'),
+            command=preview_plan
+        ).pack(side="left", padx=5)
+        
+        ctk.CTkButton(
+            actions_frame,
+            text=self.get_text('install_selected'),
+            command=install_selected
+        ).pack(side="left", padx=5)
+        
+        inventory = self.config.get('fleet_inventory')
+        if inventory:
+            def install_on_fleet():
+                app_ids = selected_apps()
+                if not app_ids:
+                    return
+                try:
+                    hosts = load_inventory(inventory)
+                except (OSError, ValueError) as e:
+                    self.update_status(self.get_text('error').format(e))
+                    return
+                batch_window.destroy()
+                self.run_installation(lambda: self.engine.fleet_install_async(app_ids, hosts))
             
-            success = True
-            self.output_text.insert("end", f"\n{self.get_text('success')}\n")
-        except Exception as e:
-            success = False
-            self.logger.error(f"Installation failed: {e}")
-            self.output_text.insert("end", self.get_text('error').format(str(e)) + "\n")
-        
-        self.add_to_history(app_id, success)
-        self.update_status(self.get_text('ready'))
-
-    def add_to_history(self, app_id: str, success: bool):
-        """إضافة التثبيت إلى السجل"""
-        entry = {
-            'app': app_id,
-            'timestamp': datetime.now().isoformat(),
-            'success': success
-        }
-        self.config['installation_history'].append(entry)
-        self.save_config()
-
-    def load_installation_history(self):
-        """تحميل سجل التثبيتات"""
-        if 'installation_history' not in self.config:
-            self.config['installation_history'] = []
+            ctk.CTkButton(
+                actions_frame,
+                text=self.get_text('install_fleet'),
+                command=install_on_fleet
+            ).pack(side="left", padx=5)
 
     def show_history(self):
-        """عرض سجل التثبيتات"""
+        """عرض سجل التثبيتات صفحةً صفحة مع التصفية حسب التطبيق والحالة"""
         history_window = ctk.CTkToplevel(self.root)
         history_window.title(self.get_text('installation_history'))
-        history_window.geometry("600x400")
+        history_window.geometry("700x500")
+        
+        page_size = 50
+        state = {'page': 0}
+        
+        filter_frame = ctk.CTkFrame(history_window)
+        filter_frame.pack(fill="x", padx=10, pady=(10, 0))
+        
+        app_var = ctk.StringVar()
+        ctk.CTkEntry(filter_frame, textvariable=app_var, placeholder_text="App", width=160).pack(side="left", padx=5)
+        
+        status_var = ctk.StringVar(value="All")
+        ctk.CTkOptionMenu(
+            filter_frame,
+            values=["All", "Success", "Failed"],
+            variable=status_var,
+            command=lambda _: show_page(0),
+            width=110
+        ).pack(side="left", padx=5)
         
         textbox = ctk.CTkTextbox(history_window, font=("Courier", 12))
         textbox.pack(fill="both", expand=True, padx=10, pady=10)
         
-        if not self.config['installation_history']:
-            textbox.insert("end", "No installation history found\n")
-        else:
-            for entry in self.config['installation_history']:
-                status = "Success" if entry['success'] else "Failed"
-                textbox.insert(
-                    "end",
-                    f"{entry['timestamp']} - {entry['app']} - {status}\n"
-                )
+        nav_frame = ctk.CTkFrame(history_window)
+        nav_frame.pack(fill="x", padx=10, pady=(0, 10))
+        page_label = ctk.CTkLabel(nav_frame, text="")
+        
+        def filters():
+            status = status_var.get()
+            return {
+                'app': app_var.get().strip() or None,
+                'success': None if status == "All" else status == "Success"
+            }
+        
+        def show_page(page: int):
+            total = self.history.count(**filters())
+            pages = max(1, -(-total // page_size))
+            state['page'] = max(0, min(page, pages - 1))
+            entries = self.history.query(limit=page_size, offset=state['page'] * page_size, **filters())
+            
+            textbox.delete(1.0, "end")
+            if not entries:
+                textbox.insert("end", "No installation history found\n")
+            lines = []
+            for entry in entries:
+                status = "Success" if entry.success else "Failed"
+                lines.append(f"{entry.timestamp} - {entry.app} - {status}\n")
+                for step in entry.steps:
+                    lines.append(f"    {step.duration:8.2f}s  [{step.exit_code}]  {step.command}\n")
+                if entry.trace:
+                    lines.append(f"    trace: {entry.trace}\n")
+            textbox.insert("end", ''.join(lines))
+            page_label.configure(text=f"{state['page'] + 1} / {pages}  ({total})")
+        
+        ctk.CTkButton(nav_frame, text="<", width=40, command=lambda: show_page(state['page'] - 1)).pack(side="left", padx=5)
+        page_label.pack(side="left", expand=True)
+        ctk.CTkButton(nav_frame, text=">", width=40, command=lambda: show_page(state['page'] + 1)).pack(side="right", padx=5)
+        ctk.CTkButton(filter_frame, text=self.get_text('search'), width=100, command=lambda: show_page(0)).pack(side="left", padx=5)
+        
+        show_page(0)
 
     def system_update(self):
-        """تحديث النظام"""
-        self.run_installation(self._perform_system_update)
+        """تحديث النظام: خطة تدريجية يُختار منها، أو ترقية كاملة إن عُطلت"""
+        if not self.config.get('incremental_updates', True):
+            self.run_installation(self._perform_system_update)
+            return
+        future = self.engine.submit(self.engine.plan_update_async())
+        future.add_done_callback(lambda f: self.ui_bus.post(CallEvent(lambda: self._on_update_plan(f))))
+
+    def _on_update_plan(self, future):
+        if future.cancelled():
+            return
+        if future.exception() is not None:
+            self.logger.error(f"Update planning failed: {future.exception()}")
+            self.update_status(self.get_text('error').format(future.exception()))
+            return
+        plan = future.result()
+        if not plan:
+            self.update_status(self.get_text('system_updated'))
+            return
+        self.show_update_plan(plan)
+
+    def show_update_plan(self, plan: UpdatePlan):
+        """نافذة اختيار الحزم المراد ترقيتها مع حجم التنزيل"""
+        window = ctk.CTkToplevel(self.root)
+        window.title(self.get_text('system_update'))
+        window.geometry("560x500")
+        
+        summary = ctk.CTkLabel(window, text="")
+        summary.pack(fill="x", padx=10, pady=(10, 0))
+        
+        list_frame = ctk.CTkScrollableFrame(window)
+        list_frame.pack(fill="both", expand=True, padx=10, pady=10)
+        
+        selection = {}
+        
+        def selected_packages():
+            return [name for name, var in selection.items() if var.get()]
+        
+        def refresh_summary():
+            names = selected_packages()
+            summary.configure(text=self.get_text('upgrade_summary').format(
+                len(names), len(selection), human_size(plan.download_size(names))))
+        
+        for name in sorted(plan.updates):
+            update = plan.updates[name]
+            size = human_size(update.size) if update.size else "cached"
+            var = ctk.BooleanVar(value=True)
+            ctk.CTkCheckBox(
+                list_frame,
+                text=f"{'* ' if update.new else ''}{name}  {update.current} -> {update.candidate}  ({size})",
+                variable=var,
+                command=refresh_summary
+            ).pack(anchor="w", padx=10, pady=2)
+            selection[name] = var
+        refresh_summary()
+        
+        def upgrade_selected():
+            names = selected_packages()
+            if names:
+                window.destroy()
+                self.run_installation(lambda: self.engine.incremental_update_async(plan, names))
+        
+        def full_upgrade():
+            window.destroy()
+            self.run_installation(self._perform_system_update)
+        
+        actions_frame = ctk.CTkFrame(window)
+        actions_frame.pack(pady=10)
+        ctk.CTkButton(actions_frame, text=self.get_text('upgrade_selected'), command=upgrade_selected).pack(side="left", padx=5)
+        ctk.CTkButton(actions_frame, text=self.get_text('full_upgrade'), command=full_upgrade).pack(side="left", padx=5)
 
     def _perform_system_update(self):
         """تنفيذ تحديث النظام"""
-        commands = [
-            "sudo apt update",
-            "sudo apt upgrade -y",
-            "sudo apt autoremove -y"
-        ]
-        
-        self.output_text.delete(1.0, "end")
-        self.update_status(self.get_text('system_update'))
-        
-        try:
-            total_steps = len(commands)
-            for i, cmd in enumerate(commands, 1):
-                self.output_text.insert("end", f"{self.get_text('executing').format(cmd)}\n")
-                
-                result = subprocess.run(
-                    cmd,
-                    shell=True,
-                    capture_output=True,
-                    text=True
-                )
-                
-                self.output_text.insert("end", f"Output:\n{result.stdout}\n")
-                if result.stderr:
-                    self.output_text.insert("end", f"Errors:\n{result.stderr}\n")
-                
-                self.update_progress(i, total_steps)
-                self.output_text.see("end")
-            
-            self.config['last_update'] = datetime.now().isoformat()
-            self.save_config()
-            self.output_text.insert("end", f"\n{self.get_text('system_updated')}\n")
-        except Exception as e:
-            self.output_text.insert("end", self.get_text('error').format(str(e)) + "\n")
-        
-        self.update_status(self.get_text('ready'))
+        return self.engine.system_update_async()
 
     def show_settings(self):
         """عرض الإعدادات"""
@@ -591,10 +580,14 @@ class SystemToolsGUI:
 
     def on_closing(self):
         """معالجة حدث إغلاق النافذة"""
+        from tkinter import messagebox
         if messagebox.askyesno(
             self.get_text('quit'),
             self.get_text('confirm_quit')
         ):
+            if self.monitor_panel is not None:
+                self.monitor_panel.stop()
+            self.output_log.close()
             self.root.destroy()
 
     def run(self):
@@ -603,5 +596,9 @@ class SystemToolsGUI:
         self.root.mainloop()
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        # وضع سطر الأوامر؛ للتشغيل دون استيراد Tk إطلاقاً استخدم cli.py مباشرة
+        from cli import main
+        sys.exit(main())
     app = SystemToolsGUI()
     app.run()
\ No newline at end of file
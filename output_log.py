@@ -0,0 +1,68 @@
+import shutil
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+# عدد الأسطر المعروضة في منطقة الإخراج؛ الباقي في ملف الجلسة على القرص
+DEFAULT_MAX_LINES = 5000
+# عدد ملفات الجلسات القديمة المحتفظ بها
+KEEP_SESSIONS = 20
+MAX_SEARCH_RESULTS = 1000
+
+
+class OutputLog:
+    """المخرجات الكاملة لكل عملية في ملف جلسة؛ الواجهة تعرض الذيل فقط"""
+
+    def __init__(self, directory: Path, keep: int = KEEP_SESSIONS):
+        self.directory = Path(directory)
+        self.keep = keep
+        self.path: Optional[Path] = None
+        self._file = None
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def start(self) -> Path:
+        """بدء ملف جلسة جديد (عند مسح الإخراج أو بداية عملية)"""
+        self.close()
+        self.path = self.directory / f"session_{datetime.now():%Y%m%d_%H%M%S_%f}.log"
+        self._file = open(self.path, 'a', encoding='utf-8', errors='replace')
+        self.prune()
+        return self.path
+
+    def write(self, text: str):
+        if self._file is None:
+            self.start()
+        self._file.write(text)
+        self._file.flush()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def prune(self):
+        """حذف ملفات الجلسات الأقدم من آخر keep ملفات"""
+        sessions = sorted(self.directory.glob("session_*.log"))
+        for old in sessions[:-self.keep]:
+            if old != self.path:
+                old.unlink(missing_ok=True)
+
+    def save_to(self, destination: Path) -> Path:
+        """نسخ ملف الجلسة الحالية كما هو بدلاً من قراءة محتوى الواجهة"""
+        if self.path is None:
+            self.start()
+        shutil.copyfile(self.path, destination)
+        return Path(destination)
+
+    def search(self, query: str, limit: int = MAX_SEARCH_RESULTS) -> List[Tuple[int, str]]:
+        """البحث في ملف الجلسة سطراً بسطر دون تحميله في الذاكرة؛ يعيد (رقم السطر، السطر)"""
+        if self.path is None or not query:
+            return []
+        needle = query.lower()
+        matches = []
+        with open(self.path, encoding='utf-8', errors='replace') as f:
+            for number, line in enumerate(f, 1):
+                if needle in line.lower():
+                    matches.append((number, line.rstrip('\n')))
+                    if len(matches) >= limit:
+                        break
+        return matches
@@ -0,0 +1,112 @@
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from backends import PackageBackend
+from planner import parse_apt_command
+
+INSTALLED = 'installed'
+UPGRADABLE = 'upgradable'
+MISSING = 'missing'
+UNKNOWN = 'unknown'
+
+
+def app_packages(entry: dict) -> List[str]:
+    """الأسماء المنطقية لحزم التطبيق: الحقل packages أو حزم آخر أمر apt install"""
+    if 'packages' in entry:
+        return list(entry['packages'])
+    packages: List[str] = []
+    for command in entry.get('commands', []):
+        parsed = parse_apt_command(command)
+        if parsed and parsed[0] == 'install':
+            packages = [p for p in parsed[1] if not p.startswith(('.', '/')) and not p.endswith('.deb')]
+    return packages
+
+
+def _stamp(path: Path) -> Optional[Tuple[int, int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+class PackageState:
+    """فهرس الحزم المثبتة من استعلام واحد لمدير الحزم، يُبطل حسب mtime قاعدته"""
+
+    def __init__(self, backend: PackageBackend):
+        self.backend = backend
+        self.status_file = backend.state_path
+        self.lists_dir = backend.index_path
+        self._lock = threading.Lock()
+        self._stamp: Optional[Tuple[int, int]] = None
+        self._installed: Dict[str, str] = {}
+        self._upgradable_stamp = None
+        self._upgradable: Optional[Dict[str, str]] = None
+
+    @property
+    def available(self) -> bool:
+        return self.status_file.exists()
+
+    def installed(self) -> Dict[str, str]:
+        """{الحزمة: الإصدار المثبت}؛ يعاد التحليل فقط إذا تغير ملف الحالة"""
+        stamp = _stamp(self.status_file)
+        with self._lock:
+            if stamp != self._stamp:
+                self._installed = self.backend.installed()
+                self._stamp = stamp
+            return self._installed
+
+    def index_stamp(self):
+        """بصمة قاعدة الحزم وفهرس المستودعات؛ تتغير بعد تحديث الفهرس أو أي تثبيت"""
+        return _stamp(self.status_file), _stamp(self.lists_dir)
+
+    def lists_age(self) -> Optional[float]:
+        """ثوانٍ منذ آخر تحديث للفهرس، أو None إن لم يوجد"""
+        try:
+            return time.time() - os.stat(self.lists_dir).st_mtime
+        except OSError:
+            return None
+
+    def cached_upgradable(self) -> Dict[str, str]:
+        """الحزم القابلة للترقية من آخر فحص ما زال صالحاً، دون استعلام مدير الحزم"""
+        with self._lock:
+            if self._upgradable is not None and self._upgradable_stamp == self.index_stamp():
+                return self._upgradable
+        return {}
+
+    def remember_upgradable(self, upgradable: Dict[str, str], stamp):
+        """اعتماد نتيجة محفوظة من تشغيل سابق ما دامت البصمة لم تتغير"""
+        with self._lock:
+            self._upgradable, self._upgradable_stamp = dict(upgradable), stamp
+
+    def upgradable(self) -> Dict[str, str]:
+        """{الحزمة: الإصدار المرشح} من مدير الحزم (بطيء؛ يُستدعى في الخلفية)"""
+        key = self.index_stamp()
+        with self._lock:
+            if self._upgradable is not None and self._upgradable_stamp == key:
+                return self._upgradable
+        upgradable = self.backend.upgradable()
+        with self._lock:
+            self._upgradable, self._upgradable_stamp = upgradable, key
+        return upgradable
+
+    def up_to_date(self) -> set:
+        """الحزم المثبتة التي لا تحتاج ترقية؛ تثبيتها مرة أخرى لا يفعل شيئاً"""
+        upgradable = self.cached_upgradable()
+        return {name for name in self.installed() if name not in upgradable}
+
+    def state_of(self, packages: Iterable[str]) -> str:
+        """حالة مجموعة حزم تطبيق واحد"""
+        packages = list(packages)
+        if not packages or not self.available:
+            return UNKNOWN
+        installed = self.installed()
+        if any(name not in installed for name in packages):
+            return MISSING
+        upgradable = self.cached_upgradable()
+        if any(name in upgradable for name in packages):
+            return UPGRADABLE
+        return INSTALLED
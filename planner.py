@@ -0,0 +1,232 @@
+import re
+import shlex
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from backends import AptBackend, PackageBackend
+from scheduler import InstallScheduler, JobResult, StepCallback
+
+PREREQUISITES = 'prerequisites'
+SETUP = 'setup'
+APT_UPDATE = 'apt-update'
+APT_INSTALL = 'apt-install'
+POST = 'post'
+
+# اسم المهمة المشتركة لمعاملات مدير الحزم المدمجة
+SHARED_JOB = 'apt'
+
+_APT_PATTERN = re.compile(r'^(?:sudo\s+)?(?:apt|apt-get)\s+(?P<action>update|install)\b(?P<args>.*)$')
+_SHELL_META = re.compile(r'[|;&<>`$()]')
+
+
+@dataclass
+class PlanStep:
+    """خطوة في خطة التثبيت المدمجة"""
+    phase: str
+    command: str
+    sources: List[str] = field(default_factory=list)
+
+
+def parse_apt_command(command: str) -> Optional[Tuple[str, List[str], List[str]]]:
+    """تحليل أمر apt بسيط إلى (الإجراء، الحزم، الخيارات) أو None إن لم يكن قابلاً للدمج"""
+    command = command.strip()
+    if _SHELL_META.search(command):
+        return None
+    match = _APT_PATTERN.match(command)
+    if not match:
+        return None
+    try:
+        args = shlex.split(match.group('args'))
+    except ValueError:
+        return None
+    packages = [arg for arg in args if not arg.startswith('-')]
+    options = [arg for arg in args if arg.startswith('-')]
+    return match.group('action'), packages, options
+
+
+class InstallPlan:
+    """خطة تثبيت مدمجة لعدة تطبيقات: إعداد المستودعات أولاً ثم تحديث واحد وتثبيت واحد
+
+    خطوات apt في أوامر التطبيقات تُترجم إلى أوامر مدير الحزم backend بأسمائه الفعلية.
+    """
+
+    def __init__(self, skip_packages: Iterable[str] = (), backend: Optional[PackageBackend] = None):
+        self.backend = backend or AptBackend()
+        # حزم مثبتة بأحدث إصدار؛ تثبيتها مرة أخرى خطوة بلا أثر
+        self.skip_packages = set(skip_packages)
+        self.prerequisites: List[str] = []
+        self.packages: List[str] = []
+        self.options: List[str] = []
+        self.setup: Dict[str, List[str]] = {}
+        self.post: Dict[str, List[str]] = {}
+        self.needs_update = False
+        # تطبيق يبدأ بتحديث الفهرس: المتطلبات تحتاجه أيضاً على نظام فهرسه قديم أو فارغ
+        self.update_first = False
+        self._package_sources: Dict[str, List[str]] = {}
+
+    @classmethod
+    def from_apps(cls, apps: Dict[str, List[str]], skip_packages: Iterable[str] = (),
+                  backend: Optional[PackageBackend] = None) -> 'InstallPlan':
+        """بناء الخطة من {معرف التطبيق: قائمة أوامره}"""
+        plan = cls(skip_packages, backend)
+        for app_id, commands in apps.items():
+            plan.add_app(app_id, commands)
+        return plan
+
+    def add_app(self, app_id: str, commands: List[str]):
+        """تحليل أوامر تطبيق واحد ودمجها في الخطة"""
+        parsed = [parse_apt_command(cmd) for cmd in commands]
+        install_indexes = [i for i, p in enumerate(parsed) if p and p[0] == 'install']
+        last_install = install_indexes[-1] if install_indexes else -1
+        seen_setup = False
+
+        for i, (cmd, apt) in enumerate(zip(commands, parsed)):
+            if apt and apt[0] == 'update':
+                self.needs_update = True
+                self.update_first = self.update_first or i == 0
+            elif apt and apt[0] == 'install':
+                _, packages, options = apt
+                target = self.packages if seen_setup or i == last_install else self.prerequisites
+                self._add_packages(app_id, target, packages)
+                self._add_options(options)
+            elif i > last_install >= 0:
+                self.post.setdefault(app_id, []).append(cmd)
+            else:
+                seen_setup = True
+                self.needs_update = self.needs_update or last_install >= 0
+                self.setup.setdefault(app_id, []).append(cmd)
+
+        self.setup.setdefault(app_id, [])
+        self.post.setdefault(app_id, [])
+
+    def _add_packages(self, app_id: str, target: List[str], logical: List[str]):
+        packages = [name for package in logical for name in self.backend.resolve(package) or ()]
+        for package in packages:
+            if package in self.skip_packages:
+                continue
+            self._package_sources.setdefault(package, [])
+            if app_id not in self._package_sources[package]:
+                self._package_sources[package].append(app_id)
+            if package not in self.prerequisites and package not in self.packages:
+                target.append(package)
+
+    def _add_options(self, options: List[str]):
+        for option in options:
+            if option not in self.options:
+                self.options.append(option)
+
+    def _install_command(self, packages: List[str]) -> str:
+        return self.backend.install_command(packages, self.options)
+
+    @property
+    def _refresh_first(self) -> bool:
+        """تحديث قبل تثبيت المتطلبات"""
+        return self.update_first and bool(self.prerequisites) and self.backend.refresh_command is not None
+
+    @property
+    def _refresh(self) -> bool:
+        """تحديث قبل التثبيت المدمج؛ لا يتكرر إن لم يأت بعد تحديث المتطلبات إعداد مستودعات"""
+        if not self.needs_update or self.backend.refresh_command is None:
+            return False
+        return not self._refresh_first or any(self.setup.values())
+
+    def steps(self) -> List[PlanStep]:
+        """الخطة كقائمة خطوات مرتبة"""
+        steps = []
+        if self._refresh_first:
+            steps.append(PlanStep(APT_UPDATE, self.backend.refresh_command, self._sources(self.prerequisites)))
+        if self.prerequisites:
+            steps.append(PlanStep(PREREQUISITES, self._install_command(self.prerequisites),
+                                  self._sources(self.prerequisites)))
+        for app_id, commands in self.setup.items():
+            steps.extend(PlanStep(SETUP, cmd, [app_id]) for cmd in commands)
+        if self._refresh:
+            steps.append(PlanStep(APT_UPDATE, self.backend.refresh_command, list(self.setup)))
+        if self.packages:
+            steps.append(PlanStep(APT_INSTALL, self._install_command(self.packages),
+                                  self._sources(self.packages)))
+        for app_id, commands in self.post.items():
+            steps.extend(PlanStep(POST, cmd, [app_id]) for cmd in commands)
+        return steps
+
+    def phases(self, exclude: Tuple[str, ...] = ()) -> List[Dict[str, List[str]]]:
+        """الخطة كدفعات متتالية للمجدول؛ مهام الدفعة الواحدة تعمل بالتوازي"""
+        phases = [self.phase(name, exclude) for name in (PREREQUISITES, SETUP, APT_INSTALL, POST)]
+        return [phase for phase in phases if phase]
+
+    def phase(self, name: str, exclude: Tuple[str, ...] = ()) -> Dict[str, List[str]]:
+        """دفعة واحدة من الخطة مع استبعاد التطبيقات الفاشلة وحزمها"""
+        if name == PREREQUISITES:
+            packages = self._without(self.prerequisites, exclude)
+            if not packages:
+                return {}
+            refresh = [self.backend.refresh_command] if self._refresh_first else []
+            return {SHARED_JOB: refresh + [self._install_command(packages)]}
+        if name in (SETUP, POST):
+            source = self.setup if name == SETUP else self.post
+            return {app_id: cmds for app_id, cmds in source.items()
+                    if cmds and app_id not in exclude}
+        shared = []
+        if self._refresh:
+            shared.append(self.backend.refresh_command)
+        packages = self._without(self.packages, exclude)
+        if packages:
+            shared.append(self._install_command(packages))
+        return {SHARED_JOB: shared} if shared else {}
+
+    def _without(self, packages: List[str], exclude: Tuple[str, ...]) -> List[str]:
+        """الحزم التي ما زال تطبيق واحد على الأقل يحتاجها"""
+        return [package for package in packages
+                if any(app_id not in exclude for app_id in self._package_sources[package])]
+
+    def apps(self) -> List[str]:
+        """معرفات التطبيقات المشمولة في الخطة"""
+        return list(self.setup)
+
+    def _sources(self, packages: List[str]) -> List[str]:
+        sources = []
+        for package in packages:
+            for app_id in self._package_sources.get(package, []):
+                if app_id not in sources:
+                    sources.append(app_id)
+        return sources
+
+    def describe(self) -> str:
+        """معاينة نصية للخطة دون تنفيذ (dry-run)"""
+        lines = []
+        current_phase = None
+        for index, step in enumerate(self.steps(), 1):
+            if step.phase != current_phase:
+                current_phase = step.phase
+                lines.append(f"# {current_phase}")
+            lines.append(f"{index:3d}. {step.command}    [{', '.join(step.sources)}]")
+        return '\n'.join(lines) + '\n'
+
+
+def run_plan(plan: InstallPlan, scheduler: InstallScheduler,
+             on_step: Optional[StepCallback] = None, checkpoints=None) -> Dict[str, JobResult]:
+    """تنفيذ الخطة والانتظار حتى تنتهي (من خارج حلقة المجدول)"""
+    return scheduler.loop.run(run_plan_async(plan, scheduler, on_step, checkpoints))
+
+
+async def run_plan_async(plan: InstallPlan, scheduler: InstallScheduler,
+                         on_step: Optional[StepCallback] = None,
+                         checkpoints=None) -> Dict[str, JobResult]:
+    """تنفيذ الخطة دفعة بعد دفعة وإرجاع نتيجة لكل تطبيق"""
+    results = {app_id: JobResult(app_id, success=True) for app_id in plan.apps()}
+    for name in (PREREQUISITES, SETUP, APT_INSTALL, POST):
+        failed = tuple(app_id for app_id, result in results.items() if not result.success)
+        if len(failed) == len(results):
+            break
+        jobs = plan.phase(name, exclude=failed)
+        if not jobs:
+            continue
+        batch = await scheduler.run_batch_async(jobs, on_step=on_step, checkpoints=checkpoints)
+        for job_id, job in batch.items():
+            affected = [a for a in results if a not in failed] if job_id == SHARED_JOB else [job_id]
+            for app_id in affected:
+                results[app_id].results.extend(job.results)
+                if not job.success:
+                    results[app_id].success = False
+                    results[app_id].error = job.error
+    return results
@@ -0,0 +1,127 @@
+"""سجلات بيانات مدمجة بـ __slots__ للكتالوج والسجل
+
+كائن بـ __slots__ لا يحمل قاموس __dict__ ولا يكرر أسماء المفاتيح في كل مدخل،
+والنصوص المتكررة (الفئات، أسماء الحزم والتطبيقات، الأوامر الشائعة) تُحفظ مرة واحدة
+عبر sys.intern.
+"""
+import json
+import sys
+from datetime import datetime
+from typing import Iterable, Optional, Tuple
+
+
+def intern_all(values: Iterable[str]) -> Tuple[str, ...]:
+    return tuple(sys.intern(value) for value in values)
+
+
+class AppSummary:
+    """ملخص تطبيق في فهرس الكتالوج (بدون الأوامر)"""
+
+    __slots__ = ('app_id', 'category', 'name', 'description', 'packages', 'path', 'mtime')
+
+    def __init__(self, app_id: str, category: str, name: str, description: str = '',
+                 packages: Iterable[str] = (), path: str = '', mtime: float = 0.0):
+        self.app_id = sys.intern(app_id)
+        self.category = sys.intern(category)
+        self.name = sys.intern(name)
+        self.description = description
+        self.packages = intern_all(packages)
+        self.path = path
+        self.mtime = mtime
+
+    @classmethod
+    def from_index(cls, app_id: str, data: dict) -> 'AppSummary':
+        return cls(app_id, data['category'], data['name'], data.get('description', ''),
+                   data.get('packages', ()), data.get('path', ''), data.get('mtime', 0.0))
+
+    def to_index(self) -> dict:
+        """الصيغة المحفوظة في catalog_index.json"""
+        return {
+            'category': self.category,
+            'name': self.name,
+            'description': self.description,
+            'packages': list(self.packages),
+            'path': self.path,
+            'mtime': self.mtime
+        }
+
+
+class AppEntry(AppSummary):
+    """تطبيق كامل محمّل من ملفه: الملخص مع الأوامر والمجاميع الاختبارية"""
+
+    __slots__ = ('commands', 'checksums', 'backend_commands')
+
+    def __init__(self, summary: AppSummary, commands: Iterable[str] = (),
+                 checksums: Optional[dict] = None, backend_commands: Optional[dict] = None):
+        super().__init__(summary.app_id, summary.category, summary.name, summary.description,
+                         summary.packages, summary.path, summary.mtime)
+        # أوامر مثل "sudo apt update" تتكرر في معظم التطبيقات
+        self.commands = intern_all(commands)
+        self.checksums = checksums or {}
+        # {مدير الحزم: أوامر بديلة} لخطوات الإعداد الخاصة بتوزيعة معينة
+        self.backend_commands = {name: intern_all(cmds) for name, cmds in (backend_commands or {}).items()}
+
+    def commands_for(self, backend: str) -> Tuple[str, ...]:
+        return self.backend_commands.get(backend, self.commands)
+
+
+class StepRecord:
+    """خطوة منفذة محفوظة مع سجل التثبيت"""
+
+    __slots__ = ('command', 'duration', 'exit_code', 'output_bytes', 'peak_rss',
+                 'throughput', 'skipped', 'attempts')
+
+    def __init__(self, command: str, duration: float = 0.0, exit_code: Optional[int] = None,
+                 output_bytes: int = 0, peak_rss: Optional[int] = None,
+                 throughput: Optional[float] = None, skipped: bool = False, attempts: int = 1):
+        self.command = sys.intern(command)
+        self.duration = duration
+        self.exit_code = exit_code
+        self.output_bytes = output_bytes
+        self.peak_rss = peak_rss
+        self.throughput = throughput
+        self.skipped = skipped
+        self.attempts = attempts
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'StepRecord':
+        # السجلات القديمة لا تحتوي كل الحقول
+        return cls(**{key: data[key] for key in cls.__slots__ if key in data})
+
+    def to_dict(self) -> dict:
+        return {key: getattr(self, key) for key in self.__slots__}
+
+
+class HistoryRow:
+    """صف من سجل التثبيتات: الوقت بالثواني منذ epoch، والخطوات تُحلل عند أول قراءة"""
+
+    __slots__ = ('ts', 'app', 'success', 'trace', '_steps')
+
+    def __init__(self, ts: int, app: str, success: bool, steps: Optional[str] = None,
+                 trace: Optional[str] = None):
+        self.ts = ts
+        self.app = sys.intern(app)
+        self.success = success
+        self.trace = trace
+        # نص JSON كما في قاعدة البيانات حتى تُطلب الخطوات فعلاً
+        self._steps = steps
+
+    @property
+    def timestamp(self) -> str:
+        return datetime.fromtimestamp(self.ts).isoformat()
+
+    @property
+    def steps(self) -> Tuple[StepRecord, ...]:
+        if not isinstance(self._steps, tuple):
+            self._steps = tuple(StepRecord.from_dict(step) for step in json.loads(self._steps or '[]'))
+        return self._steps
+
+    def to_dict(self) -> dict:
+        """الصيغة المعروضة في history --json"""
+        return {
+            'app': self.app,
+            'timestamp': self.timestamp,
+            'success': self.success,
+            'steps': [step.to_dict() for step in self.steps],
+            'trace': self.trace
+        }
@@ -0,0 +1,192 @@
+import asyncio
+import os
+import signal
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional, Set
+
+# حد مخزن القراءة لكل أنبوب؛ عند امتلائه يتوقف asyncio عن القراءة
+# فيمتلئ الأنبوب ويتوقف الأمر الفرعي، فتبقى الذاكرة ثابتة
+STREAM_LIMIT = 64 * 1024
+# مهلة الانتظار بين SIGTERM و SIGKILL عند الإلغاء
+KILL_GRACE_SECONDS = 5.0
+# الفاصل بين قراءات ذاكرة العملية الفرعية (RSS)
+RSS_SAMPLE_INTERVAL = 0.25
+
+STDOUT = 'stdout'
+STDERR = 'stderr'
+
+LineCallback = Callable[[str, str], None]
+
+
+@dataclass
+class CommandResult:
+    """نتيجة تنفيذ أمر واحد"""
+    command: str
+    returncode: Optional[int]
+    duration: float = 0.0
+    timed_out: bool = False
+    cancelled: bool = False
+    started_at: float = 0.0
+    ended_at: float = 0.0
+    output_bytes: int = 0
+    peak_rss: Optional[int] = None
+    net_bytes: Optional[int] = None
+    # الخطوة لم تُنفذ لأنها مكتملة مسبقاً (نقطة حفظ أو علامة عدم تكرار)
+    skipped: bool = False
+    attempts: int = 1
+
+    @property
+    def throughput(self) -> Optional[float]:
+        """معدل التنزيل التقريبي بالبايت/ثانية (عدادات الشبكة على مستوى الجهاز)"""
+        if self.net_bytes is None or self.duration <= 0:
+            return None
+        return self.net_bytes / self.duration
+
+    @property
+    def success(self) -> bool:
+        return self.returncode == 0 and not (self.timed_out or self.cancelled)
+
+
+async def run_command(command: str, on_line: LineCallback,
+                      timeout: Optional[float] = None) -> CommandResult:
+    """تنفيذ أمر shell عبر asyncio مع بث المخرجات سطراً بسطر إلى on_line(stream, line)
+
+    عند إلغاء المهمة تُنهى مجموعة العمليات بالكامل ثم يُعاد رفع CancelledError.
+    """
+    start = time.monotonic()
+    started_at = time.time()
+    net_before = _net_bytes_recv()
+
+    process = await asyncio.create_subprocess_exec(
+        "/bin/sh", "-c", command,
+        stdin=asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        limit=STREAM_LIMIT,
+        start_new_session=True
+    )
+    counter = {'bytes': 0}
+    rss = _RssSampler(process.pid)
+
+    async def communicate():
+        await asyncio.gather(
+            _pump(process.stdout, STDOUT, on_line, counter),
+            _pump(process.stderr, STDERR, on_line, counter)
+        )
+        return await process.wait()
+
+    sampler = asyncio.ensure_future(rss.run())
+    timed_out = False
+    try:
+        await asyncio.wait_for(communicate(), timeout)
+    except asyncio.TimeoutError:
+        timed_out = True
+        await _terminate(process)
+    except asyncio.CancelledError:
+        await _terminate(process)
+        raise
+    finally:
+        sampler.cancel()
+
+    net_after = _net_bytes_recv()
+    return CommandResult(
+        command,
+        process.returncode,
+        duration=time.monotonic() - start,
+        timed_out=timed_out,
+        started_at=started_at,
+        ended_at=time.time(),
+        output_bytes=counter['bytes'],
+        peak_rss=rss.peak,
+        net_bytes=net_after - net_before if None not in (net_before, net_after) else None
+    )
+
+
+async def _pump(reader: asyncio.StreamReader, stream: str, on_line: LineCallback, counter: dict):
+    """قراءة أنبوب سطراً بسطر؛ الأسطر الأطول من الحد تُقطع إلى أجزاء"""
+    while True:
+        try:
+            data = await reader.readuntil(b'\n')
+        except asyncio.IncompleteReadError as e:
+            data = e.partial
+        except asyncio.LimitOverrunError as e:
+            data = await reader.read(e.consumed)
+        if not data:
+            break
+        counter['bytes'] += len(data)
+        on_line(stream, data.decode('utf-8', 'replace'))
+
+
+async def _terminate(process: asyncio.subprocess.Process):
+    """إنهاء مجموعة العمليات بالكامل (sudo والأبناء)
+
+    SIGTERM يُرسل فوراً، والانتظار ثم SIGKILL في مهمة مستقلة على الحلقة: إلغاء ثانٍ
+    (ضغط الإلغاء مرة أخرى أو انتهاء مهلة المهمة) لا يقطع التصعيد فتبقى العملية حية.
+    """
+    if process.returncode is not None:
+        return
+    try:
+        os.killpg(process.pid, signal.SIGTERM)
+    except (ProcessLookupError, PermissionError):
+        return
+    reaper = asyncio.ensure_future(_reap(process))
+    _reapers.add(reaper)
+    reaper.add_done_callback(_reapers.discard)
+    await asyncio.shield(reaper)
+
+
+# مراجع مهام الإنهاء الجارية حتى لا تُجمع قبل أن تنتهي
+_reapers: Set[asyncio.Future] = set()
+
+
+async def _reap(process: asyncio.subprocess.Process):
+    """انتظار خروج المجموعة بعد SIGTERM ثم SIGKILL بعد المهلة"""
+    try:
+        await asyncio.wait_for(asyncio.shield(process.wait()), KILL_GRACE_SECONDS)
+    except asyncio.TimeoutError:
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+        await process.wait()
+
+
+def _net_bytes_recv() -> Optional[int]:
+    """إجمالي البايتات المستلمة على الجهاز، أو None إن لم يتوفر psutil"""
+    try:
+        import psutil
+        return psutil.net_io_counters().bytes_recv
+    except Exception:
+        return None
+
+
+class _RssSampler:
+    """تتبع أقصى ذاكرة مقيمة (RSS) لشجرة العملية الفرعية"""
+
+    def __init__(self, pid: int):
+        self.peak: Optional[int] = None
+        try:
+            import psutil
+            self._process = psutil.Process(pid)
+        except Exception:
+            self._process = None
+
+    async def run(self):
+        while self._process is not None:
+            self.sample()
+            await asyncio.sleep(RSS_SAMPLE_INTERVAL)
+
+    def sample(self):
+        try:
+            processes = [self._process] + self._process.children(recursive=True)
+        except Exception:
+            return
+        total = 0
+        for proc in processes:
+            try:
+                total += proc.memory_info().rss
+            except Exception:
+                continue
+        if total and (self.peak is None or total > self.peak):
+            self.peak = total
@@ -0,0 +1,320 @@
+import asyncio
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+from aio import EventLoopThread, default_loop
+from runner import CommandResult, STDOUT, STDERR, run_command
+
+NETWORK = 'network'
+DPKG = 'dpkg'
+LOCAL = 'local'
+
+DEFAULT_MAX_WORKERS = 4
+DEFAULT_NETWORK_LIMIT = 4
+DEFAULT_RETRIES = 2
+DEFAULT_RETRY_BACKOFF = 2.0
+MAX_RETRY_DELAY = 60.0
+
+# الأوامر التي تحتاج قفل dpkg/apt، بما فيها سكربتات الإعداد التي تستدعي apt داخلياً
+_DPKG_PATTERN = re.compile(
+    r'(?:^|[;&|]|\bsudo)\s*(?:-E\s+)?(?:apt|apt-get|dpkg|add-apt-repository|snap)(?:\s|$)'
+    r'|\|\s*(?:sudo\s+(?:-E\s+)?)?bash\b'
+)
+_NETWORK_PATTERN = re.compile(r'\b(wget|curl|gpg\s+--recv-keys)\b')
+_APT_UPDATE_PATTERN = re.compile(r'\b(?:apt|apt-get)\s+update\b')
+
+LineCallback = Callable[[str, str, str], None]
+StartCallback = Callable[[str, int, str], None]
+StepCallback = Callable[[str, int, str, CommandResult], None]
+
+
+def classify_step(command: str) -> str:
+    """تصنيف الأمر: شبكة أو dpkg أو محلي"""
+    if _DPKG_PATTERN.search(command):
+        return DPKG
+    if _NETWORK_PATTERN.search(command):
+        return NETWORK
+    return LOCAL
+
+
+def is_retryable(command: str) -> bool:
+    """خطوات قد تفشل لأسباب شبكية مؤقتة: التنزيلات و apt update"""
+    return bool(_NETWORK_PATTERN.search(command) or _APT_UPDATE_PATTERN.search(command))
+
+
+@dataclass
+class JobResult:
+    """نتيجة تثبيت تطبيق واحد ضمن الدفعة"""
+    job_id: str
+    success: bool = False
+    error: Optional[str] = None
+    results: List[CommandResult] = field(default_factory=list)
+
+
+class CancelScope:
+    """حالة إلغاء عملية واحدة: علامة الإلغاء والمهام الجارية التي يلغيها"""
+
+    def __init__(self):
+        self.cancelled = False
+        self.active: Set[asyncio.Future] = set()
+
+    def _cancel_active(self):
+        for task in list(self.active):
+            task.cancel()
+
+
+# نطاق العملية الجارية؛ ينتقل إلى المهام الفرعية (gather و ensure_future) مع السياق
+_current_scope: ContextVar[Optional[CancelScope]] = ContextVar('cancel_scope', default=None)
+
+
+class InstallScheduler:
+    """جدولة المهام كـ coroutines على حلقة asyncio مشتركة مع حدود تزامن
+
+    max_workers يحد عدد المهام المتزامنة، وخطوات dpkg تمر عبر إشارة بحد 1،
+    وخطوات الشبكة محدودة بـ network_limit.
+    """
+
+    def __init__(self, max_workers: int = DEFAULT_MAX_WORKERS,
+                 timeout: Optional[float] = None,
+                 on_line: Optional[LineCallback] = None,
+                 on_start: Optional[StartCallback] = None,
+                 preprocess: Optional[Callable[[str], str]] = None,
+                 preprocess_errors: Tuple[type, ...] = (),
+                 job_timeout: Optional[float] = None,
+                 network_limit: int = DEFAULT_NETWORK_LIMIT,
+                 retries: int = DEFAULT_RETRIES,
+                 retry_backoff: float = DEFAULT_RETRY_BACKOFF,
+                 transport: Optional[Callable[[str], str]] = None,
+                 loop: Optional[EventLoopThread] = None):
+        self.max_workers = max_workers
+        # إعادة المحاولة بتأخير أسي: retry_backoff ثم ضعفه ... حتى MAX_RETRY_DELAY
+        self.retries = retries
+        self.retry_backoff = retry_backoff
+        self.timeout = timeout
+        self.job_timeout = job_timeout
+        self.network_limit = network_limit
+        self.on_line = on_line
+        self.on_start = on_start
+        # تحويل الأمر قبل تنفيذه (مثل استبدال التنزيلات بنسخ من الذاكرة المحلية)
+        self.preprocess = preprocess
+        # أخطاء preprocess التي تُفشل الخطوة؛ غيرها مؤقت ويُنفذ معه الأمر الأصلي
+        self.preprocess_errors = preprocess_errors
+        # تغليف الأمر لحظة التشغيل فقط (مثل ssh إلى جهاز بعيد)؛ التصنيف والسجل يريان الأمر الأصلي
+        self.transport = transport
+        self.loop = loop or default_loop()
+        self._limits: Optional[Dict[str, asyncio.Semaphore]] = None
+        # نطاق الدفعات المشغلة خارج operation()
+        self._default_scope = CancelScope()
+        self._scopes: Set[CancelScope] = {self._default_scope}
+        self._scopes_lock = threading.Lock()
+
+    def limits(self) -> Dict[str, asyncio.Semaphore]:
+        """إشارات التزامن؛ تُنشأ داخل الحلقة عند أول استخدام"""
+        if self._limits is None:
+            self._limits = {
+                'jobs': asyncio.Semaphore(self.max_workers),
+                DPKG: asyncio.Semaphore(1),
+                NETWORK: asyncio.Semaphore(self.network_limit)
+            }
+        return self._limits
+
+    def _scope(self) -> CancelScope:
+        """نطاق العملية التي تعمل فيها المهمة الحالية"""
+        scope = _current_scope.get() or self._default_scope
+        if scope not in self._scopes:
+            # نطاق عملية بدأت على مجدول آخر (مثل مجدولات أجهزة الأسطول)
+            with self._scopes_lock:
+                self._scopes.add(scope)
+        return scope
+
+    @property
+    def cancelled(self) -> bool:
+        return self._scope().cancelled
+
+    @contextmanager
+    def operation(self, scope: Optional[CancelScope] = None) -> Iterator[CancelScope]:
+        """نطاق إلغاء مستقل لعملية على الحلقة: بدء عملية أخرى أو إلغاؤها لا يمس هذه"""
+        scope = scope or CancelScope()
+        token = _current_scope.set(scope)
+        with self._scopes_lock:
+            self._scopes.add(scope)
+        try:
+            yield scope
+        finally:
+            _current_scope.reset(token)
+            with self._scopes_lock:
+                self._scopes.discard(scope)
+
+    def reset(self):
+        """مسح حالة الإلغاء للدفعات المشغلة خارج operation()"""
+        self._default_scope.cancelled = False
+
+    def cancel(self, scope: Optional[CancelScope] = None):
+        """إلغاء أوامر عملية واحدة ومهامها المنتظرة، أو كل العمليات الجارية؛ آمنة من أي خيط"""
+        with self._scopes_lock:
+            scopes = [scope] if scope is not None else list(self._scopes)
+        for target in scopes:
+            target.cancelled = True
+        self.loop.call_soon(self._cancel_active, scopes)
+
+    @staticmethod
+    def _cancel_active(scopes: List[CancelScope]):
+        for scope in scopes:
+            scope._cancel_active()
+
+    def shutdown(self):
+        """إلغاء ما تبقى؛ الحلقة مشتركة فلا تُغلق هنا"""
+        self.cancel()
+
+    def run_batch(self, jobs: Dict[str, List[str]],
+                  on_step: Optional[StepCallback] = None,
+                  checkpoints=None) -> Dict[str, JobResult]:
+        """تشغيل دفعة مهام {معرف: أوامر} والانتظار حتى تنتهي جميعها (من خارج الحلقة)"""
+        return self.loop.run(self.run_batch_async(jobs, on_step, checkpoints))
+
+    async def run_batch_async(self, jobs: Dict[str, List[str]],
+                              on_step: Optional[StepCallback] = None,
+                              checkpoints=None) -> Dict[str, JobResult]:
+        """تشغيل دفعة مهام كـ coroutines متزامنة
+
+        مع checkpoints (CheckpointStore) تُتخطى الخطوات المكتملة سابقاً
+        وتُسجل كل خطوة ناجحة فور انتهائها.
+        """
+        if not jobs:
+            return {}
+        results = await asyncio.gather(*(
+            self._run_job(job_id, commands, on_step, checkpoints) for job_id, commands in jobs.items()
+        ))
+        return {job.job_id: job for job in results}
+
+    async def _run_job(self, job_id: str, commands: List[str],
+                       on_step: Optional[StepCallback], checkpoints) -> JobResult:
+        """تنفيذ مهمة واحدة ضمن حد المهام المتزامنة ومهلة المهمة"""
+        job = JobResult(job_id)
+        async with self.limits()['jobs']:
+            try:
+                await asyncio.wait_for(self._run_steps(job, commands, on_step, checkpoints), self.job_timeout)
+            except asyncio.TimeoutError:
+                job.success = False
+                job.error = f"job timed out after {self.job_timeout}s"
+        return job
+
+    async def _run_steps(self, job: JobResult, commands: List[str],
+                         on_step: Optional[StepCallback], checkpoints=None):
+        """تنفيذ أوامر المهمة بالترتيب والتوقف عند أول فشل"""
+        try:
+            for index, original in enumerate(commands, 1):
+                done = checkpoints.completed(job.job_id, original) if checkpoints else None
+                if done:
+                    if self.on_line:
+                        self.on_line(job.job_id, STDOUT, f"skipped ({done}): {original}\n")
+                    command, result = original, CommandResult(original, 0, skipped=True)
+                else:
+                    command = await self._prepare(job.job_id, original)
+                    result = await self._run_with_retry(job.job_id, index, command)
+                job.results.append(result)
+                if on_step:
+                    on_step(job.job_id, index, command, result)
+                if not result.success:
+                    job.error = self._describe_failure(result)
+                    return
+                if checkpoints and not done:
+                    checkpoints.mark_done(job.job_id, original)
+            job.success = True
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            job.error = str(e)
+
+    async def _prepare(self, job_id: str, command: str) -> str:
+        """تطبيق preprocess في منفذ خيوط لأنه قد ينزل ملفات؛ عند فشل مؤقت يُنفذ الأمر الأصلي"""
+        if self.preprocess is None or self._scope().cancelled:
+            return command
+        try:
+            async with self.limits()[NETWORK]:
+                return await asyncio.get_running_loop().run_in_executor(None, self.preprocess, command)
+        except self.preprocess_errors as e:
+            if self.on_line:
+                self.on_line(job_id, STDERR, f"preprocess failed: {e}\n")
+            raise
+        except Exception as e:
+            if self.on_line:
+                self.on_line(job_id, STDERR, f"preprocess failed, running original command: {e}\n")
+            return command
+
+    async def _run_with_retry(self, job_id: str, index: int, command: str) -> CommandResult:
+        """إعادة الخطوات الشبكية الفاشلة بتأخير أسي؛ الإلغاء يوقف المحاولات فوراً"""
+        attempts = self.retries + 1 if is_retryable(command) else 1
+        for attempt in range(1, attempts + 1):
+            result = await self._run_step(job_id, index, command)
+            result.attempts = attempt
+            if result.success or result.cancelled or self._scope().cancelled or attempt == attempts:
+                return result
+            delay = min(self.retry_backoff * 2 ** (attempt - 1), MAX_RETRY_DELAY)
+            if self.on_line:
+                self.on_line(job_id, STDERR,
+                             f"{self._describe_failure(result)}; retry {attempt}/{self.retries} in {delay:.1f}s\n")
+            await self._sleep(delay)
+        return result
+
+    async def _sleep(self, delay: float):
+        """انتظار قابل للإلغاء من زر الإلغاء"""
+        scope = self._scope()
+        task = asyncio.ensure_future(asyncio.sleep(delay))
+        scope.active.add(task)
+        try:
+            await task
+        except asyncio.CancelledError:
+            # إلغاء المستخدم يلغي مهمة الانتظار فقط؛ غيره (مثل مهلة المهمة) يُمرر
+            if not scope.cancelled:
+                raise
+        finally:
+            scope.active.discard(task)
+
+    async def _run_step(self, job_id: str, index: int, command: str) -> CommandResult:
+        """تشغيل خطوة بعد حجز مورد نوعها؛ إلغاء المستخدم يعيد نتيجة ملغاة"""
+        started = time.monotonic()
+        scope = self._scope()
+        semaphore = self.limits().get(classify_step(command))
+        try:
+            if semaphore is not None:
+                await semaphore.acquire()
+            try:
+                if scope.cancelled:
+                    return CommandResult(command, None, cancelled=True)
+                if self.on_start:
+                    self.on_start(job_id, index, command)
+                on_line = self.on_line or (lambda *args: None)
+                task = asyncio.ensure_future(run_command(
+                    self.transport(command) if self.transport else command,
+                    lambda stream, line: on_line(job_id, stream, line), self.timeout
+                ))
+                scope.active.add(task)
+                try:
+                    result = await task
+                finally:
+                    scope.active.discard(task)
+                result.command = command
+                return result
+            finally:
+                if semaphore is not None:
+                    semaphore.release()
+        except asyncio.CancelledError:
+            # إلغاء المستخدم يضبط علامة النطاق قبل إلغاء الأمر الجاري؛ غيره (مثل انتهاء
+            # مهلة المهمة) إلغاء للمهمة الأم ويُمرر كما هو (Task.cancelling() غير متاح قبل 3.11)
+            if not scope.cancelled:
+                raise
+            return CommandResult(command, None, cancelled=True, duration=time.monotonic() - started)
+
+    @staticmethod
+    def _describe_failure(result: CommandResult) -> str:
+        if result.cancelled:
+            return f"cancelled: {result.command}"
+        if result.timed_out:
+            return f"timed out: {result.command}"
+        return f"exit code {result.returncode}: {result.command}"
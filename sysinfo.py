@@ -0,0 +1,80 @@
+import platform
+import threading
+from typing import Callable, Dict
+
+GB = 1024 ** 3
+
+# ترتيب البطاقات في قسم معلومات النظام
+PROBE_KEYS = ("OS", "CPU", "Memory", "Disk", "Python")
+
+
+def probe_os(get_text: Callable[[str], str]) -> str:
+    """اسم وإصدار نظام التشغيل"""
+    import distro
+    os_name = distro.name(pretty=True) if hasattr(distro, 'name') else platform.system()
+    os_version = distro.version() if hasattr(distro, 'version') else platform.version()
+    return f"{os_name} {os_version}"
+
+
+def probe_cpu(get_text: Callable[[str], str]) -> str:
+    """طراز المعالج وعدد الأنوية"""
+    import psutil
+    cpu_info = platform.processor()
+    cpu_cores = psutil.cpu_count(logical=False)
+    cpu_threads = psutil.cpu_count(logical=True)
+    return f"{cpu_info} ({cpu_cores} cores, {cpu_threads} threads)"
+
+
+def probe_memory(get_text: Callable[[str], str]) -> str:
+    """الذاكرة المستخدمة والكلية"""
+    import psutil
+    mem = psutil.virtual_memory()
+    return get_text('memory_info').format(mem.used / GB, mem.total / GB)
+
+
+def probe_disk(get_text: Callable[[str], str]) -> str:
+    """المساحة الحرة والكلية للقسم الجذر (قد يكون بطيئاً على NFS)"""
+    import psutil
+    disk = psutil.disk_usage('/')
+    return get_text('disk_info').format(disk.free / GB, disk.total / GB)
+
+
+def probe_python(get_text: Callable[[str], str]) -> str:
+    return platform.python_version()
+
+
+PROBES: Dict[str, Callable[[Callable[[str], str]], str]] = {
+    "OS": probe_os,
+    "CPU": probe_cpu,
+    "Memory": probe_memory,
+    "Disk": probe_disk,
+    "Python": probe_python
+}
+
+
+def run_probe(key: str, get_text: Callable[[str], str], logger=None) -> str:
+    """تشغيل فحص واحد وإرجاع "Unknown" عند الفشل"""
+    try:
+        return PROBES[key](get_text)
+    except Exception as e:
+        if logger is not None:
+            logger.error(f"Failed to get system info ({key}): {e}")
+        return "Unknown"
+
+
+def collect(get_text: Callable[[str], str], logger=None) -> Dict[str, str]:
+    """جمع كل المعلومات بشكل متزامن"""
+    return {key: run_probe(key, get_text, logger) for key in PROBE_KEYS}
+
+
+def probe_async(get_text: Callable[[str], str],
+                on_result: Callable[[str, str], None],
+                logger=None):
+    """تشغيل كل الفحوص بالتوازي في خيوط خلفية واستدعاء on_result(key, value) لكل نتيجة"""
+    # خيوط daemon حتى لا يمنع فحص معلق (مثل قرص NFS) إغلاق البرنامج
+    for key in PROBE_KEYS:
+        threading.Thread(
+            target=lambda k=key: on_result(k, run_probe(k, get_text, logger)),
+            name=f"probe-{key}",
+            daemon=True
+        ).start()
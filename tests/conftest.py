@@ -0,0 +1,32 @@
+"""إعداد مشترك للاختبارات: المجلد الرئيسي و benchmarks (المحاكيات) على مسار الاستيراد"""
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path[:0] = [str(ROOT), str(ROOT / "benchmarks")]
+
+
+@pytest.fixture
+def make_engine(tmp_path):
+    """محرك في مجلد إعدادات مؤقت مع كتالوج من التطبيقات المعطاة {معرف: أوامر}"""
+    from engine import InstallerEngine
+
+    def make(config: dict = None, apps: dict = None) -> InstallerEngine:
+        (tmp_path / "catalog" / "apps").mkdir(parents=True, exist_ok=True)
+        for app_id, commands in (apps or {}).items():
+            entry = {'category': 'test', 'name': app_id, 'description': 'test', 'commands': commands}
+            (tmp_path / "catalog" / "apps" / f"{app_id}.json").write_text(json.dumps(entry))
+        base = {
+            'download_cache_enabled': False,
+            'package_backend': 'apt',
+            'dpkg_status': str(tmp_path / "no-dpkg-status"),
+            'retry_backoff': 0.01
+        }
+        base.update(config or {})
+        (tmp_path / "config.json").write_text(json.dumps(base))
+        return InstallerEngine(config_dir=tmp_path)
+
+    return make
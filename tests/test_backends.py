@@ -0,0 +1,104 @@
+import pytest
+
+from backends import (APT, BACKENDS, DNF, FLATPAK, PACMAN, AptBackend, DnfBackend, PackageBackend,
+                      detect_backend)
+from recorded_backends import DPKG_STATUS, recorded_runner
+
+# ما تعرضه المخرجات المسجلة لكل مدير
+EXPECTED = {
+    APT: ({'nmap': '7.94+git20230807.3be01efb1+dfsg-3', 'vlc': '3.0.20-3'},
+          {'vlc': '3.0.21-1', 'libc6': '2.39-0ubuntu8.4'}),
+    DNF: ({'nmap': '7.92-3.fc40', 'vlc': '3.0.20-12.fc40', 'glibc': '2.39-17.fc40'},
+          {'vlc': '1:3.0.21-1.fc40', 'glibc': '2.39-22.fc40'}),
+    PACMAN: ({'nmap': '7.95-2', 'vlc': '3.0.21-7', 'glibc': '2.40+r16+gaa533d58ff-2'},
+             {'vlc': '3.0.21-8', 'linux': '6.10.10.arch1-1'}),
+    FLATPAK: ({'org.videolan.VLC': '3.0.21', 'com.obsproject.Studio': '30.2.3'},
+              {'com.obsproject.Studio': '30.2.4'}),
+}
+
+
+def make_backend(name, tmp_path, **kwargs):
+    state = tmp_path / "status"
+    state.write_text(DPKG_STATUS)
+    runner = recorded_runner(name)
+    return BACKENDS[name](state_path=state, run=runner, **kwargs), runner
+
+
+@pytest.mark.parametrize('name', sorted(EXPECTED))
+def test_recorded_queries(name, tmp_path):
+    backend, runner = make_backend(name, tmp_path)
+    installed, upgradable = EXPECTED[name]
+    assert backend.installed() == installed
+    assert backend.upgradable() == upgradable
+
+
+def test_apt_reads_status_without_running_commands(tmp_path):
+    backend, runner = make_backend(APT, tmp_path)
+    backend.installed()
+    assert runner.calls == []
+
+
+def test_dnf_obsoleting_section_is_ignored(tmp_path):
+    backend, _ = make_backend(DNF, tmp_path)
+    assert 'grub2-tools' not in backend.upgradable()
+
+
+def test_pacman_falls_back_to_qu_without_checkupdates(tmp_path):
+    backend, runner = make_backend(PACMAN, tmp_path)
+    del runner.outputs[('checkupdates',)]
+    # pacman -Qu يستثني الحزم المعلّمة [ignored]
+    assert backend.upgradable() == {'vlc': '3.0.21-8'}
+    assert runner.calls == [('checkupdates',), ('pacman', '-Qu')]
+
+
+def test_failed_query_is_empty(tmp_path):
+    backend = DnfBackend(run=lambda argv: (1, 'Error: cannot download metadata'))
+    assert backend.installed() == {}
+
+
+def test_resolve_through_package_map():
+    package_map = {'docker-ce': {'pacman': 'docker'}, 'apt-transport-https': {'pacman': None},
+                   'vlc': {'flatpak': 'org.videolan.VLC'}}
+    pacman = BACKENDS[PACMAN](package_map=package_map)
+    flatpak = BACKENDS[FLATPAK](package_map=package_map)
+    assert pacman.resolve('docker-ce') == ['docker']
+    assert pacman.resolve('apt-transport-https') == []
+    assert pacman.resolve('curl') == ['curl']
+    assert pacman.resolve('./local.deb') is None
+    assert flatpak.resolve('vlc') == ['org.videolan.VLC']
+    assert flatpak.resolve('curl') is None
+    assert flatpak.resolve_all(['vlc', 'curl']) is None
+    assert AptBackend().resolve('./local.deb') == ['./local.deb']
+
+
+def test_install_commands():
+    assert AptBackend().install_command(['vlc', 'curl'], ['--no-install-recommends', '-y']) == \
+        "sudo apt install vlc curl --no-install-recommends -y"
+    assert BACKENDS[PACMAN]().install_command(['vlc']) == "sudo pacman -Syu --needed --noconfirm vlc"
+    assert BACKENDS[PACMAN]().upgrade_commands(['vlc']) == ["sudo pacman -Syu --noconfirm"]
+    assert BACKENDS[DNF]().upgrade_commands(['vlc', 'curl'])[0] == "sudo dnf upgrade -y curl vlc"
+
+
+def test_detect_backend_from_distro_ids(monkeypatch, tmp_path):
+    monkeypatch.setattr('backends.OSTREE_BOOTED', tmp_path / "missing")
+    assert detect_backend(['linuxmint', 'ubuntu']) == APT
+    assert detect_backend(['nobara', 'fedora']) == DNF
+    assert detect_backend(['endeavouros', 'arch']) == PACMAN
+
+
+def test_incomplete_backend_fails_at_construction():
+    class Partial(PackageBackend):
+        def install_command(self, packages, options=()):
+            return ''
+
+    with pytest.raises(TypeError):
+        Partial()
+
+
+def test_dnf_watches_sysimage_rpmdb(monkeypatch, tmp_path):
+    sysimage, legacy = tmp_path / "usr/lib/sysimage/rpm", tmp_path / "var/lib/rpm"
+    legacy.mkdir(parents=True)
+    monkeypatch.setattr(DnfBackend, 'STATE_PATHS', (sysimage, legacy))
+    assert DnfBackend().state_path == legacy
+    sysimage.mkdir(parents=True)
+    assert DnfBackend().state_path == sysimage
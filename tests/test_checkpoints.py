@@ -0,0 +1,84 @@
+import time
+
+import pytest
+
+import checkpoints
+from checkpoints import CHECKPOINT, MARKER, CheckpointStore, marker_satisfied
+
+
+@pytest.fixture
+def store(tmp_path):
+    return CheckpointStore(tmp_path / "checkpoints.json")
+
+
+def test_checkpoint_survives_reload(store, tmp_path):
+    store.mark_done('vlc', "sudo apt update")
+    reloaded = CheckpointStore(tmp_path / "checkpoints.json", use_markers=False)
+    assert reloaded.completed('vlc', "sudo apt update") == CHECKPOINT
+    assert reloaded.completed('nmap', "sudo apt update") is None
+    assert reloaded.pending() == {'vlc': 1}
+    reloaded.clear('vlc')
+    assert CheckpointStore(tmp_path / "checkpoints.json").pending() == {}
+
+
+def test_old_checkpoints_expire(tmp_path):
+    store = CheckpointStore(tmp_path / "checkpoints.json", use_markers=False, max_age_hours=1)
+    store.mark_done('vlc', "sudo apt update")
+    for entry in store._jobs['vlc'].values():
+        entry['completed_at'] = time.time() - 7200
+    assert store.completed('vlc', "sudo apt update") is None
+
+
+def test_output_file_marker(tmp_path):
+    key = tmp_path / "docker.gpg"
+    command = f"curl -fsSL https://download.docker.com/linux/ubuntu/gpg | sudo gpg --dearmor -o {key}"
+    assert not marker_satisfied(command)
+    key.write_bytes(b'')
+    assert not marker_satisfied(command)
+    key.write_bytes(b'key')
+    assert marker_satisfied(command)
+
+
+def test_repository_marker(tmp_path, monkeypatch):
+    sources = tmp_path / "sources.list.d"
+    sources.mkdir()
+    monkeypatch.setattr(checkpoints, 'APT_SOURCES', [tmp_path / "sources.list", sources])
+    command = "sudo add-apt-repository 'deb https://brave-browser-apt-release.s3.brave.com/ stable main'"
+    assert not marker_satisfied(command)
+    (sources / "brave.list").write_text("deb https://brave-browser-apt-release.s3.brave.com/ stable main\n")
+    assert marker_satisfied(command)
+
+
+def test_package_marker_uses_scope(store):
+    scope = store.scope({'nmap', 'curl'})
+    assert scope.completed('nmap', "sudo apt install nmap curl -y") == MARKER
+    assert scope.completed('vlc', "sudo apt install vlc -y") is None
+    assert scope.completed('local', "sudo apt install ./app.deb -y") is None
+    # بدون نطاق لا تُعتبر الحزم المثبتة علامة
+    assert store.completed('nmap', "sudo apt install nmap -y") is None
+    assert store.completed('nmap', "sudo apt update") is None
+
+
+def test_scope_writes_to_store(store):
+    scope = store.scope(())
+    scope.mark_done('vlc', "sudo apt update")
+    assert store.completed('vlc', "sudo apt update") == CHECKPOINT
+
+
+def test_private_jobs_are_keyed_per_operation(store, tmp_path):
+    first, second = store.scope((), private=('apt',)), store.scope((), private=('apt',))
+    first.mark_done('apt', "sudo apt install vlc -y")
+    second.mark_done('apt', "sudo apt install nmap -y")
+    second.clear('apt')
+    assert first.completed('apt', "sudo apt install vlc -y") == CHECKPOINT
+    assert store.completed('apt', "sudo apt install vlc -y") is None
+
+
+def test_expired_entries_are_dropped_on_load(tmp_path):
+    store = CheckpointStore(tmp_path / "checkpoints.json", max_age_hours=1)
+    store.mark_done('apt@dead', "sudo apt install vlc -y")
+    store.mark_done('vlc', "sudo apt update")
+    for entry in store._jobs['apt@dead'].values():
+        entry['completed_at'] = time.time() - 7200
+    store._save()
+    assert CheckpointStore(tmp_path / "checkpoints.json", max_age_hours=1).pending() == {'vlc': 1}
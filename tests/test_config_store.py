@@ -0,0 +1,130 @@
+import json
+import os
+import time
+
+import config_store
+from config_store import SCHEMA_KEY, SCHEMA_VERSION, ConfigStore, migrate
+
+
+def read(path):
+    return json.loads(path.read_text())
+
+
+def test_migrate_unversioned_config():
+    config = {'theme': 'light'}
+    assert migrate(config)
+    assert config == {'theme': 'light', 'last_update': None, SCHEMA_KEY: SCHEMA_VERSION}
+    assert not migrate(config)
+
+
+def test_newer_schema_is_kept():
+    config = {SCHEMA_KEY: SCHEMA_VERSION + 1, 'future': True}
+    assert not migrate(config)
+    assert config['future']
+
+
+def test_load_migrates_and_writes_immediately(tmp_path):
+    path = tmp_path / "config.json"
+    path.write_text(json.dumps({'language': 'ar'}))
+    store = ConfigStore(path, delay=60)
+    try:
+        assert read(path) == {'language': 'ar', 'theme': 'dark', 'last_update': None, SCHEMA_KEY: SCHEMA_VERSION}
+    finally:
+        store.close()
+
+
+def test_corrupt_config_is_set_aside(tmp_path):
+    path = tmp_path / "config.json"
+    path.write_text("{not json")
+    store = ConfigStore(path, delay=60)
+    store.close()
+    assert (tmp_path / "config.json.corrupt").read_text() == "{not json"
+    assert read(path)['theme'] == 'dark'
+
+
+def test_changes_are_batched_until_flush(tmp_path):
+    path = tmp_path / "config.json"
+    store = ConfigStore(path, delay=60)
+    try:
+        store['theme'] = 'light'
+        store['max_parallel_jobs'] = 8
+        assert read(path)['theme'] == 'dark'
+        store.flush()
+        assert read(path)['theme'] == 'light'
+        assert read(path)['max_parallel_jobs'] == 8
+    finally:
+        store.close()
+
+
+def test_debounced_write(tmp_path):
+    path = tmp_path / "config.json"
+    store = ConfigStore(path, delay=0.01, max_delay=0.05)
+    try:
+        store['theme'] = 'light'
+        for _ in range(200):
+            if read(path).get('theme') == 'light':
+                break
+            time.sleep(0.01)
+        assert read(path)['theme'] == 'light'
+    finally:
+        store.close()
+
+
+def test_flush_merges_with_other_instance(tmp_path):
+    path = tmp_path / "config.json"
+    first = ConfigStore(path, delay=60)
+    second = ConfigStore(path, delay=60)
+    try:
+        first['theme'] = 'light'
+        second['language'] = 'en'
+        del second['last_update']
+        first.flush()
+        second.flush()
+        on_disk = read(path)
+        assert on_disk['theme'] == 'light' and on_disk['language'] == 'en'
+        assert 'last_update' not in on_disk
+        # القيم التي كتبتها النسخة الأخرى تظهر بعد الكتابة التالية
+        assert second['theme'] == 'light'
+    finally:
+        first.close()
+        second.close()
+
+
+def test_nested_changes_need_save(tmp_path):
+    path = tmp_path / "config.json"
+    store = ConfigStore(path, delay=60)
+    try:
+        store['mirrors'] = {}
+        store.flush()
+        store['mirrors']['http://archive.ubuntu.com/ubuntu'] = ['http://mirror.example/ubuntu']
+        store.save('mirrors')
+        store.flush()
+        assert read(path)['mirrors'] == {'http://archive.ubuntu.com/ubuntu': ['http://mirror.example/ubuntu']}
+    finally:
+        store.close()
+
+
+def test_failed_write_is_retried(tmp_path, monkeypatch):
+    path = tmp_path / "config.json"
+    store = ConfigStore(path, delay=0.01, max_delay=0.05)
+    real_replace = os.replace
+    failures = []
+
+    def flaky_replace(src, dst):
+        if len(failures) < 2:
+            failures.append(dst)
+            raise OSError("disk full")
+        real_replace(src, dst)
+
+    monkeypatch.setattr(config_store.os, 'replace', flaky_replace)
+    try:
+        store['theme'] = 'light'
+        # لا تعديلات أخرى: الكتابة تُعاد وحدها بعد الفشل
+        for _ in range(300):
+            if read(path).get('theme') == 'light':
+                break
+            time.sleep(0.01)
+        assert read(path)['theme'] == 'light'
+        assert len(failures) == 2
+    finally:
+        store.close()
@@ -0,0 +1,136 @@
+import hashlib
+
+import pytest
+
+from download_cache import ChecksumMismatch, DownloadCache, VerificationError, rewrite_command
+from fake_mirrors import CONTENT_SIZE, fake_mirrors
+from mirrors import SessionMirrors
+
+# المستودع الأصلي غير متاح؛ التنزيل لا ينجح إلا من المرآة
+ORIGIN = "http://127.0.0.1:9/ubuntu"
+URL = f"{ORIGIN}/pool/main/a/app.deb"
+CONTENT_SHA256 = hashlib.sha256(b'x' * CONTENT_SIZE).hexdigest()
+
+
+@pytest.fixture
+def mirrored_engine(make_engine, tmp_path):
+    def make(mirror_url: str, sha256: str):
+        engine = make_engine({'download_cache_enabled': True, 'download_cache_dir': str(tmp_path / "cache")})
+        engine.session_mirrors = SessionMirrors({ORIGIN: mirror_url})
+        engine.download_cache.known_checksums[URL] = sha256
+        return engine
+    return make
+
+
+def test_pinned_url_is_verified_through_mirror(mirrored_engine, tmp_path):
+    with fake_mirrors({}) as (mirror,):
+        engine = mirrored_engine(mirror.url, CONTENT_SHA256)
+        command = engine.prepare_command(f"wget -q {URL} -O {tmp_path / 'app.deb'}")
+    assert command.startswith('cp ')
+    assert CONTENT_SHA256 in command
+
+
+def test_pinned_url_mismatch_through_mirror_fails(mirrored_engine, tmp_path):
+    with fake_mirrors({}) as (mirror,):
+        engine = mirrored_engine(mirror.url, '0' * 64)
+        with pytest.raises(ChecksumMismatch):
+            engine.prepare_command(f"wget -q {URL} -O {tmp_path / 'app.deb'}")
+
+
+def test_pinned_url_unreachable_mirror_does_not_fall_back(mirrored_engine, tmp_path):
+    with fake_mirrors({'status': 503}) as (mirror,):
+        engine = mirrored_engine(mirror.url, CONTENT_SHA256)
+        with pytest.raises(VerificationError):
+            engine.prepare_command(f"wget -q {URL} -O {tmp_path / 'app.deb'}")
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return DownloadCache(tmp_path / "cache")
+
+
+@pytest.fixture
+def server():
+    with fake_mirrors({}) as (mirror,):
+        yield mirror
+
+
+def test_rewrite_wget_output(cache, server, tmp_path):
+    command = rewrite_command(f"sudo wget -q {server.url}/app.deb -O /tmp/app.deb", cache)
+    assert command == f"sudo cp {cache.objects_dir / CONTENT_SHA256[:2] / CONTENT_SHA256} /tmp/app.deb"
+
+
+def test_rewrite_curl_pipe_keeps_rest(cache, server):
+    command = rewrite_command(f"curl -fsSL {server.url}/key.gpg | sudo gpg --dearmor -o /etc/apt/keyrings/k.gpg", cache)
+    assert command.startswith('cat ')
+    assert command.endswith("| sudo gpg --dearmor -o /etc/apt/keyrings/k.gpg")
+
+
+def test_rewrite_curl_bundled_output_flag(cache, server):
+    command = rewrite_command(f"curl -fsSLo /tmp/key.asc {server.url}/key.asc", cache)
+    assert command.startswith('cp ') and command.endswith('/tmp/key.asc')
+
+
+@pytest.mark.parametrize('command', [
+    "sudo apt install -y vlc",
+    "wget https://example.invalid/a.deb https://example.invalid/b.deb extra",
+    "curl https://example.invalid/install.sh",
+    "wget 'unterminated",
+])
+def test_rewrite_leaves_unknown_commands(cache, command):
+    assert rewrite_command(command, cache) == command
+
+
+def test_rewrite_pinned_checksum(cache, server):
+    url = f"{server.url}/app.deb"
+    cache.known_checksums[url] = '0' * 64
+    with pytest.raises(ChecksumMismatch):
+        rewrite_command(f"wget {url}", cache)
+    cache.known_checksums[url] = CONTENT_SHA256
+    assert rewrite_command(f"wget {url}", cache).startswith('cp ')
+
+
+def test_rewrite_unreachable_pinned_url_is_not_run_unverified(cache):
+    url = f"{ORIGIN}/app.deb"
+    cache.known_checksums[url] = CONTENT_SHA256
+    with pytest.raises(VerificationError):
+        rewrite_command(f"wget {url}", cache)
+
+
+def test_fetch_reuses_cached_copy_when_offline(cache):
+    with fake_mirrors({}) as (mirror,):
+        url = f"{mirror.url}/app.deb"
+        path = cache.fetch(url)
+    assert cache.fetch(url) == path
+
+
+def test_rewrite_keeps_command_chain(cache, server, tmp_path):
+    command = rewrite_command(f"sudo wget -q -O /tmp/a.deb.part {server.url}/a.deb && sudo mv -f /tmp/a.deb.part /tmp/a.deb",
+                              cache)
+    assert command.startswith('sudo cp ')
+    assert command.endswith("/tmp/a.deb.part && sudo mv -f /tmp/a.deb.part /tmp/a.deb")
+
+
+def test_fetched_object_survives_eviction(tmp_path, server):
+    cache = DownloadCache(tmp_path / "cache", max_bytes=1024)
+    path = cache.fetch(f"{server.url}/big.deb")
+    assert path.exists()
+    assert path.name == CONTENT_SHA256
+    # يُخلى عند الجلب التالي
+    (tmp_path / "small").write_bytes(b'small')
+    cache.mirror_dir = tmp_path
+    small = cache.fetch("https://example.invalid/small")
+    assert small.exists() and not path.exists()
+
+
+def test_local_mirror_is_not_rehashed(tmp_path, monkeypatch):
+    (tmp_path / "mirror").mkdir()
+    (tmp_path / "mirror" / "app.deb").write_bytes(b'deb')
+    cache = DownloadCache(tmp_path / "cache", mirror_dir=tmp_path / "mirror")
+    first = cache.fetch("https://example.invalid/pool/app.deb")
+    stored = []
+    monkeypatch.setattr(cache, '_store', lambda *args: stored.append(args))
+    assert cache.fetch("https://example.invalid/pool/app.deb") == first
+    assert stored == []
+    with pytest.raises(ChecksumMismatch):
+        cache.fetch("https://example.invalid/pool/app.deb", '0' * 64)
@@ -0,0 +1,44 @@
+import time
+
+import pytest
+
+from history import HistoryStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = HistoryStore(tmp_path / "history.db", max_rows=5)
+    yield store
+    store.close()
+
+
+def test_compact_keeps_newest_rows(store):
+    for i in range(8):
+        store.add(f"app{i}", True, timestamp=1_700_000_000 + i)
+    store.compact()
+    assert store.count() == 5
+    assert [row.app for row in store.query()] == [f"app{i}" for i in range(7, 2, -1)]
+
+
+def test_compact_by_age(store):
+    now = time.time()
+    store.add('old', True, timestamp=now - 40 * 86400)
+    store.add('recent', False, timestamp=now - 86400)
+    store.compact(max_age_days=30)
+    assert [row.app for row in store.query()] == ['recent']
+
+
+def test_query_filters_and_pages(store):
+    for i in range(4):
+        store.add('vlc' if i % 2 else 'nmap', bool(i % 2), steps=[{'exit': i}], timestamp=1_700_000_000 + i)
+    assert store.count(app='vlc') == 2
+    assert store.count(success=False) == 2
+    assert [row.ts for row in store.query(limit=2, offset=1)] == [1_700_000_002, 1_700_000_001]
+    assert store.count(since=1_700_000_002) == 2
+
+
+def test_add_many_migrates_json_entries(store):
+    store.add_many([{'app': 'vlc', 'success': True, 'timestamp': '2024-01-02T03:04:05'},
+                    {'app': 'nmap', 'success': False, 'timestamp': 'not a date'}])
+    assert store.count() == 2
+    assert store.count(success=True) == 1
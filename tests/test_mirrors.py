@@ -0,0 +1,72 @@
+import asyncio
+
+import pytest
+
+from fake_mirrors import fake_mirrors
+from mirrors import MirrorSelector, SessionMirrors
+
+
+@pytest.fixture
+def sources(tmp_path):
+    sources_list = tmp_path / "sources.list"
+    parts = tmp_path / "sources.list.d"
+    parts.mkdir()
+    return sources_list, parts
+
+
+def selector(origin, mirrors, tmp_path, sources, **kwargs):
+    sources_list, parts = sources
+    sources_list.write_text(f"deb {origin.url} noble main\n")
+    return MirrorSelector({origin.url: [m.url for m in mirrors]}, tmp_path / "state",
+                          probe_bytes=256 * 1024, timeout=2, sources_list=sources_list,
+                          sources_parts=parts, **kwargs)
+
+
+def test_selects_fastest_mirror(tmp_path, sources):
+    with fake_mirrors({'rate': 256 * 1024}, {'rate': 1024 * 1024}, {'rate': 0}) as (origin, slow, fast):
+        chosen = asyncio.run(selector(origin, [slow, fast], tmp_path, sources).select())
+    mirror, result = chosen[origin.url]
+    assert mirror == fast.url
+    assert result.ok
+
+
+def test_failed_mirrors_keep_origin(tmp_path, sources):
+    with fake_mirrors({'rate': 1024 * 1024}, {'status': 503}) as (origin, broken):
+        chosen = asyncio.run(selector(origin, [broken], tmp_path, sources).select())
+    assert chosen[origin.url][0] == origin.url
+
+
+def test_probe_results_are_cached(tmp_path, sources):
+    with fake_mirrors({}, {}) as (origin, mirror):
+        first = asyncio.run(selector(origin, [mirror], tmp_path, sources).select())
+        mirror.status = 503
+        origin.status = 503
+        # نسخة جديدة تقرأ نتائج الفحص المحفوظة ما دامت صالحة
+        cached = asyncio.run(selector(origin, [mirror], tmp_path, sources).select())
+        refreshed = asyncio.run(selector(origin, [mirror], tmp_path, sources).select(refresh=True))
+    assert cached == first
+    assert not refreshed[origin.url][1].ok
+
+
+def test_session_sources_follow_system_sources(tmp_path, sources):
+    sources_list, parts = sources
+    sources_list.write_text("deb http://archive.ubuntu.com/ubuntu noble main\n")
+    session = SessionMirrors({'http://archive.ubuntu.com/ubuntu': 'http://mirror.example/ubuntu'},
+                             tmp_path / "session", sources_list=sources_list, sources_parts=parts)
+    command = session.rewrite("sudo apt install -y vlc")
+    assert "Dir::Etc::SourceList=" in command
+    assert (tmp_path / "session" / "sources.list").read_text() == "deb http://mirror.example/ubuntu noble main\n"
+    (parts / "docker.list").write_text("deb https://download.docker.com/linux/ubuntu noble stable\n")
+    session.rewrite("sudo apt update")
+    assert (tmp_path / "session" / "sources.list.d" / "docker.list").exists()
+    (parts / "docker.list").unlink()
+    session.rewrite("sudo apt update")
+    assert not (tmp_path / "session" / "sources.list.d" / "docker.list").exists()
+
+
+def test_download_rewrite_only_touches_first_command(tmp_path):
+    session = SessionMirrors({'http://archive.ubuntu.com/ubuntu': 'http://mirror.example/ubuntu'})
+    command = "wget http://archive.ubuntu.com/ubuntu/a.deb | tee http://archive.ubuntu.com/ubuntu"
+    assert session.rewrite(command) == "wget http://mirror.example/ubuntu/a.deb | tee http://archive.ubuntu.com/ubuntu"
+    assert session.mirror_url("http://archive.ubuntu.com/ubuntu/a.deb") == "http://mirror.example/ubuntu/a.deb"
+    assert session.mirror_url("https://example.com/a.deb") == "https://example.com/a.deb"
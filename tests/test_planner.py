@@ -0,0 +1,74 @@
+from backends import BACKENDS, PACMAN
+from planner import APT_INSTALL, APT_UPDATE, POST, PREREQUISITES, SETUP, SHARED_JOB, InstallPlan, parse_apt_command
+
+DOCKER = [
+    "sudo apt update",
+    "sudo apt install -y ca-certificates curl",
+    "curl -fsSL https://download.docker.com/linux/ubuntu/gpg | sudo gpg --dearmor -o /etc/apt/keyrings/docker.gpg",
+    "echo 'deb https://download.docker.com/linux/ubuntu noble stable' | sudo tee /etc/apt/sources.list.d/docker.list",
+    "sudo apt update",
+    "sudo apt install -y docker-ce docker-ce-cli",
+    "sudo usermod -aG docker $USER",
+]
+CODE = [
+    "sudo apt install -y curl gpg",
+    "curl -fsSL https://packages.microsoft.com/keys/microsoft.asc | sudo gpg --dearmor -o /etc/apt/keyrings/ms.gpg",
+    "sudo apt update",
+    "sudo apt install code -y",
+]
+NMAP = ["sudo apt install nmap -y"]
+
+
+def test_parse_apt_command():
+    assert parse_apt_command("sudo apt install -y vlc curl") == ('install', ['vlc', 'curl'], ['-y'])
+    assert parse_apt_command("apt-get update") == ('update', [], [])
+    assert parse_apt_command("sudo apt install $(cat list)") is None
+    assert parse_apt_command("sudo apt remove vlc") is None
+
+
+def test_merged_plan_orders_phases():
+    plan = InstallPlan.from_apps({'docker': DOCKER, 'code': CODE, 'nmap': NMAP})
+    phases = [step.phase for step in plan.steps()]
+    assert phases == [APT_UPDATE, PREREQUISITES, SETUP, SETUP, SETUP, APT_UPDATE, APT_INSTALL, POST]
+    # المتطلبات المشتركة مرة واحدة
+    assert plan.prerequisites == ['ca-certificates', 'curl', 'gpg']
+    assert plan.packages == ['docker-ce', 'docker-ce-cli', 'code', 'nmap']
+    # تحديث واحد وتثبيت واحد لكل التطبيقات
+    install = plan.phase(APT_INSTALL)[SHARED_JOB]
+    assert install == ["sudo apt update", "sudo apt install docker-ce docker-ce-cli code nmap -y"]
+
+
+def test_skip_packages_drop_no_op_installs():
+    plan = InstallPlan.from_apps({'code': CODE, 'nmap': NMAP}, skip_packages={'nmap', 'curl'})
+    assert plan.prerequisites == ['gpg']
+    assert plan.packages == ['code']
+
+
+def test_failed_app_packages_are_excluded():
+    plan = InstallPlan.from_apps({'docker': DOCKER, 'code': CODE})
+    install = plan.phase(APT_INSTALL, exclude=('docker',))[SHARED_JOB]
+    assert install[-1] == "sudo apt install code -y"
+    assert plan.phase(SETUP, exclude=('docker',)).keys() == {'code'}
+    assert plan.phase(POST, exclude=('docker',)) == {}
+
+
+def test_plan_uses_backend_names():
+    backend = BACKENDS[PACMAN](package_map={'docker-ce': {'pacman': 'docker'}, 'docker-ce-cli': {'pacman': None},
+                                             'ca-certificates': {'pacman': None}})
+    plan = InstallPlan.from_apps({'nmap': NMAP, 'docker': ["sudo apt install -y ca-certificates docker-ce docker-ce-cli"]},
+                                 backend=backend)
+    assert [step.command for step in plan.steps()] == ["sudo pacman -Syu --needed --noconfirm nmap docker"]
+
+
+def test_leading_update_refreshes_before_prerequisites():
+    plan = InstallPlan.from_apps({'docker': DOCKER, 'nmap': NMAP})
+    assert plan.phase(PREREQUISITES)[SHARED_JOB] == ["sudo apt update", "sudo apt install ca-certificates curl -y"]
+    # تطبيقات لا تبدأ بتحديث لا تضيف تحديثاً قبل المتطلبات
+    plan = InstallPlan.from_apps({'code': CODE})
+    assert plan.phase(PREREQUISITES)[SHARED_JOB] == ["sudo apt install curl gpg -y"]
+
+
+def test_single_refresh_without_repository_setup():
+    plan = InstallPlan.from_apps({'tools': ["sudo apt update", "sudo apt install -y curl", "sudo apt install -y nmap"]})
+    commands = [step.command for step in plan.steps()]
+    assert commands == ["sudo apt update", "sudo apt install curl -y", "sudo apt install nmap -y"]
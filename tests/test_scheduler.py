@@ -0,0 +1,73 @@
+import asyncio
+import threading
+
+import pytest
+
+from aio import EventLoopThread
+from scheduler import DPKG, LOCAL, NETWORK, InstallScheduler, classify_step
+
+
+@pytest.fixture
+def loop():
+    loop = EventLoopThread()
+    yield loop
+    loop.stop()
+
+
+def test_classify_step():
+    assert classify_step("sudo apt install -y vlc") == DPKG
+    assert classify_step("curl -fsSL https://get.docker.com | sudo bash") == DPKG
+    assert classify_step("wget -q https://example.com/a.deb") == NETWORK
+    assert classify_step("sudo usermod -aG docker $USER") == LOCAL
+
+
+def test_failed_step_stops_job(loop):
+    scheduler = InstallScheduler(loop=loop)
+    job = scheduler.run_batch({'a': ["true", "exit 3", "echo never"]})['a']
+    assert not job.success
+    assert [r.returncode for r in job.results] == [0, 3]
+    assert job.error == "exit code 3: exit 3"
+
+
+def test_job_timeout_is_not_a_cancel(loop):
+    scheduler = InstallScheduler(loop=loop, job_timeout=0.2)
+    job = scheduler.run_batch({'a': ["sleep 5"]})['a']
+    assert job.error == "job timed out after 0.2s"
+
+
+def test_cancel_one_operation_leaves_others_running(loop):
+    scheduler = InstallScheduler(loop=loop)
+
+    async def operation(scope_ready, seconds):
+        with scheduler.operation() as scope:
+            scope_ready.append(scope)
+            return (await scheduler.run_batch_async({'job': [f"sleep {seconds}"]}))['job']
+
+    first_scope, second_scope = [], []
+    first = loop.submit(operation(first_scope, 5))
+    second = loop.submit(operation(second_scope, 0.5))
+    threading.Event().wait(0.2)
+    scheduler.cancel(first_scope[0])
+    assert first.result(timeout=5).error == "cancelled: sleep 5"
+    assert second.result(timeout=5).success
+
+
+def test_new_operation_does_not_uncancel_running_one(loop):
+    scheduler = InstallScheduler(loop=loop, retries=3, retry_backoff=0.3)
+
+    async def failing():
+        with scheduler.operation():
+            return (await scheduler.run_batch_async({'job': ["wget -q http://127.0.0.1:9/a"]}))['job']
+
+    async def quick():
+        with scheduler.operation():
+            return (await scheduler.run_batch_async({'job': ["true"]}))['job']
+
+    running = loop.submit(failing())
+    threading.Event().wait(0.1)
+    scheduler.cancel()
+    # نقرة ثانية تبدأ عملية جديدة بنطاقها الخاص أثناء انتظار إعادة المحاولة
+    assert loop.run(quick()).success
+    job = running.result(timeout=5)
+    assert not job.success
+    assert job.results[-1].attempts < 4
@@ -0,0 +1,40 @@
+import os
+import time
+
+from runner import CommandResult
+from tracing import Trace, prune_traces
+
+
+def write_traces(trace_dir, count, size=10):
+    trace_dir.mkdir(exist_ok=True)
+    now = time.time()
+    paths = []
+    for i in range(count):
+        path = trace_dir / f"install_{i:03d}.json"
+        path.write_bytes(b'x' * size)
+        os.utime(path, (now - count + i, now - count + i))
+        paths.append(path)
+    return paths
+
+
+def test_prune_keeps_newest_files(tmp_path):
+    paths = write_traces(tmp_path / "traces", 5)
+    prune_traces(tmp_path / "traces", max_files=3)
+    assert sorted(p.name for p in (tmp_path / "traces").iterdir()) == [p.name for p in paths[2:]]
+
+
+def test_prune_by_total_size_and_age(tmp_path):
+    paths = write_traces(tmp_path / "traces", 4, size=100)
+    os.utime(paths[-1], (time.time() - 40 * 86400,) * 2)
+    prune_traces(tmp_path / "traces", total_bytes=250, retention_days=30)
+    assert sorted(p.name for p in (tmp_path / "traces").iterdir()) == [paths[1].name, paths[2].name]
+
+
+def test_engine_prunes_after_saving(make_engine, tmp_path):
+    engine = make_engine({'trace_max_files': 2})
+    write_traces(tmp_path / "traces", 3)
+    trace = Trace('install')
+    trace.record('vlc', 1, 'true', CommandResult('true', 0, duration=0.1, started_at=time.time()))
+    path = engine.save_trace(trace)
+    remaining = sorted((tmp_path / "traces").iterdir())
+    assert path in remaining and len(remaining) == 2
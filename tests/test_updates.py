@@ -0,0 +1,26 @@
+from checkpoints import marker_satisfied
+from updates import Download, PackageUpdate, UpdatePlan
+
+VLC = Download("http://archive.ubuntu.com/ubuntu/pool/universe/v/vlc/vlc_3.0.21-1_amd64.deb",
+               "vlc_3.0.21-1_amd64.deb", 1024)
+
+
+def plan():
+    return UpdatePlan({'vlc': PackageUpdate('vlc', '3.0.20-3', '3.0.21-1')}, [VLC])
+
+
+def test_download_is_moved_into_place(tmp_path):
+    (command,) = plan().download_jobs(['vlc'], tmp_path)['download:vlc']
+    target = tmp_path / VLC.filename
+    assert command.endswith(f"&& sudo mv -f {target}.part {target}")
+    assert f"-O {target}.part " in command
+
+
+def test_partial_download_is_not_a_marker(tmp_path):
+    (command,) = plan().download_jobs(['vlc'], tmp_path)['download:vlc']
+    # انقطاع أثناء التنزيل يترك الملف المؤقت فقط
+    (tmp_path / f"{VLC.filename}.part").write_bytes(b'partial')
+    assert not marker_satisfied(command)
+    (tmp_path / VLC.filename).write_bytes(b'complete')
+    assert marker_satisfied(command)
+
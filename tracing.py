@@ -0,0 +1,101 @@
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from runner import CommandResult
+from scheduler import classify_step
+
+# ملفات التتبع المحفوظة: أحدث عدد منها ضمن حد للحجم ومدة احتفاظ، مثل أرشيفات السجل
+DEFAULT_MAX_TRACES = 50
+DEFAULT_TRACES_TOTAL_BYTES = 50 * 1024 ** 2
+DEFAULT_TRACES_RETENTION_DAYS = 30
+
+
+def step_summary(result: CommandResult) -> dict:
+    """ملخص مختصر لخطوة واحدة يُحفظ مع سجل التثبيت"""
+    return {
+        'command': result.command,
+        'duration': round(result.duration, 3),
+        'exit_code': result.returncode,
+        'output_bytes': result.output_bytes,
+        'peak_rss': result.peak_rss,
+        'throughput': round(result.throughput, 1) if result.throughput is not None else None,
+        'skipped': result.skipped,
+        'attempts': result.attempts
+    }
+
+
+class Trace:
+    """تسجيل توقيت كل أمر منفذ وتصديره بصيغة Chrome trace-event"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._steps: List[tuple] = []
+
+    def record(self, job_id: str, index: int, command: str, result: CommandResult):
+        """متوافقة مع on_step في المجدول"""
+        with self._lock:
+            self._steps.append((job_id, index, result))
+
+    def steps(self, job_id: Optional[str] = None) -> List[CommandResult]:
+        with self._lock:
+            return [result for job, _, result in self._steps if job_id is None or job == job_id]
+
+    def to_chrome(self) -> dict:
+        """أحداث كاملة (ph=X) لكل أمر، مع خيط منفصل لكل مهمة"""
+        with self._lock:
+            steps = list(self._steps)
+        tids: Dict[str, int] = {}
+        events = []
+        for job_id, index, result in steps:
+            if result.skipped:
+                continue
+            tid = tids.setdefault(job_id, len(tids) + 1)
+            events.append({
+                'name': result.command,
+                'cat': classify_step(result.command),
+                'ph': 'X',
+                'ts': int(result.started_at * 1e6),
+                'dur': int(result.duration * 1e6),
+                'pid': 1,
+                'tid': tid,
+                'args': dict(step_summary(result), job=job_id, step=index)
+            })
+        for job_id, tid in tids.items():
+            events.append({'name': 'thread_name', 'ph': 'M', 'pid': 1, 'tid': tid,
+                           'args': {'name': job_id}})
+        events.append({'name': 'process_name', 'ph': 'M', 'pid': 1, 'tid': 0,
+                       'args': {'name': self.name}})
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def save(self, path: Path) -> Path:
+        """كتابة ملف التتبع بشكل ذري"""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix('.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(self.to_chrome(), f)
+        os.replace(tmp, path)
+        return path
+
+
+def prune_traces(trace_dir: Path, max_files: int = DEFAULT_MAX_TRACES,
+                 total_bytes: int = DEFAULT_TRACES_TOTAL_BYTES,
+                 retention_days: float = DEFAULT_TRACES_RETENTION_DAYS):
+    """حذف ملفات التتبع الأقدم من مدة الاحتفاظ ثم الأقدم حتى يصبح العدد والمجموع تحت الحد"""
+    files = []
+    for path in Path(trace_dir).glob("*.json"):
+        try:
+            files.append((path.stat(), path))
+        except OSError:
+            continue
+    files.sort(key=lambda item: item[0].st_mtime, reverse=True)
+    now = time.time()
+    total = 0
+    for count, (stat, path) in enumerate(files, 1):
+        total += stat.st_size
+        if count > max_files or total > total_bytes or now - stat.st_mtime > retention_days * 86400:
+            path.unlink(missing_ok=True)
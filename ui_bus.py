@@ -0,0 +1,162 @@
+import queue
+import threading
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+
+# معدل تحديث الواجهة الافتراضي (~30 إطاراً في الثانية)
+DEFAULT_INTERVAL_MS = 33
+# أقصى عدد أحداث تُعالج في الإطار الواحد حتى لا يتجمد الخيط الرئيسي
+MAX_EVENTS_PER_TICK = 5000
+DEFAULT_QUEUE_SIZE = 10000
+# أقصى حجم للمخرجات المؤجلة بعد امتلاء الطابور؛ ما زاد عنه يُحذف مع إشعار
+MAX_OVERFLOW_BYTES = 4 * 1024 * 1024
+
+
+@dataclass
+class OutputEvent:
+    """جزء من مخرجات الطرفية"""
+    text: str
+
+
+@dataclass
+class ClearEvent:
+    """مسح منطقة الإخراج"""
+
+
+@dataclass
+class ProgressEvent:
+    """تحديث شريط التقدم"""
+    current: int
+    total: int
+
+
+@dataclass
+class StatusEvent:
+    """تحديث شريط الحالة"""
+    message: str
+
+
+@dataclass
+class CallEvent:
+    """استدعاء دالة على الخيط الرئيسي"""
+    func: Callable[[], None]
+
+
+class UIEventBus:
+    """ناقل أحداث بين خيوط العمل وخيط Tk الرئيسي"""
+
+    def __init__(self,
+                 on_output: Callable[[str], None],
+                 on_clear: Callable[[], None],
+                 on_progress: Callable[[int, int], None],
+                 on_status: Callable[[str], None],
+                 interval_ms: int = DEFAULT_INTERVAL_MS,
+                 queue_size: int = DEFAULT_QUEUE_SIZE):
+        self.on_output = on_output
+        self.on_clear = on_clear
+        self.on_progress = on_progress
+        self.on_status = on_status
+        self.interval_ms = interval_ms
+        self._events: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._root = None
+        self._after_id = None
+        self._ui_thread: Optional[int] = None
+        # أحداث وصلت بعد امتلاء الطابور، بترتيبها؛ تُطبق بعد تفريغه
+        self._lock = threading.Lock()
+        self._overflow: List = []
+        self._overflow_bytes = 0
+        self._dropped_bytes = 0
+
+    def post(self, event):
+        """نشر حدث من أي خيط دون حجب أبداً
+
+        على خيط الواجهة يُطبق الحدث فوراً بعد ما سبقه، إذ لا يوجد غيره ليفرغ الطابور.
+        من خيوط العمل: عند امتلاء الطابور تُؤجل الأحداث، والمخرجات فوق MAX_OVERFLOW_BYTES تُحذف.
+        """
+        if self._ui_thread is not None and threading.get_ident() == self._ui_thread:
+            self.drain(limit=None)
+            self._apply([event])
+            return
+        with self._lock:
+            if not self._overflow:
+                try:
+                    self._events.put_nowait(event)
+                    return
+                except queue.Full:
+                    pass
+            if isinstance(event, OutputEvent):
+                if self._overflow_bytes + len(event.text) > MAX_OVERFLOW_BYTES:
+                    self._dropped_bytes += len(event.text)
+                    return
+                self._overflow_bytes += len(event.text)
+            self._overflow.append(event)
+
+    def start(self, root):
+        """بدء حلقة التفريغ الدورية على root.after (من خيط الواجهة)"""
+        self._root = root
+        self._ui_thread = threading.get_ident()
+        self._schedule()
+
+    def stop(self):
+        """إيقاف حلقة التفريغ"""
+        if self._root is not None and self._after_id is not None:
+            self._root.after_cancel(self._after_id)
+        self._after_id = None
+
+    def _schedule(self):
+        self._after_id = self._root.after(self.interval_ms, self._tick)
+
+    def _tick(self):
+        try:
+            self.drain()
+        finally:
+            self._schedule()
+
+    def drain(self, limit: Optional[int] = MAX_EVENTS_PER_TICK):
+        """تفريغ الأحداث المعلقة (كلها إن كان limit هو None) ودمجها وتطبيقها دفعة واحدة"""
+        events = []
+        while limit is None or len(events) < limit:
+            try:
+                events.append(self._events.get_nowait())
+            except queue.Empty:
+                # الأحداث المؤجلة أحدث من كل ما في الطابور
+                with self._lock:
+                    events.extend(self._overflow)
+                    if self._dropped_bytes:
+                        events.append(OutputEvent(f"\n[... {self._dropped_bytes} bytes of output dropped ...]\n"))
+                    self._overflow = []
+                    self._overflow_bytes = self._dropped_bytes = 0
+                break
+        self._apply(events)
+
+    def _apply(self, events: list):
+        """دمج الأحداث: آخر تقدم وآخر حالة فقط، والمخرجات نص واحد"""
+        clear = False
+        chunks = []
+        progress: Optional[ProgressEvent] = None
+        status: Optional[StatusEvent] = None
+        calls = []
+
+        for event in events:
+            if isinstance(event, OutputEvent):
+                chunks.append(event.text)
+            elif isinstance(event, ClearEvent):
+                clear = True
+                chunks.clear()
+            elif isinstance(event, ProgressEvent):
+                progress = event
+            elif isinstance(event, StatusEvent):
+                status = event
+            elif isinstance(event, CallEvent):
+                calls.append(event.func)
+
+        if clear:
+            self.on_clear()
+        if chunks:
+            self.on_output(''.join(chunks))
+        if progress is not None:
+            self.on_progress(progress.current, progress.total)
+        if status is not None:
+            self.on_status(status.message)
+        for func in calls:
+            func()
@@ -0,0 +1,205 @@
+import json
+import os
+import re
+import shlex
+import subprocess
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from backends import AptBackend, PackageBackend, APT
+from package_state import PackageState
+
+APT_ARCHIVES = Path('/var/cache/apt/archives')
+PRINT_URIS_TIMEOUT = 120
+
+# 'URI' filename size hash
+_URI_LINE = re.compile(r"^'(?P<uri>[^']+)'\s+(?P<filename>\S+)\s+(?P<size>\d+)")
+
+
+@dataclass
+class PackageUpdate:
+    """ترقية حزمة واحدة مع حجم التنزيل إن كان ملفها غير موجود في ذاكرة apt"""
+    name: str
+    current: str
+    candidate: str
+    new: bool = True
+    size: int = 0
+
+
+@dataclass
+class Download:
+    """ملف .deb يلزم تنزيله قبل مرحلة dpkg"""
+    uri: str
+    filename: str
+    size: int
+
+    @property
+    def package(self) -> str:
+        return self.filename.split('_', 1)[0]
+
+
+def parse_print_uris(output: str) -> List[Download]:
+    """تحليل مخرجات apt-get --print-uris"""
+    downloads = []
+    for line in output.splitlines():
+        match = _URI_LINE.match(line)
+        if match and match.group('filename').endswith('.deb'):
+            downloads.append(Download(match.group('uri'), match.group('filename'), int(match.group('size'))))
+    return downloads
+
+
+def human_size(size: float) -> str:
+    for unit in ('B', 'KB', 'MB'):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == 'B' else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.2f} GB"
+
+
+class UpdatePlan:
+    """الترقيات المتاحة مع تقدير التنزيل؛ يُختار منها جزء للتنفيذ"""
+
+    def __init__(self, updates: Dict[str, PackageUpdate], downloads: List[Download],
+                 reused_index: bool = False, throughput: Optional[float] = None,
+                 backend: Optional[PackageBackend] = None):
+        self.updates = updates
+        self.backend = backend or AptBackend()
+        self.downloads = downloads
+        self.reused_index = reused_index
+        # سرعة المرآة المقاسة (بايت/ثانية) لتقدير زمن التنزيل
+        self.throughput = throughput
+        for download in downloads:
+            if download.package in updates:
+                updates[download.package].size += download.size
+
+    def __bool__(self) -> bool:
+        return bool(self.updates)
+
+    def download_size(self, selected: Optional[List[str]] = None) -> int:
+        names = set(self.updates if selected is None else selected)
+        return sum(update.size for name, update in self.updates.items() if name in names)
+
+    def describe(self) -> str:
+        """جدول الترقيات ثم المجموع وتقدير زمن التنزيل"""
+        if not self.updates:
+            return "No packages to upgrade\n"
+        lines = []
+        for name in sorted(self.updates):
+            update = self.updates[name]
+            mark = '*' if update.new else ' '
+            size = human_size(update.size) if update.size else 'cached'
+            lines.append(f"{mark} {name:<32} {update.current} -> {update.candidate}  ({size})\n")
+        total = sum(download.size for download in self.downloads)
+        lines.append(f"{len(self.updates)} packages, {len(self.downloads)} files to download, {human_size(total)}")
+        if self.throughput and total:
+            lines.append(f", about {total / self.throughput:.0f}s at {self.throughput / 1024 ** 2:.1f} MB/s")
+        lines.append("\n")
+        if self.reused_index:
+            lines.append(f"Package index unchanged since the last update; {self.backend.name} was not queried\n")
+        if any(update.new for update in self.updates.values()):
+            lines.append("* new since the last update\n")
+        return ''.join(lines)
+
+    def download_jobs(self, selected: List[str], archives_dir: Path = APT_ARCHIVES) -> Dict[str, List[str]]:
+        """مهمة تنزيل مستقلة لكل ملف حتى تعمل بالتوازي ضمن حد الشبكة للمجدول"""
+        names = set(selected)
+        jobs = {}
+        for download in self.downloads:
+            # الاعتماديات الجديدة تُنزل مع الحزم المختارة كلها لأن apt سيطلبها
+            if download.package in self.updates and download.package not in names:
+                continue
+            # التنزيل إلى اسم مؤقت ثم النقل: الملف الناقص بعد انقطاع لا يحمل اسم الحزمة
+            # فلا يعتبره apt ولا علامة الاستئناف منزلاً
+            target = shlex.quote(str(archives_dir / download.filename))
+            partial = shlex.quote(str(archives_dir / f"{download.filename}.part"))
+            jobs[f"download:{download.package}"] = [
+                f"sudo wget -q -O {partial} {shlex.quote(download.uri)} && sudo mv -f {partial} {target}"
+            ]
+        return jobs
+
+    def install_commands(self, selected: List[str]) -> List[str]:
+        """مرحلة التثبيت: ترقية الحزم المختارة فقط في معاملة واحدة (من الملفات المنزلة مع apt)"""
+        return self.backend.upgrade_commands(selected)
+
+
+def print_uris(packages: List[str], apt_options: str = '') -> List[Download]:
+    """ملفات .deb التي سيحتاجها apt لترقية الحزم (الموجود في ذاكرة apt لا يُطبع)"""
+    if not packages:
+        return []
+    argv = ["apt-get"] + shlex.split(apt_options) + [
+        "--print-uris", "-qq", "install", "--only-upgrade", "-y"
+    ] + packages
+    try:
+        output = subprocess.run(argv, capture_output=True, text=True, timeout=PRINT_URIS_TIMEOUT).stdout
+    except (OSError, subprocess.SubprocessError):
+        return []
+    return parse_print_uris(output)
+
+
+def _normalize(stamp) -> list:
+    return json.loads(json.dumps(stamp))
+
+
+class UpdateSnapshot:
+    """حالة فهرس الحزم المحفوظة بين التشغيلات
+
+    stamp و upgradable: آخر نتيجة من apt وبصمة الفهرس عندها.
+    baseline: الترقيات التي بقيت بعد آخر تحديث، لتمييز الجديد منها.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+
+    def load(self) -> dict:
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save(self, stamp, upgradable: Dict[str, str], baseline: Dict[str, str]):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix('.tmp')
+        with open(tmp, 'w') as f:
+            json.dump({'stamp': stamp, 'upgradable': upgradable, 'baseline': baseline,
+                       'taken_at': time.time()}, f)
+        os.replace(tmp, self.path)
+
+    def clear(self):
+        self.path.unlink(missing_ok=True)
+
+    def upgradable(self, state: PackageState) -> Tuple[Dict[str, str], bool, Dict[str, str]]:
+        """(الترقيات الحالية، هل أُخذت من اللقطة دون apt، ترقيات آخر تحديث)"""
+        snapshot = self.load()
+        baseline = snapshot.get('baseline', {})
+        stamp = state.index_stamp()
+        if snapshot and snapshot.get('stamp') == _normalize(stamp):
+            state.remember_upgradable(snapshot['upgradable'], stamp)
+            return snapshot['upgradable'], True, baseline
+        upgradable = state.upgradable()
+        self.save(stamp, upgradable, baseline)
+        return upgradable, False, baseline
+
+    def record_update(self, state: PackageState) -> Dict[str, str]:
+        """بعد الترقية: ما بقي قابلاً للترقية فعلاً يُعاد استعلامه ويصبح المرجع"""
+        # الترقية تغير قاعدة الحزم فتتغير البصمة ويُستعلم مدير الحزم من جديد؛
+        # قد تجلب الترقية اعتماديات أو تتجاوز حزمة محجوزة فلا يُستنتج الباقي من الخطة
+        upgradable = state.upgradable()
+        self.save(state.index_stamp(), upgradable, upgradable)
+        return upgradable
+
+
+def build_plan(state: PackageState, snapshot: UpdateSnapshot, apt_options: str = '',
+               throughput: Optional[float] = None) -> UpdatePlan:
+    """خطة الترقية: الفرق عن آخر تحديث ثم أحجام التنزيل (من apt فقط؛ غيره ينزل بنفسه)"""
+    upgradable, reused, baseline = snapshot.upgradable(state)
+    installed = state.installed()
+    updates = {
+        name: PackageUpdate(name, installed.get(name, '?'), candidate,
+                            new=baseline.get(name) != candidate)
+        for name, candidate in upgradable.items()
+    }
+    downloads = print_uris(sorted(updates), apt_options) if state.backend.name == APT else []
+    return UpdatePlan(updates, downloads, reused, throughput, state.backend)
@@ -0,0 +1,288 @@
+import customtkinter as ctk
+import tkinter as tk
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+from output_log import OutputLog, DEFAULT_MAX_LINES
+from records import AppSummary
+from monitor import ResourceSampler, format_rate, CPU, MEMORY, DISK_READ, DISK_WRITE, NET_RECV, NET_SENT
+
+# تأخير البحث أثناء الكتابة (مللي ثانية)
+SEARCH_DELAY_MS = 150
+
+BUTTON_STYLE = {
+    "font": ("Arial", 14, "bold"),
+    "width": 200,
+    "height": 40,
+    "corner_radius": 8
+}
+
+
+class AppGrid(ctk.CTkFrame):
+    """شبكة تطبيقات مقسمة لصفحات تعيد استخدام مجموعة ثابتة من الأزرار"""
+
+    def __init__(self, master, apps: Dict[str, AppSummary],
+                 title_for: Callable[[AppSummary], str],
+                 on_select: Callable[[str], None],
+                 columns: int = 3, rows: int = 4,
+                 search_label: str = "Search...",
+                 status_for: Optional[Callable[[str], str]] = None, **kwargs):
+        super().__init__(master, **kwargs)
+        self.on_select = on_select
+        # نص حالة التثبيت لكل تطبيق (يُقرأ من فهرس الحزم عند عرض الصفحة)
+        self.status_for = status_for
+        self.columns = columns
+        self.page_size = columns * rows
+        self.page = 0
+        self._search_job = None
+        self._button_apps: List[Optional[str]] = []
+
+        # فهرس البحث: (المعرف، النص المعروض، نص البحث بأحرف صغيرة)
+        self._items: List[Tuple[str, str, str]] = []
+        for app_id, info in apps.items():
+            title = title_for(info)
+            text = f"{title}\n{info.description}"
+            self._items.append((app_id, text, f"{app_id} {text}".lower()))
+        self._visible = self._items
+
+        paged = len(self._items) > self.page_size
+        if paged:
+            self.search_var = ctk.StringVar()
+            self.search_var.trace_add("write", lambda *args: self._schedule_search())
+            ctk.CTkEntry(
+                self,
+                textvariable=self.search_var,
+                placeholder_text=search_label
+            ).pack(fill="x", padx=10, pady=(10, 0))
+
+        self.grid_frame = ctk.CTkFrame(self)
+        self.grid_frame.pack(fill="both", expand=True, padx=10, pady=10)
+
+        # مجموعة ثابتة من الأزرار بحجم الصفحة بغض النظر عن عدد التطبيقات
+        self.buttons = []
+        for slot in range(min(self.page_size, len(self._items))):
+            btn = ctk.CTkButton(
+                self.grid_frame,
+                command=lambda s=slot: self._on_click(s),
+                **BUTTON_STYLE
+            )
+            self.buttons.append(btn)
+            self._button_apps.append(None)
+
+        if paged:
+            nav_frame = ctk.CTkFrame(self)
+            nav_frame.pack(fill="x", padx=10, pady=(0, 10))
+            ctk.CTkButton(nav_frame, text="<", width=40, command=lambda: self.show_page(self.page - 1)).pack(side="left", padx=5)
+            self.page_label = ctk.CTkLabel(nav_frame, text="")
+            self.page_label.pack(side="left", expand=True)
+            ctk.CTkButton(nav_frame, text=">", width=40, command=lambda: self.show_page(self.page + 1)).pack(side="right", padx=5)
+        else:
+            self.page_label = None
+
+        self.show_page(0)
+
+    @property
+    def page_count(self) -> int:
+        return max(1, -(-len(self._visible) // self.page_size))
+
+    def show_page(self, page: int):
+        """عرض صفحة بإعادة تهيئة أزرار المجموعة بدلاً من إنشاء أزرار جديدة"""
+        self.page = max(0, min(page, self.page_count - 1))
+        start = self.page * self.page_size
+        items = self._visible[start:start + self.page_size]
+
+        for slot, btn in enumerate(self.buttons):
+            if slot < len(items):
+                app_id, text, _ = items[slot]
+                self._button_apps[slot] = app_id
+                status = self.status_for(app_id) if self.status_for else ""
+                btn.configure(text=f"{status}{text}")
+                btn.grid(row=slot // self.columns, column=slot % self.columns,
+                         padx=10, pady=10, sticky="nsew")
+            else:
+                self._button_apps[slot] = None
+                btn.grid_remove()
+
+        if self.page_label is not None:
+            self.page_label.configure(
+                text=f"{self.page + 1} / {self.page_count}  ({len(self._visible)})"
+            )
+
+    def refresh(self):
+        """إعادة عرض الصفحة الحالية بعد تغير حالة التثبيت"""
+        self.show_page(self.page)
+
+    def filter(self, query: str):
+        """تصفية التطبيقات حسب نص البحث"""
+        query = query.strip().lower()
+        if query:
+            self._visible = [item for item in self._items if query in item[2]]
+        else:
+            self._visible = self._items
+        self.show_page(0)
+
+    def _schedule_search(self):
+        if self._search_job is not None:
+            self.after_cancel(self._search_job)
+        self._search_job = self.after(SEARCH_DELAY_MS, self._run_search)
+
+    def _run_search(self):
+        self._search_job = None
+        self.filter(self.search_var.get())
+
+    def _on_click(self, slot: int):
+        app_id = self._button_apps[slot]
+        if app_id is not None:
+            self.on_select(app_id)
+
+
+class OutputConsole(ctk.CTkFrame):
+    """منطقة إخراج محدودة: تعرض آخر max_lines سطراً والمخرجات الكاملة في OutputLog"""
+
+    def __init__(self, master, log: OutputLog, max_lines: int = DEFAULT_MAX_LINES,
+                 height: int = 150, search_label: str = "Search...", **kwargs):
+        super().__init__(master, **kwargs)
+        self.log = log
+        self.max_lines = max_lines
+        self._lines = 0
+        self._search_pool: Optional[ThreadPoolExecutor] = None
+
+        self.textbox = ctk.CTkTextbox(self, height=height, font=("Courier", 12))
+        self.textbox.pack(fill="both", expand=True)
+
+        search_frame = ctk.CTkFrame(self, fg_color="transparent")
+        search_frame.pack(fill="x", pady=(5, 0))
+        self.search_var = ctk.StringVar()
+        entry = ctk.CTkEntry(search_frame, textvariable=self.search_var, placeholder_text=search_label)
+        entry.pack(side="left", fill="x", expand=True)
+        entry.bind("<Return>", lambda event: self.search())
+        ctk.CTkButton(search_frame, text="🔍", width=40, command=self.search).pack(side="left", padx=5)
+
+    def append(self, text: str):
+        """كتابة النص كاملاً إلى الملف وعرض آخر max_lines سطراً فقط"""
+        self.log.write(text)
+        lines = text.count("\n")
+        if lines >= self.max_lines:
+            # جزء أكبر من السعة: نعرض ذيله فقط بدلاً من إدراجه كاملاً ثم حذفه
+            tail = text.splitlines(keepends=True)[-self.max_lines:]
+            self.textbox.delete("1.0", "end")
+            self.textbox.insert("end", "".join(tail))
+            self._lines = len(tail)
+        else:
+            self.textbox.insert("end", text)
+            self._lines += lines
+            excess = self._lines - self.max_lines
+            if excess > 0:
+                self.textbox.delete("1.0", f"{excess + 1}.0")
+                self._lines -= excess
+        self.textbox.see("end")
+
+    def clear(self):
+        """مسح العرض وبدء ملف جلسة جديد"""
+        self.textbox.delete("1.0", "end")
+        self._lines = 0
+        self.log.start()
+
+    def search(self):
+        """البحث في ملف الجلسة على خيط خلفي ثم عرض النتائج"""
+        query = self.search_var.get().strip()
+        if not query:
+            return
+        if self._search_pool is None:
+            self._search_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='log-search')
+        self._poll_search(self._search_pool.submit(self.log.search, query), query)
+
+    def _poll_search(self, future: Future, query: str):
+        if not future.done():
+            self.after(50, self._poll_search, future, query)
+            return
+        try:
+            matches = future.result()
+        except OSError as e:
+            matches = [(0, str(e))]
+        window = ctk.CTkToplevel(self)
+        window.title(f"{query} ({len(matches)})")
+        window.geometry("800x400")
+        results = ctk.CTkTextbox(window, font=("Courier", 12))
+        results.pack(fill="both", expand=True, padx=10, pady=10)
+        results.insert("end", "\n".join(f"{number:>7}: {line}" for number, line in matches))
+        results.configure(state="disabled")
+
+
+class Sparkline(tk.Canvas):
+    """رسم خطي مصغر لسلسلة قيم"""
+
+    def __init__(self, master, width: int = 160, height: int = 36,
+                 color: str = "#3a7ebf", maximum: Optional[float] = None, **kwargs):
+        super().__init__(master, width=width, height=height, highlightthickness=0,
+                         bg=kwargs.pop("bg", "#2b2b2b"), **kwargs)
+        self.width = width
+        self.height = height
+        self.maximum = maximum
+        self._line = self.create_line(0, height, 0, height, fill=color, width=1.5)
+
+    def draw(self, values):
+        """إعادة رسم الخط بتعديل إحداثيات عنصر واحد بدلاً من إنشاء عناصر جديدة"""
+        if len(values) < 2:
+            return
+        top = self.maximum or max(max(values), 1.0)
+        step = self.width / (len(values) - 1)
+        coords = []
+        for i, value in enumerate(values):
+            coords.append(i * step)
+            coords.append(self.height - 1 - min(value / top, 1.0) * (self.height - 2))
+        self.coords(self._line, *coords)
+
+
+class MonitorPanel(ctk.CTkFrame):
+    """لوحة مراقبة الموارد الحية تقرأ من ResourceSampler على الخيط الرئيسي"""
+
+    def __init__(self, master, sampler: ResourceSampler, refresh_ms: int = 1000, **kwargs):
+        super().__init__(master, **kwargs)
+        self.sampler = sampler
+        self.refresh_ms = refresh_ms
+        self._after_id = None
+        self.cells = {}
+
+        specs = [
+            ("CPU", CPU, 100.0),
+            ("Memory", MEMORY, 100.0),
+            ("Disk R", DISK_READ, None),
+            ("Disk W", DISK_WRITE, None),
+            ("Net ↓", NET_RECV, None),
+            ("Net ↑", NET_SENT, None)
+        ]
+        for column, (title, key, maximum) in enumerate(specs):
+            cell = ctk.CTkFrame(self, fg_color="transparent")
+            cell.grid(row=0, column=column, padx=6, pady=4)
+            label = ctk.CTkLabel(cell, text=f"{title}: -", font=("Arial", 11))
+            label.pack()
+            spark = Sparkline(cell, maximum=maximum, width=150)
+            spark.pack()
+            self.cells[key] = (title, label, spark)
+
+    def start(self):
+        self.sampler.start()
+        self._refresh()
+
+    def stop(self):
+        if self._after_id is not None:
+            self.after_cancel(self._after_id)
+            self._after_id = None
+        self.sampler.stop()
+
+    def _refresh(self):
+        for key, (title, label, spark) in self.cells.items():
+            series = self.sampler.series[key]
+            last = series.last()
+            if key == CPU:
+                cores = [core.last() or 0.0 for core in self.sampler.per_core]
+                peak = max(cores) if cores else 0.0
+                text = f"{title}: {last or 0:.0f}% (max core {peak:.0f}%)"
+            elif key == MEMORY:
+                text = f"{title}: {last or 0:.0f}%"
+            else:
+                text = f"{title}: {format_rate(last)}"
+            label.configure(text=text)
+            spark.draw(series.values())
+        self._after_id = self.after(self.refresh_ms, self._refresh)